@@ -1,25 +1,151 @@
 #! /usr/bin/python
 
+import gc
 import time
-from bitalino import BITalino, ExceptionCode
+# Origin of the startup report, taken before the heavier imports
+STARTUP_ORIGIN = time.perf_counter()
+import os
+import sys
+import struct
 import numpy as np
-import matplotlib.pyplot as plt
-from collections import deque
 import threading
-from scipy.signal import iirnotch, filtfilt
-from pythonosc import udp_client
+from biosignal import filters, kernels, spectrum
+from biosignal.convert import GAINS, transfer_function
+from biosignal.filters import filter_signal
+from biosignal.quality import QualityAnalyzer, adc_top, mains_ratio
+from biosignal.bands import FREQUENCY_BANDS
+from biosignal.streaming import StreamingFeatures
+from biosignal.descriptors import DESCRIPTORS, SpectralDescriptors
+from frame_decoder import FrameDecoder, error_code, frame_size
+from history import HistoryStore
+from fanout import FanOut, make_sink
+from control import PendingConfig
+from metrics import MetricsRegistry
+from profiler import AllocationCounter, NullProfiler, Profiler
+from realtime import RealtimeScheduler, lock_memory
+from governor import LoadGovernor
+from evoked import EvokedAverager
+from coherence import CoherenceAnalyzer
+from sonify import Sonifier, parse_field
+from supervisor import UNSUPERVISED, Supervisor
+# archive, export, stream_server, the control and metrics servers, pythonosc,
+# matplotlib and scipy are imported when a feature needs them
+
+try:
+    import fcntl
+    import termios
+except ImportError:  # Windows: socket backlog is not available
+    fcntl = None
 
 # Configuration
 MAC = "88:6B:0F:D9:19:B0"
+# Full-rate samples kept per port, older history is in the 10x / 100x / 1000x min/max/mean tiers
 BUFFER_SIZE = 10000
+HISTORY_TIER_SECONDS = (600, 3600, 86400)
+# Precision of the sample buffers, filtered signals, spectra and coherence: "float32" halves their memory and
+# bandwidth (complex64 spectra), "float64" is the reference path. precision_report.py compares the two
+PRECISION = "float64"
 SAMPLING_RATE = 1000
 # Supported : 10 / 100 / 1000
 READ_CHUNK_SIZE = 10
+# Largest single read when the reader has fallen behind
+READ_CHUNK_MAX = 250
+# Decode frames with NumPy (frame_decoder.py) instead of the per-sample bitalino reader
+FAST_DECODER = True
+    
+# Raw sample archive (archive.py), None to disable
+ARCHIVE_PATH = None
+# Columnar export (export.py) of the samples, spectra and streaming features: .parquet / .arrow / .h5, None to disable
+EXPORT_PATH = None
+EXPORT_ROW_GROUP_SIZE = 65536
     
 # OpenSoundControl server 
 OSC_IP = "127.0.0.1"
 OSC_PORT = 8000
 OSC_REFRESH_RATE = 100
+# Also send every new sample of each port as one /<type><port>/block message per tick (list of floats),
+# read at signal rate in Pure Data by the osc_block~ abstraction
+OSC_BLOCKS = True
+
+# Outputs fed by the OSC loop (fanout.py): types osc_udp / osc_tcp / file / queue,
+# each with optional addresses, rate, decimation, queue_size and drop_policy (osc_udp: bundle, one datagram per tick)
+OUTPUT_SINKS = [
+    {"type": "osc_udp", "name": "puredata", "ip": OSC_IP, "port": OSC_PORT, "bundle": True},
+]
+
+# Binary sample/spectrum streaming to remote dashboards (stream_server.py)
+STREAM_SERVER = False
+STREAM_HOST = "127.0.0.1"
+STREAM_TCP_PORT = 8765
+STREAM_WS_PORT = 8766
+
+# Inbound OSC control (control.py), None to disable:
+#   /config/notch [freq q ...]      replace the notch filters
+#   /config/rate hz                 OSC refresh rate
+#   /config/processing_rate hz      spectrum refresh rate
+#   /config/fft_size n              samples per spectrum
+#   /config/sensor port type        change the sensor type of an active port
+#   /config/sensors [port type ...] change the active ports (restarts acquisition, keeps the link)
+#   /history/query port seconds [points]  min/max/mean history (history.py), answered on the outputs as
+#                                   /<sensor><port>/history/{time,low,high,mean} with up to HISTORY_QUERY_POINTS points
+CONTROL_IP = "127.0.0.1"
+CONTROL_PORT = 9000
+HISTORY_QUERY_POINTS = 500
+
+# Pipeline metrics (metrics.py): Prometheus text on http://METRICS_IP:METRICS_PORT/metrics (None to disable)
+# and an OSC /metrics bundle to OSC_IP:OSC_PORT every METRICS_OSC_INTERVAL seconds (None to disable)
+METRICS_IP = "127.0.0.1"
+METRICS_PORT = 9100
+METRICS_OSC_INTERVAL = 1
+
+# Per-thread wall/CPU time, stage timings, GC pauses and stack samples (profiler.py),
+# dumped to PROFILE_PREFIX.folded / .trace.json on exit and on SIGUSR1
+PROFILE = False
+PROFILE_PREFIX = "profile"
+
+# Scheduling per thread (realtime.py, Linux), threads: sensor / data / osc / graphs / output (sink senders)
+# e.g. {"sensor": {"cores": [2], "priority": 50}, "osc": {"cores": [3], "nice": -5}, "data": {"cores": [3], "nice": 5}}
+THREAD_POLICIES = {}
+# mlockall() the process so the buffers are never paged out
+LOCK_MEMORY = False
+
+# Freeze the objects created at startup out of the GC generations after the first read
+GC_FREEZE = True
+# Count net allocations per acquisition iteration (profiler.py), printed every ALLOCATION_REPORT_INTERVAL seconds
+ALLOCATION_TRACKING = False
+ALLOCATION_REPORT_INTERVAL = 10
+
+# Plot the signals and spectra (matplotlib), also enabled by running with --gui
+GUI = False
+GRAPHS_RATE = 30
+
+# Shed work when the loops together use more than LOAD_BUDGET of the interpreter (governor.py):
+# each level scales the rate of the plot, the spectra ("process", "coherence") and the OSC features, never the acquisition
+LOAD_GOVERNOR = True
+LOAD_BUDGET = 0.8
+LOAD_LEVELS = [
+    {},
+    {"plot": 1 / 3},
+    {"plot": 1 / 6, "process": 1 / 2, "coherence": 1 / 2},
+    {"plot": 1 / 6, "process": 1 / 5, "coherence": 1 / 5},
+    {"plot": 1 / 6, "process": 1 / 5, "coherence": 1 / 5, "osc": 1 / 2},
+]
+
+# Designed notch coefficients are kept here so later starts don't import scipy.signal (None to disable)
+FILTER_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "bitalino", "filters.json")
+
+# Watchdog over the worker threads (supervisor.py), checked every WATCHDOG_INTERVAL seconds: a worker that ends, or
+# hasn't finished an iteration within its stall timeout, is stopped and restarted alone. The sensor's timeout is the
+# longest read (READ_CHUNK_MAX samples) plus SENSOR_STALL_MARGIN, and it only reconnects when the stall is in the read
+WATCHDOG_INTERVAL = 0.02
+SENSOR_STALL_MARGIN = 0.25
+STALL_TIMEOUTS = {"osc": 0.25, "process": 1.0, "plot": 5.0}
+
+# Print import, connection and first sample times once acquisition is running
+STARTUP_REPORT = True
+
+# "DEBUG" also prints every OSC message sent
+LOG_LEVEL = "INFO"
 
 # analog input number and sensor type
 SENSORS = [
@@ -29,84 +155,433 @@ SENSORS = [
     (4, "EMG") 
 ]
 
-# Given by sensors datasheets
-# https://support.pluxbiosignals.com/wp-content/uploads/2021/11/revolution-emg-sensor-datasheet-1.pdf
-# https://bitalino.com/storage/uploads/media/revolution-ecg-sensor-datasheet-revb-1.pdf
-# https://bitalino.com/storage/uploads/media/revolution-eeg-sensor-datasheet-revb.pdf
-GAINS = {   
-    "EMG": 1009, # [-1.64𝑚𝑉, 1.64𝑚𝑉]
-    "ECG": 1100, # [-1.5𝑚𝑉, 1.5𝑚𝑉]
-    "EEG": 41782 # [-39.49𝜇𝑉, 39.49𝜇𝑉]
-}
+# Sensor gains and units are in biosignal/convert.py (GAINS)
+
+# Samples per spectrum
+FFT_SIZE = 1024
+PROCESSING_RATE = 50
 
 NOTCHES = [
     (50, 30),
     (1, 30)
 ]
 
+# Clipping, flatline, artifact and mains checks on every chunk (biosignal/quality.py),
+# sent as /<type><port>/quality [score, clipping, flatline, artifact, mains]
+QUALITY_CHECK = True
+# Skip the filters and spectrum of ports scoring under QUALITY_BAD_SCORE
+QUALITY_GATE = False
+QUALITY_BAD_SCORE = 0.5
+MAINS_FREQUENCY = 50
+
+# Average the ports around edges of the digital inputs (evoked.py): {digital column 1-4: condition name}
+# Each new epoch sends /evoked/<condition>/<type><port> [mean...] and /evoked/<condition>/count
+EVOKED_CONDITIONS = {}
+EVOKED_WINDOW = (-0.2, 0.8)
+EVOKED_EDGE = "rising"
+# Averages written on exit (.npz, None to skip)
+EVOKED_PATH = None
+
+# Coherence per band and zero-lag correlation between the ports (coherence.py), sent COHERENCE_RATE
+# times per second as flattened matrices in SENSORS order: /coherence/<band> and /correlation
+COHERENCE = True
+COHERENCE_RATE = 5
+COHERENCE_BANDS = {name: FREQUENCY_BANDS[name] for name in ("theta", "alpha", "beta", "gamma", "emg_low", "emg_high")}
+COHERENCE_SEGMENT = 256
+
+# Centroid, flux, rolloff, flatness and peak frequency of the spectra (biosignal/descriptors.py), all ports in one
+# pass after each processing tick, sent as /<type><port>/centroid ... /<type><port>/peak and usable as sonify sources
+SPECTRAL_DESCRIPTORS = True
+# Share of the power under the rolloff frequency
+SPECTRAL_ROLLOFF = 0.85
+
+# Envelope, moving RMS and (ECG) heart rate of every sample (biosignal/streaming.py),
+# sent as /<type><port>/envelope, /<type><port>/rms and /<type><port>/bpm
+STREAM_FEATURES = True
+# Recursive kernels: "numba", "numpy", or None for numba when installed (biosignal/kernels.py)
+KERNEL_BACKEND = None
+
+# Control values computed here and sent as /sonify/<name> with the signals (sonify.py), changed at
+# runtime with /sonify/set <name> <field> <values...>. Sources: <type><port>/latest, envelope, rms, bpm, quality
+# and the spectral descriptors (centroid, flux, rolloff, flatness, peak)
+SONIFY_MAPPINGS = [
+    # What receiver.pd did with [* 300] [+ 30] [mtof] [line~], on a pentatonic scale
+    {"name": "pitch", "source": "ECG2/latest", "input": (-1, 1), "output": (40, 88), "scale": "pentatonic",
+     "slew": 200, "hz": True},
+    {"name": "amplitude", "source": "EMG1/envelope", "input": (0, 0.5), "curve": "exp", "curvature": 3},
+    {"name": "onset", "source": "EMG1/envelope", "input": (0, 0.5), "trigger": 0.3, "hysteresis": 0.1},
+]
+
 # Global thread communication
-sensor_thread_status = {"running": True, "error": None, "disconnected": False}
+sensor_thread_status = {"running": True, "error": None, "disconnected": False, "reading": False, "backlog": 0, "chunk_size": READ_CHUNK_SIZE}
 # Use port number as the key since that's the unique identifier
-data_buffers = {port: deque(maxlen=BUFFER_SIZE) for port, sensor_type in SENSORS}
+def make_history():
+    return HistoryStore(SAMPLING_RATE, BUFFER_SIZE / SAMPLING_RATE, tier_seconds=HISTORY_TIER_SECONDS, dtype=PRECISION)
+
+histories = {port: make_history() for port, sensor_type in SENSORS}
+# Full-rate ring of each history, written in place by the acquisition loop
+data_buffers = {port: histories[port].full for port, sensor_type in SENSORS}
 ffts = {port: (np.array([]), np.array([])) for port, sensor_type in SENSORS}
+archive = None
+# Connected BITalino, replaced by the sensor worker when it reconnects
+device = None
+exporter = None
+fanout = FanOut()
+stream_server = None
+pending_config = PendingConfig()
+
+def read_columns(sensors):
+    """{port: column of the BITalino.read() rows}
+
+    After the sequence and the 4 digital columns the device sends the active
+    ports in ascending order, whatever their numbers (ports 1 and 5 come as
+    columns 5 and 6).
+    """
+    return {port: 5 + index for index, port in enumerate(sorted(port for port, sensor_type in sensors))}
+
+def make_quality(sensors):
+    """(analyzer, read columns, {port: analyzer channel}) for the active ports"""
+    ports = [port for port, sensor_type in sensors]
+    columns = read_columns(sensors)
+    # The 5th and 6th channels of a frame are the 6-bit ones, whichever ports they are
+    analyzer = QualityAnalyzer([adc_top(columns[port] - 4) for port in ports], SAMPLING_RATE, bad_score=QUALITY_BAD_SCORE)
+    return analyzer, np.array([columns[port] for port in ports]), {port: channel for channel, port in enumerate(ports)}
+
+# Replaced as a whole when the ports change, so readers take it in one go
+quality = make_quality(SENSORS)
+def make_coherence(sensors):
+    """(analyzer, read columns) for the active ports, mains left out of the matrices"""
+    analyzer = CoherenceAnalyzer(len(sensors), SAMPLING_RATE, COHERENCE_BANDS, COHERENCE_SEGMENT, COHERENCE_SEGMENT // 2,
+                                 exclude=[(MAINS_FREQUENCY - 2, MAINS_FREQUENCY + 2)], dtype=PRECISION)
+    columns = read_columns(sensors)
+    return analyzer, np.array([columns[port] for port, sensor_type in sensors])
+
+coherence = make_coherence(SENSORS) if COHERENCE else None
+
+def make_descriptors(sensors):
+    return SpectralDescriptors(len(sensors), SPECTRAL_ROLLOFF)
+
+descriptors = make_descriptors(SENSORS) if SPECTRAL_DESCRIPTORS else None
+# Latest descriptor values by source name ("<type><port>/<descriptor>"), replaced as a whole every tick
+descriptor_values = {}
+
+def make_features(sensors):
+    return StreamingFeatures([sensor_type for port, sensor_type in sensors], SAMPLING_RATE, READ_CHUNK_MAX,
+                             mains_frequency=MAINS_FREQUENCY)
+
+features = make_features(SENSORS) if STREAM_FEATURES else None
+sonifier = Sonifier(SONIFY_MAPPINGS) if SONIFY_MAPPINGS else None
+evoked = EvokedAverager(EVOKED_CONDITIONS, SAMPLING_RATE, EVOKED_WINDOW, EVOKED_EDGE) if EVOKED_CONDITIONS else None
+
+metrics = MetricsRegistry()
+reads_total = metrics.counter("bitalino_reads_total", "Device reads")
+samples_total = metrics.counter("bitalino_samples_total", "Samples acquired (all ports)")
+missed_reads_total = metrics.counter("bitalino_missed_reads_total", "Failed device reads")
+reconnects_total = metrics.counter("bitalino_reconnects_total", "Bluetooth reconnections")
+worker_restarts_total = metrics.counter("bitalino_worker_restarts_total", "Worker threads restarted by the watchdog")
+stage_seconds = metrics.histogram("bitalino_stage_seconds", "Time spent per pipeline stage and iteration")
+read_backlog = metrics.gauge("bitalino_read_backlog", "Samples waiting in the device socket")
+read_chunk_size = metrics.gauge("bitalino_read_chunk_size", "Samples asked for by the last read")
+sink_queue_depth = metrics.gauge("bitalino_sink_queue_depth", "Batches waiting per output sink")
+sink_dropped = metrics.gauge("bitalino_sink_dropped", "Batches dropped per output sink")
+sink_errors = metrics.gauge("bitalino_sink_errors", "Send errors per output sink")
+export_dropped_groups = metrics.gauge("bitalino_export_dropped_groups", "Row groups dropped because the export writer was behind")
+stream_clients = metrics.gauge("bitalino_stream_clients", "Connected streaming clients")
+allocated_blocks = metrics.gauge("bitalino_allocated_blocks_per_read", "Net allocated memory blocks per acquisition iteration")
+allocated_objects = metrics.gauge("bitalino_gc_objects_per_read", "Net GC-tracked objects per acquisition iteration")
+load_level = metrics.gauge("bitalino_load_level", "Load shedding level, 0 is full quality")
+load_share = metrics.gauge("bitalino_load", "Share of the interpreter used by the loops over the last window")
+signal_quality = metrics.gauge("bitalino_signal_quality", "Quality score per port, 0 (unusable) to 1")
+read_stage = stage_seconds.labels(stage="read")
+store_stage = stage_seconds.labels(stage="store")
+convert_stage = stage_seconds.labels(stage="convert")
+quality_stage = stage_seconds.labels(stage="quality")
+evoked_stage = stage_seconds.labels(stage="evoked")
+features_stage = stage_seconds.labels(stage="features")
+process_stage = stage_seconds.labels(stage="process")
+osc_stage = stage_seconds.labels(stage="osc")
+
+def collect_output_metrics():
+    for name, stats in fanout.stats().items():
+        sink_queue_depth.labels(sink=name).set(stats["queue_depth"])
+        sink_dropped.labels(sink=name).set(stats["dropped"])
+        sink_errors.labels(sink=name).set(stats["errors"])
+    if exporter is not None:
+        export_dropped_groups.set(exporter.dropped_groups)
+    if stream_server is not None:
+        stream_clients.set(stream_server.stats()["clients"])
+
+def collect_quality_metrics():
+    if QUALITY_CHECK:
+        analyzer, columns, channels = quality
+        for port, channel in channels.items():
+            signal_quality.labels(port=str(port)).set(float(analyzer.scores[channel]))
+
+metrics.add_collector(collect_output_metrics)
+metrics.add_collector(collect_quality_metrics)
+
+profiler = NullProfiler()
+scheduler = RealtimeScheduler(THREAD_POLICIES)
+
+def report_load_level(governor):
+    load_level.set(governor.level)
+    load_share.set(governor.load)
+    print(f"[GOVERNOR] {governor.describe()}", flush=True)
+
+governor = LoadGovernor(LOAD_LEVELS if LOAD_GOVERNOR else [{}], LOAD_BUDGET,
+                        backlog_limit=READ_CHUNK_MAX, on_change=report_load_level)
+
+startup_times = {}
+
+def mark_startup(name):
+    """Record the first time a startup step completes, in seconds since STARTUP_ORIGIN"""
+    startup_times.setdefault(name, time.perf_counter() - STARTUP_ORIGIN)
+
+def startup_report():
+    steps = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in startup_times.items())
+    heavy = [name for name in ("scipy", "matplotlib", "pythonosc", "pyarrow", "h5py") if name in sys.modules]
+    return f"[STARTUP] {steps}; loaded: {', '.join(heavy) or 'no heavy modules'}"
+
+def log_debug(message):
+    if LOG_LEVEL == "DEBUG":
+        print(message, flush=True)
 
 ##### SENSORS ACQUISITION
 
-def transfer_function(adc_values, sensor_type):
-    ADC_BITS = 10
-    VCC = 3.3
-    GAIN = GAINS[sensor_type]
+def buffered_bytes(device):
+    """Number of bytes already waiting in the device socket (0 if unknown)"""
+    try:
+        if device.serial:
+            return device.socket.in_waiting
+        if fcntl is not None:
+            return struct.unpack("i", fcntl.ioctl(device.socket.fileno(), termios.FIONREAD, b"\0\0\0\0"))[0]
+    except Exception:
+        pass
+    return 0
+
+def buffered_samples(device):
+    """Number of complete frames already waiting in the device socket (0 if unknown)"""
+    return buffered_bytes(device) // frame_size(len(device.analogChannels))
+
+def drain_device(device, quiet_time=0.05):
+    """Drop the frames still in flight after device.stop()"""
+    time.sleep(quiet_time)
+    pending = buffered_bytes(device)
+    while pending > 0:
+        if device.serial:
+            device.socket.read(pending)
+        else:
+            device.socket.recv(pending)
+        time.sleep(quiet_time)
+        pending = buffered_bytes(device)
+
+class ReadChunkPolicy:
+    """Chooses how many samples each device.read call asks for
+
+    Everything already buffered in the socket is read at once (up to max_size),
+    so a reader that fell behind catches up with a few large reads. Otherwise
+    the read blocks for base_size samples, or less when a subscriber asked for
+    lower latency with request_latency().
+    """
+    
+    def __init__(self, base_size=READ_CHUNK_SIZE, max_size=READ_CHUNK_MAX, sampling_rate=SAMPLING_RATE):
+        self.base_size = base_size
+        self.max_size = max_size
+        self.sampling_rate = sampling_rate
+        self.latency_requests = {}
+        self.lock = threading.Lock()
+    
+    def request_latency(self, name, latency):
+        """Ask for samples to reach the buffers at most `latency` seconds after acquisition"""
+        with self.lock:
+            self.latency_requests[name] = latency
+    
+    def release_latency(self, name):
+        with self.lock:
+            self.latency_requests.pop(name, None)
+    
+    def target_size(self):
+        with self.lock:
+            latencies = list(self.latency_requests.values())
+        size = self.base_size
+        if latencies:
+            size = min(size, int(min(latencies) * self.sampling_rate))
+        return max(1, min(size, self.max_size))
     
-    measured_v = ((adc_values / (2**ADC_BITS)) - 0.5) * VCC / GAIN
+    def next_size(self, backlog):
+        return max(1, min(max(self.target_size(), backlog), self.max_size))
 
-    # EEG unit is uV, others are mV
-    if (sensor_type == "EEG"):
-        return measured_v * 1000000
-    else:
-        return measured_v * 1000
+read_chunk_policy = ReadChunkPolicy()
 
-def sensor_acquisition_loop(device):
+def sensor_acquisition_loop(device, worker=UNSUPERVISED):
     global sensor_thread_status
     missed_count = 0
+    last_behind_report = 0
     
     # Reset status
-    sensor_thread_status["running"] = True
     sensor_thread_status["error"] = None
     sensor_thread_status["disconnected"] = False
+    sensor_thread_status["backlog"] = 0
+    sensor_thread_status["chunk_size"] = read_chunk_policy.target_size()
     
     # Start device with correct port numbers (1-indexed for BITalino API)
     device.start(SAMPLING_RATE, [port for port, sensor_type in SENSORS])
+    reader = FrameDecoder(device, READ_CHUNK_MAX) if FAST_DECODER else device
+    # Decoded chunks always land in the same array
+    read_buffer = np.zeros((READ_CHUNK_MAX, 5 + len(SENSORS)))
+    port_columns = read_columns(SENSORS)
+    active_buffers = {port: data_buffers[port] for port in port_columns}
+    gc_frozen = not GC_FREEZE
+    allocations = AllocationCounter() if ALLOCATION_TRACKING else None
+    last_allocation_report = time.time()
     
+    profiler.register_thread("sensor")
+    scheduler.configure_thread("sensor")
     print("[SENSOR] Starting acquisition loop", flush=True)
 
-    while sensor_thread_status["running"]:
+    while sensor_thread_status["running"] and worker.running:
         try:
-            # Read is blocking so no need to sleep
-            new_samples = device.read(READ_CHUNK_SIZE)
+            # Runtime changes only take effect between two chunks
+            if apply_pending_config():
+                with worker.idle():
+                    device.stop()
+                    drain_device(device)
+                    device.start(SAMPLING_RATE, [port for port, sensor_type in SENSORS])
+                reader = FrameDecoder(device, READ_CHUNK_MAX) if FAST_DECODER else device
+                read_buffer = np.zeros((READ_CHUNK_MAX, 5 + len(SENSORS)))
+                port_columns = read_columns(SENSORS)
+                active_buffers = {port: data_buffers[port] for port in port_columns}
+                print(f"[SENSOR] Acquisition restarted on ports {[port for port, sensor_type in SENSORS]}", flush=True)
+            
+            if allocations is not None:
+                allocations.begin()
+            
+            # Read whatever is buffered (at least the target chunk), read is blocking so no need to sleep
+            backlog = buffered_samples(device)
+            chunk_size = read_chunk_policy.next_size(backlog)
+            sensor_thread_status["backlog"] = backlog
+            sensor_thread_status["chunk_size"] = chunk_size
+            read_backlog.set(backlog)
+            read_chunk_size.set(chunk_size)
+            governor.observe_backlog(backlog)
+            
+            if backlog > read_chunk_policy.max_size and time.time() - last_behind_report > 1:
+                print(f"[SENSOR] Reader behind: {backlog} samples buffered, reading {chunk_size}", flush=True)
+                last_behind_report = time.time()
             
+            start_time = time.perf_counter()
+            sensor_thread_status["reading"] = True
+            try:
+                new_samples = reader.read(chunk_size, out=read_buffer) if FAST_DECODER else reader.read(chunk_size)
+            finally:
+                sensor_thread_status["reading"] = False
+            elapsed = time.perf_counter() - start_time
+            read_stage.observe(elapsed)
+            profiler.record("read", start_time, elapsed)
+            reads_total.inc()
+            samples_total.inc(len(new_samples))
+            
+            start_time = time.perf_counter()
+            if archive is not None:
+                archive.write(new_samples)
+            if exporter is not None:
+                exporter.write_samples(new_samples, transfer_function)
+            elapsed = time.perf_counter() - start_time
+            store_stage.observe(elapsed)
+            profiler.record("store", start_time, elapsed)
+            governor.observe("sensor", elapsed)
+            
+            start_time = time.perf_counter()
             # Process each sensor
-            for port, sensor_type in SENSORS:
-                # Column index is port + 4 (first 5 columns are sequence, digital I/O, then analog channels)
-                channel_data = new_samples[:, port + 4]
-                
-                # Convert to physical units
-                physical_data = transfer_function(channel_data, sensor_type)
+            for index, (port, sensor_type) in enumerate(SENSORS):
+                channel_data = new_samples[:, port_columns[port]]
+                n = len(channel_data)
                 
-                # Store in buffer using port as key
-                data_buffers[port].extend(physical_data)
+                # Convert to physical units straight into the ring slots of the port
+                ring = data_buffers[port]
+                first, second = ring.reserve(n)
+                transfer_function(channel_data[:len(first)], sensor_type, out=first)
+                transfer_function(channel_data[len(first):], sensor_type, out=second)
+                ring.commit(n)
+                histories[port].update_tiers(first)
+                histories[port].update_tiers(second)
+                if features is not None:
+                    features.input[:len(first), index] = first
+                    features.input[len(first):n, index] = second
+            elapsed = time.perf_counter() - start_time
+            convert_stage.observe(elapsed)
+            profiler.record("convert", start_time, elapsed)
+            governor.observe("sensor", elapsed)
+            
+            if features is not None:
+                start_time = time.perf_counter()
+                features.update(len(new_samples))
+                if exporter is not None:
+                    exporter.write_features(features.envelope, features.rms, features.bpm)
+                elapsed = time.perf_counter() - start_time
+                features_stage.observe(elapsed)
+                profiler.record("features", start_time, elapsed)
+                governor.observe("sensor", elapsed)
+            
+            if evoked is not None:
+                start_time = time.perf_counter()
+                evoked.detect(new_samples[:, 1:5])
+                publish_evoked(evoked.collect(active_buffers))
+                elapsed = time.perf_counter() - start_time
+                evoked_stage.observe(elapsed)
+                profiler.record("evoked", start_time, elapsed)
+                governor.observe("sensor", elapsed)
+            
+            if QUALITY_CHECK:
+                start_time = time.perf_counter()
+                analyzer, columns, channels = quality
+                analyzer.update(new_samples[:, columns])
+                elapsed = time.perf_counter() - start_time
+                quality_stage.observe(elapsed)
+                profiler.record("quality", start_time, elapsed)
+                governor.observe("sensor", elapsed)
+            
+            if coherence is not None:
+                # Raw values: gains and offsets don't change coherence or correlation
+                analyzer, columns = coherence
+                analyzer.push(new_samples[:, columns])
             
             # Reset missed count on successful read
             missed_count = 0
             
+            if "first sample" not in startup_times:
+                mark_startup("first sample")
+                if STARTUP_REPORT:
+                    print(startup_report(), flush=True)
+            
+            if not gc_frozen:
+                # Startup objects (modules, buffers, threads) are never scanned again
+                gc.collect()
+                gc.freeze()
+                gc_frozen = True
+            
+            if allocations is not None:
+                allocations.end()
+                if time.time() - last_allocation_report > ALLOCATION_REPORT_INTERVAL:
+                    blocks, objects, collections = allocations.report()
+                    allocated_blocks.set(blocks)
+                    allocated_objects.set(objects)
+                    print(f"[SENSOR] Allocations per read: {blocks:.2f} blocks, {objects:.2f} objects, {collections} collections", flush=True)
+                    allocations.reset()
+                    last_allocation_report = time.time()
+            
+            worker.beat()
+            
         except Exception as e:
             print(f"[SENSOR] Exception during read: {e}", flush=True)
             print(f"[SENSOR] Exception type: {type(e)}", flush=True)
             
             # Check for specific BITalino exceptions
             if hasattr(e, 'args') and len(e.args) > 0:
-                if e.args[0] == ExceptionCode.CONTACTING_DEVICE:
+                code = error_code(e)
+                if code == "CONTACTING_DEVICE":
                     print("[SENSOR] Lost communication with device", flush=True)
-                elif e.args[0] == ExceptionCode.DEVICE_NOT_IN_ACQUISITION:
+                elif code == "DEVICE_NOT_IN_ACQUISITION":
                     print("[SENSOR] Device not in acquisition mode", flush=True)
                 sensor_thread_status["disconnected"] = True
                 break
@@ -118,6 +593,7 @@ def sensor_acquisition_loop(device):
                 break
                 
             missed_count += 1
+            missed_reads_total.inc()
             print(f"[SENSOR] Missed read #{missed_count}", flush=True)
             
             if missed_count >= 5:  # Reduced threshold for faster detection
@@ -126,101 +602,267 @@ def sensor_acquisition_loop(device):
                 break
                 
             # Short sleep before retry
-            time.sleep(0.1)
+            with worker.idle():
+                time.sleep(0.1)
     
+    if sensor_thread_status["running"] and not worker.running and not sensor_thread_status["disconnected"]:
+        # Stopped by the watchdog outside a read: the device still works, stop it so the restarted loop can start it
+        with worker.idle():
+            try:
+                device.stop()
+                drain_device(device)
+            except Exception as e:
+                print(f"[SENSOR] Error stopping device, reconnecting: {e}", flush=True)
+                sensor_thread_status["disconnected"] = True
     print("[SENSOR] Acquisition loop ended", flush=True)
-    sensor_thread_status["running"] = False
+
+def sensor_worker(worker):
+    """Supervised acquisition, reconnecting first when the previous run lost the device"""
+    global device
+    if sensor_thread_status["disconnected"]:
+        with worker.idle():
+            close_device(device)
+            print("[SENSOR] Attempting to reconnect...", flush=True)
+            reconnects_total.inc()
+            device = init_bt()
+        if device is None:
+            print("[SENSOR] Failed to reconnect, exiting", flush=True)
+            sensor_thread_status["running"] = False
+            return
+        print("[SENSOR] Successfully reconnected, resuming data acquisition", flush=True)
+    try:
+        sensor_acquisition_loop(device, worker)
+    except Exception:
+        # Starting the device failed, connect again on restart
+        sensor_thread_status["disconnected"] = True
+        raise
+
+def interrupt_device():
+    """Unblock a read waiting on a silent device, the sensor worker reconnects when restarted
+
+    A stall in any other step (a slow export, a GC pause) leaves the device alone, the loop restarts on it.
+    """
+    import socket
+    if not sensor_thread_status["reading"]:
+        return
+    sensor_thread_status["disconnected"] = True
+    try:
+        device.socket.shutdown(socket.SHUT_RDWR)
+    except (AttributeError, OSError):
+        pass
+
+def close_device(device):
+    if device is None:
+        return
+    try:
+        device.stop()
+        device.close()
+    except Exception as e:
+        print(f"[SENSOR] Error stopping device: {e}", flush=True)
 
 ##### OSC UPDATES
 
-def osc_refresh_loop():
+def publish_evoked(updated):
+    """Send the averages that just took a new epoch"""
+    if not updated:
+        return
+    sensor_types = dict(SENSORS)
+    batch = []
+    counts = {}
+    for condition, port in updated:
+        mean, std, counts[condition] = evoked.average(condition, port)
+        batch.append((f"/evoked/{condition}/{sensor_types.get(port, 'port')}{port}", mean.tolist()))
+    for condition, count in counts.items():
+        batch.append((f"/evoked/{condition}/count", count))
+    fanout.publish(batch, tick=False)
+
+def osc_refresh_loop(worker=UNSUPERVISED):
     try:
-        client = udp_client.SimpleUDPClient(OSC_IP, OSC_PORT)
+        # No point in reading faster than we send
+        read_chunk_policy.request_latency("osc", 1 / OSC_REFRESH_RATE)
+        block_positions = {port: histories[port].sample_count for port, sensor_type in SENSORS}
+        metrics_client = None
+        if METRICS_OSC_INTERVAL:
+            from pythonosc import udp_client
+            metrics_client = udp_client.SimpleUDPClient(OSC_IP, OSC_PORT)
+        last_metrics_time = time.perf_counter()
+        last_tick_time = last_metrics_time
+        profiler.register_thread("osc")
+        scheduler.configure_thread("osc")
         print("[OSC] Starting OSC transmission loop", flush=True)
         
-        while sensor_thread_status["running"]:
-            start_time = time.time()
+        while sensor_thread_status["running"] and worker.running:
+            start_time = time.perf_counter()
+            
+            # New samples since the previous tick, for the block messages and the dashboards
+            blocks = {}
+            if OSC_BLOCKS or stream_server is not None:
+                for (port, sensor_type) in SENSORS:
+                    first, samples = histories[port].full.since(block_positions.get(port, histories[port].sample_count))
+                    block_positions[port] = first + len(samples)
+                    blocks[port] = (first, samples)
             
-            # Send latest data for each sensor
-            for (port, sensor_type) in SENSORS:
+            # Latest data for each sensor, one batch shared by every sink
+            batch = []
+            # Values the sonification mappings can use, by source name
+            sources = {}
+            for index, (port, sensor_type) in enumerate(SENSORS):
+                name = f"{sensor_type}{port}"
                 if len(data_buffers[port]) > 0:
-                    try:
-                        client.send_message(f"/{sensor_type}{port}/latest", data_buffers[port][-1])
-                        print(f"[OSC] /{sensor_type}{port}/latest : {data_buffers[port][-1]}", flush=True)
-                    except Exception as e:
-                        print(f"[OSC] Error sending port {port} ({sensor_type}): {e}", flush=True)
+                    address = f"/{name}/latest"
+                    value = float(data_buffers[port].last())
+                    batch.append((address, value))
+                    sources[f"{name}/latest"] = value
+                    log_debug(f"[OSC] {address} : {value}")
+                if features is not None and index < len(features.rms):
+                    sources[f"{name}/envelope"] = float(features.envelope[index])
+                    sources[f"{name}/rms"] = float(features.rms[index])
+                    batch.append((f"/{name}/envelope", sources[f"{name}/envelope"]))
+                    batch.append((f"/{name}/rms", sources[f"{name}/rms"]))
+                    if sensor_type == "ECG" and not np.isnan(features.bpm[index]):
+                        sources[f"{name}/bpm"] = float(features.bpm[index])
+                        batch.append((f"/{name}/bpm", sources[f"{name}/bpm"]))
+                if QUALITY_CHECK and port in quality[2]:
+                    report = quality[0].report(quality[2][port])
+                    sources[f"{name}/quality"] = report[0]
+                    batch.append((f"/{name}/quality", report))
+                for descriptor in DESCRIPTORS:
+                    if f"{name}/{descriptor}" in descriptor_values:
+                        sources[f"{name}/{descriptor}"] = descriptor_values[f"{name}/{descriptor}"]
+                if OSC_BLOCKS and port in blocks and len(blocks[port][1]) > 0:
+                    batch.append((f"/{name}/block", blocks[port][1].tolist()))
+                    log_debug(f"[OSC] /{name}/block : {len(blocks[port][1])} samples")
+            if sonifier is not None:
+                batch.extend(sonifier.process(sources, start_time - last_tick_time))
+            last_tick_time = start_time
+            fanout.publish(batch)
+            
+            if stream_server is not None:
+                for port, (first, samples) in blocks.items():
+                    if len(samples) > 0:
+                        stream_server.publish_samples(port, first, samples)
             
-            elapsed = time.time() - start_time
-            sleep_time = max(0, (1 / OSC_REFRESH_RATE) - elapsed)
+            if metrics_client is not None and start_time - last_metrics_time >= METRICS_OSC_INTERVAL:
+                metrics.send_osc_bundle(metrics_client)
+                last_metrics_time = start_time
+            
+            elapsed = time.perf_counter() - start_time
+            osc_stage.observe(elapsed)
+            profiler.record("osc", start_time, elapsed)
+            governor.observe("osc", elapsed)
+            worker.beat()
+            sleep_time = max(0, (1 / governor.rate("osc", OSC_REFRESH_RATE)) - elapsed)
             time.sleep(sleep_time)
     
     except Exception as e:
         print(f"[OSC] OSC loop error: {e}", flush=True)
     
+    read_chunk_policy.release_latency("osc")
     print("[OSC] OSC transmission loop ended", flush=True)
 
 ##### DATA COMPUTE
 
 def compute_fft(signal):
-    if len(signal) < 2:
-        return np.array([]), np.array([])
-    
-    # Use last 1024 samples or all available data
-    data_to_process = signal[-1024:] if len(signal) >= 1024 else signal
-    windowed_signal = data_to_process * np.hanning(len(data_to_process))
-    fft_data = np.fft.fft(windowed_signal)
-    
-    n_samples = len(data_to_process)
-    freqs = np.fft.fftfreq(n_samples, 1/SAMPLING_RATE)[:n_samples//2]
-    magnitudes = np.abs(fft_data[:n_samples//2])
-    
-    # Normalize magnitudes
-    if np.max(magnitudes) > 0:
-        magnitudes = magnitudes / np.max(magnitudes)
-    
-    return freqs, magnitudes
+    """Normalized spectrum of the last FFT_SIZE samples (or all available data)"""
+    return spectrum.compute_fft(signal, SAMPLING_RATE, FFT_SIZE, normalize=True)
+
+def design_notches(notches):
+    """Notch filter coefficients for each (frequency, quality factor): ((freq, q, b, a), ...)"""
+    return filters.design_notches(notches, SAMPLING_RATE, FILTER_CACHE_PATH)
 
 def apply_notch_filter(signal, notch_freq, quality_factor):
     """Apply a notch filter to remove specific frequency component"""
-    if len(signal) < 6:
-        return signal
-    
-    b_notch, a_notch = iirnotch(notch_freq, quality_factor, SAMPLING_RATE)
-    
-    try:
-        filtered_signal = filtfilt(b_notch, a_notch, signal)
-        return filtered_signal
-    except:
-        return signal
+    return filters.apply_notch_filter(signal, notch_freq, quality_factor, SAMPLING_RATE)
+
+# Designed once, replaced as a whole by the control channel
+notch_filters = design_notches(NOTCHES)
+mark_startup("imports")
     
-def data_processing_loop():
-    global ffts
+def data_processing_loop(worker=UNSUPERVISED):
+    global ffts, descriptor_values
+    profiler.register_thread("data")
+    scheduler.configure_thread("data")
     print("[DATA] Starting data processing loop", flush=True)
+    # One copy of the ring per tick, reused across ports
+    scratch = np.zeros(BUFFER_SIZE, dtype=PRECISION)
+    last_coherence_time = time.perf_counter()
+    # Import scipy.signal (about a second) now rather than in the middle of a watched iteration
+    if notch_filters:
+        filter_signal(scratch[:64], *notch_filters[0][2:])
     
-    while sensor_thread_status["running"]:
-        start_time = time.time()
+    while sensor_thread_status["running"] and worker.running:
+        start_time = time.perf_counter()
+        notches = notch_filters
+        analyzer, columns, channels = quality
+        sensors = SENSORS
+        size = FFT_SIZE
+        # Full-size spectra of every port, rows of NaN for the ports without one this tick
+        spectra = np.full((len(sensors), size // 2), np.nan, dtype=PRECISION) if descriptors is not None else None
         
-        for (port, sensor_type) in SENSORS:
+        for row, (port, sensor_type) in enumerate(sensors):
             if len(data_buffers[port]) > 64:  # Need minimum data for processing
-                signal = np.array(data_buffers[port])
+                signal = data_buffers[port].latest_into(scratch)
+                
+                if QUALITY_CHECK and port in channels:
+                    # Before the notches remove it
+                    analyzer.set_mains(channels[port], mains_ratio(signal[-FFT_SIZE:], SAMPLING_RATE, MAINS_FREQUENCY))
+                    if QUALITY_GATE and analyzer.bad(channels[port]):
+                        ffts[port] = (np.array([]), np.array([]))
+                        continue
                 
-                # Apply notch filters
-                for (freq, q_factor) in NOTCHES:
-                    signal = apply_notch_filter(signal, freq, q_factor)
+                # Apply notch filters: zero-phase (filtfilt) over the whole window, which the causal streaming
+                # kernels (biosignal/kernels.py) can't reproduce, so this stage stays on scipy
+                for (freq, q_factor, b_notch, a_notch) in notches:
+                    signal = filter_signal(signal, b_notch, a_notch)
                 
                 # Compute FFT
                 freqs, magnitudes = compute_fft(signal)
                 ffts[port] = (freqs, magnitudes)
+                
+                # Only full-size spectra so every exported row has the same length
+                if exporter is not None and len(magnitudes) == FFT_SIZE // 2:
+                    exporter.write_spectrum(port, magnitudes)
+                if stream_server is not None:
+                    stream_server.publish_spectrum(port, histories[port].sample_count, magnitudes)
+                if spectra is not None and len(magnitudes) == spectra.shape[1]:
+                    spectra[row] = magnitudes
+        
+        if spectra is not None:
+            analysis = descriptors
+            values = analysis.update(spectrum.fft_window(size, SAMPLING_RATE)[1], spectra) if analysis.n_spectra == len(sensors) else {}
+            latest = {}
+            for row, (port, sensor_type) in enumerate(sensors):
+                for name in DESCRIPTORS:
+                    if name in values and not np.isnan(values[name][row]):
+                        latest[f"{sensor_type}{port}/{name}"] = float(values[name][row])
+            descriptor_values = latest
+            if latest:
+                fanout.publish([(f"/{source}", value) for source, value in latest.items()], tick=False)
+        
+        if coherence is not None:
+            cross_spectra = coherence[0]
+            cross_spectra.update()
+            if cross_spectra.frames and start_time - last_coherence_time >= 1 / governor.rate("coherence", COHERENCE_RATE):
+                batch = [(f"/coherence/{band}", matrix.ravel().tolist()) for band, matrix in cross_spectra.coherence().items()]
+                batch.append(("/correlation", cross_spectra.correlation().ravel().tolist()))
+                fanout.publish(batch, tick=False)
+                last_coherence_time = start_time
         
-        elapsed = time.time() - start_time
-        sleep_time = max(0, (1 / 50) - elapsed)  # 50Hz processing rate
+        elapsed = time.perf_counter() - start_time
+        process_stage.observe(elapsed)
+        profiler.record("process", start_time, elapsed)
+        governor.observe("process", elapsed)
+        worker.beat()
+        sleep_time = max(0, (1 / governor.rate("process", PROCESSING_RATE)) - elapsed)
         time.sleep(sleep_time)
     
     print("[DATA] Data processing loop ended", flush=True)
 
 ###### GRAPHS
 
-def graphs_refresh_loop():
+def graphs_refresh_loop(worker=UNSUPERVISED):
+    # Headless runs never load matplotlib
+    import matplotlib.pyplot as plt
     plt.ion()
     fig, graphs = plt.subplots(2, len(SENSORS), figsize=(15, 10))
     
@@ -272,17 +914,19 @@ def graphs_refresh_loop():
     
     plt.tight_layout()
     
+    profiler.register_thread("graphs")
+    scheduler.configure_thread("graphs")
     print("[GRAPHS] Starting real-time plotting", flush=True)
     
-    while sensor_thread_status["running"]:
-        start_time = time.time()
+    while sensor_thread_status["running"] and worker.running:
+        start_time = time.perf_counter()
         
         for port in data_buffers:
             if port in lines and len(data_buffers[port]) > 0:
                 line1, line2, ax1, ax2 = lines[port]
                 
                 # Get data from buffer (last 1000 samples for display)
-                data = list(data_buffers[port])[-1000:]
+                data = data_buffers[port].latest(1000)
                 
                 if len(data) > 1:
                     # Update time domain plot
@@ -304,16 +948,160 @@ def graphs_refresh_loop():
         except Exception as e:
             print(f"[GRAPHS] Error updating plots: {e}", flush=True)
         
-        elapsed = time.time() - start_time
-        sleep_time = max(0, (1 / 30) - elapsed)  # ~30 FPS for smooth animation
+        elapsed = time.perf_counter() - start_time
+        profiler.record("plot", start_time, elapsed)
+        governor.observe("plot", elapsed)
+        worker.beat()
+        sleep_time = max(0, (1 / governor.rate("plot", GRAPHS_RATE)) - elapsed)
         time.sleep(sleep_time)
     
     print("[GRAPHS] Plotting loop ended", flush=True)
     plt.close(fig)
 
+###### RUNTIME CONTROL
+
+def control_notch(*values):
+    if len(values) % 2:
+        raise ValueError("expected frequency / quality factor pairs")
+    notches = [(float(values[i]), float(values[i + 1])) for i in range(0, len(values), 2)]
+    for freq, q_factor in notches:
+        if not 0 < freq < SAMPLING_RATE / 2 or q_factor <= 0:
+            raise ValueError(f"invalid notch ({freq}, {q_factor})")
+    # Coefficients are designed here, on the control thread
+    pending_config.stage(NOTCHES=notches, notch_filters=design_notches(notches))
+
+def control_rate(rate):
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    pending_config.stage(OSC_REFRESH_RATE=float(rate))
+
+def control_processing_rate(rate):
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    pending_config.stage(PROCESSING_RATE=float(rate))
+
+def control_fft_size(size):
+    if int(size) < 8:
+        raise ValueError("FFT size must be at least 8")
+    if exporter is not None:
+        raise ValueError("the FFT size cannot change while exporting (fixed spectrum width)")
+    pending_config.stage(FFT_SIZE=int(size))
+
+def control_sensor(port, sensor_type):
+    if sensor_type not in GAINS:
+        raise ValueError(f"unknown sensor type {sensor_type}")
+    sensors = [(p, sensor_type if p == int(port) else t) for p, t in SENSORS]
+    if sensors == SENSORS:
+        raise ValueError(f"port {port} is not active or already {sensor_type}")
+    if exporter is not None:
+        raise ValueError("sensor types cannot change while exporting")
+    pending_config.stage(SENSORS=sensors)
+
+def control_sensors(*values):
+    if len(values) % 2 or not values:
+        raise ValueError("expected port / sensor type pairs")
+    sensors = [(int(values[i]), values[i + 1]) for i in range(0, len(values), 2)]
+    for port, sensor_type in sensors:
+        if sensor_type not in GAINS or not 1 <= port <= 6:
+            raise ValueError(f"invalid sensor ({port}, {sensor_type})")
+    if len({port for port, sensor_type in sensors}) != len(sensors):
+        raise ValueError("duplicate port")
+    if sorted(p for p, t in sensors) != sorted(p for p, t in SENSORS) and (archive is not None or exporter is not None):
+        raise ValueError("active ports cannot change while archiving or exporting")
+    if sensors != SENSORS and exporter is not None:
+        raise ValueError("sensor types cannot change while exporting")
+    pending_config.stage(SENSORS=sensors)
+
+def control_sonify(name, field, *values):
+    if sonifier is None:
+        raise ValueError("no SONIFY_MAPPINGS configured")
+    sonifier.set(name, field, parse_field(field, values))
+
+def control_sonify_remove(name):
+    if sonifier is None:
+        raise ValueError("no SONIFY_MAPPINGS configured")
+    sonifier.remove(name)
+
+def control_evoked_reset(*values):
+    if evoked is None:
+        raise ValueError("no EVOKED_CONDITIONS configured")
+    evoked.reset()
+
+def control_history(port, seconds, points=HISTORY_QUERY_POINTS):
+    """Answered right away from the control thread, the history is only read"""
+    sensor_type = dict(SENSORS).get(int(port))
+    if sensor_type is None:
+        raise ValueError(f"port {port} is not active")
+    if seconds <= 0 or not 1 <= int(points) <= HISTORY_QUERY_POINTS:
+        raise ValueError(f"expected seconds > 0 and 1 to {HISTORY_QUERY_POINTS} points")
+    result = histories[int(port)].query(seconds, int(points))
+    fanout.publish([(f"/{sensor_type}{int(port)}/history/{name}", values.tolist())
+                    for name, values in zip(("time", "low", "high", "mean"), result)], tick=False)
+
+CONTROL_HANDLERS = {
+    "/config/notch": control_notch,
+    "/config/rate": control_rate,
+    "/config/processing_rate": control_processing_rate,
+    "/config/fft_size": control_fft_size,
+    "/config/sensor": control_sensor,
+    "/config/sensors": control_sensors,
+    "/history/query": control_history,
+    "/evoked/reset": control_evoked_reset,
+    "/sonify/set": control_sonify,
+    "/sonify/remove": control_sonify_remove,
+}
+
+def apply_pending_config():
+    """Apply every staged control change at once, True if the active ports changed"""
+    global NOTCHES, notch_filters, OSC_REFRESH_RATE, PROCESSING_RATE, FFT_SIZE, SENSORS, quality, coherence, features, descriptors
+    changes = pending_config.take()
+    if not changes:
+        return False
+    
+    restart = False
+    if "SENSORS" in changes:
+        new_sensors = changes["SENSORS"]
+        restart = sorted(p for p, t in new_sensors) != sorted(p for p, t in SENSORS)
+        # Every active port counts the same samples, ports (re)started here continue from that count
+        count = histories[SENSORS[0][0]].sample_count
+        for port, sensor_type in new_sensors:
+            if port not in data_buffers:
+                histories[port] = make_history()
+                data_buffers[port] = histories[port].full
+                ffts[port] = (np.array([]), np.array([]))
+            if (port, sensor_type) not in SENSORS:
+                # New port or different unit: don't mix it with older samples, tiers or averages
+                histories[port].reset(count)
+                if evoked is not None:
+                    evoked.reset_port(port)
+        SENSORS = new_sensors
+        quality = make_quality(SENSORS)
+        if coherence is not None:
+            coherence = make_coherence(SENSORS)
+        if features is not None:
+            features = make_features(SENSORS)
+        if descriptors is not None:
+            descriptors = make_descriptors(SENSORS)
+    
+    if "notch_filters" in changes:
+        NOTCHES = changes["NOTCHES"]
+        notch_filters = changes["notch_filters"]
+    if "OSC_REFRESH_RATE" in changes:
+        OSC_REFRESH_RATE = changes["OSC_REFRESH_RATE"]
+        read_chunk_policy.request_latency("osc", 1 / OSC_REFRESH_RATE)
+    if "PROCESSING_RATE" in changes:
+        PROCESSING_RATE = changes["PROCESSING_RATE"]
+    if "FFT_SIZE" in changes:
+        FFT_SIZE = changes["FFT_SIZE"]
+    
+    print(f"[CONTROL] Applied {', '.join(changes)}", flush=True)
+    return restart
+
 ###### CONNECTIVITY
 
 def init_bt():
+    # Imported here so the processing code can be used without the driver
+    from bitalino import BITalino
     missed_count = 0
     while True:
         try:
@@ -332,73 +1120,118 @@ def init_bt():
             print("[INIT_BT] Couldn't connect to the device.", flush=True)
             return None
 
-def start_threads(device):
-    sensor_thread = threading.Thread(target=sensor_acquisition_loop, args=(device,))
-    sensor_thread.start()
-    
-    osc_thread = threading.Thread(target=osc_refresh_loop)
-    osc_thread.start()
-    
-    data_thread = threading.Thread(target=data_processing_loop)
-    data_thread.start()
-    
-    return sensor_thread
-    #graphs_thread = threading.Thread(target=graphs_refresh_loop)
-    #graphs_thread.start()
+def report_restart(worker, reason):
+    worker_restarts_total.labels(worker=worker.name).inc()
+
+def start_workers(gui=False):
+    """Start the acquisition, OSC, processing (and plot) workers under a watchdog, until sensor_thread_status["running"] is cleared"""
+    supervisor = Supervisor(WATCHDOG_INTERVAL, active=lambda: sensor_thread_status["running"], on_restart=report_restart)
+    supervisor.add("sensor", sensor_worker, READ_CHUNK_MAX / SAMPLING_RATE + SENSOR_STALL_MARGIN, interrupt=interrupt_device)
+    supervisor.add("osc", osc_refresh_loop, STALL_TIMEOUTS["osc"])
+    supervisor.add("process", data_processing_loop, STALL_TIMEOUTS["process"])
+    if gui:
+        supervisor.add("plot", graphs_refresh_loop, STALL_TIMEOUTS["plot"])
+    return supervisor.start()
 
 def main():
-    global sensor_thread_status
+    global sensor_thread_status, archive, exporter, stream_server, profiler, device
     
     print(SENSORS, flush=True)
+    gui = GUI or "--gui" in sys.argv[1:]
+    
+    if PROFILE:
+        profiler = Profiler().start()
+        profiler.install_signal(prefix=PROFILE_PREFIX)
+    
+    if THREAD_POLICIES or LOCK_MEMORY:
+        print(scheduler.report(), flush=True)
+    if LOCK_MEMORY:
+        print(f"[RT] {lock_memory()}", flush=True)
+    
+    if features is not None:
+        # Compiled (or loaded from numba's cache) now rather than on the first chunk
+        kernels.use_backend(KERNEL_BACKEND)
+        print(f"[MAIN] Streaming kernels: {kernels.warm_up(len(SENSORS))}", flush=True)
+        mark_startup("kernels")
+    
     print(f"[MAIN] Connecting to {MAC}", flush=True)
     
     device = init_bt()
     if device is None:
         exit(-1)
+    mark_startup("connected")
 
-    print("[MAIN] Starting real-time plotting and OSC transmission to Pure Data...", flush=True)
+    if gui:
+        print("[MAIN] Starting real-time plotting and OSC transmission to Pure Data...", flush=True)
+    else:
+        print("[MAIN] Starting OSC transmission to Pure Data (headless, --gui to plot)...", flush=True)
     print(f"[MAIN] OSC Target: {OSC_IP}:{OSC_PORT}", flush=True)
     
+    if ARCHIVE_PATH is not None:
+        from archive import ArchiveWriter
+        archive = ArchiveWriter(ARCHIVE_PATH, len(SENSORS), SAMPLING_RATE)
+        print(f"[MAIN] Archiving raw samples to {ARCHIVE_PATH}", flush=True)
+    
+    if EXPORT_PATH is not None:
+        from export import SessionExporter
+        exporter = SessionExporter(EXPORT_PATH, SENSORS, GAINS, SAMPLING_RATE, row_group_size=EXPORT_ROW_GROUP_SIZE)
+        print(f"[MAIN] Exporting session to {EXPORT_PATH}", flush=True)
+    
+    fanout.thread_setup = scheduler.thread_setup("output")
+    for spec in OUTPUT_SINKS:
+        fanout.add_sink(make_sink(spec))
+    
+    if STREAM_SERVER:
+        from stream_server import StreamServer
+        stream_server = StreamServer(STREAM_HOST, STREAM_TCP_PORT, STREAM_WS_PORT).start()
+    
+    metrics_server = None
+    if METRICS_PORT is not None:
+        from metrics import MetricsServer
+        metrics_server = MetricsServer(metrics, METRICS_IP, METRICS_PORT).start()
+    
+    control_server = None
+    if CONTROL_PORT is not None:
+        from control import ControlServer
+        control_server = ControlServer(CONTROL_IP, CONTROL_PORT, CONTROL_HANDLERS).start()
+    
+    # The watchdog restarts a failed worker alone, the sensor reconnecting first
+    supervisor = start_workers(gui)
     try:
-        sensor_thread = start_threads(device)
-        
-        while True:
-            # Check if sensor thread is still running
-            if not sensor_thread.is_alive() or sensor_thread_status["disconnected"]:
-                print("[MAIN] Sensor thread stopped or device disconnected", flush=True)
-                
-                # Stop the device if it's still connected
-                try:
-                    device.stop()
-                    device.close()
-                except:
-                    pass
-                
-                print("[MAIN] Attempting to reconnect...", flush=True)
-                device = init_bt()
-                if device is None:
-                    print("[MAIN] Failed to reconnect, exiting", flush=True)
-                    exit(-1)
-                else:
-                    print("[MAIN] Successfully reconnected, resuming data acquisition", flush=True)
-                
-                sensor_thread = start_threads(device)
-            
-            time.sleep(1)
-            
+        supervisor.wait()
     except KeyboardInterrupt:
         print("\n[MAIN] Keyboard interrupt received", flush=True)
-        sensor_thread_status["running"] = False
+    sensor_thread_status["running"] = False
+    if not supervisor.stop(timeout=2):
+        print("[MAIN] Some workers did not stop in time", flush=True)
     
     print("[MAIN] Stopping device...", flush=True)
-    try:
-        device.stop()
-        device.close()
-    except Exception as e:
-        print(f"[MAIN] Error stopping device: {e}", flush=True)
+    close_device(device)
+    
+    if archive is not None:
+        archive.close()
+        print(f"[MAIN] Archive closed ({archive.sample_count} samples)", flush=True)
+    
+    if exporter is not None:
+        exporter.close()
+        print(f"[MAIN] Export closed ({exporter.sample_count} samples)", flush=True)
+    
+    if evoked is not None and EVOKED_PATH is not None:
+        print(f"[MAIN] Saved {evoked.save(EVOKED_PATH)} evoked averages to {EVOKED_PATH}", flush=True)
     
+    fanout.close()
+    if PROFILE:
+        profiler.stop()
+        profiler.dump(PROFILE_PREFIX)
+    if stream_server is not None:
+        stream_server.stop()
+    if control_server is not None:
+        control_server.stop()
+    if metrics_server is not None:
+        metrics_server.stop()
     print("[MAIN] Device closed!", flush=True)
-    exit(0)
+    # No device left when the sensor worker could not reconnect
+    exit(0 if device is not None else -1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
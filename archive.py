@@ -0,0 +1,188 @@
+"""Compressed on-disk archive of raw BITalino samples
+
+Samples are stored in chunks, one bit-packed stream per column. Each column of
+a chunk is either delta encoded (zigzag) or stored raw, whichever needs fewer
+bits, so 10-bit analog and 1-bit digital columns cost a little over their
+real resolution instead of the 8 bytes of a float64. A chunk index at the end
+of the file allows reading any sample range without decoding the whole file.
+
+Layout:
+    header  | magic, version, sampling rate, column count, nominal column bits
+    chunks  | first sample, sample count, then per column: first value, mode, bits, byte count, packed bytes
+    index   | (first sample, sample count, file offset) per chunk
+    footer  | index offset, chunk count, magic
+"""
+
+import queue
+import struct
+import threading
+import numpy as np
+
+MAGIC = b"BITARC01"
+HEADER = struct.Struct("<8sHdH")
+CHUNK_HEADER = struct.Struct("<QI")
+COLUMN_HEADER = struct.Struct("<hBBI")
+INDEX_ENTRY = np.dtype([("first", "<u8"), ("count", "<u4"), ("offset", "<u8")])
+FOOTER = struct.Struct("<QI8s")
+
+MODE_RAW = 0
+MODE_DELTA = 1
+
+
+def column_bits(n_channels):
+    """Nominal bits of each BITalino.read() column: sequence, 4 digital, then 10-bit (6-bit past the 4th) analog"""
+    return [4, 1, 1, 1, 1] + [10 if i < 4 else 6 for i in range(n_channels)]
+
+def pack_bits(values, bits):
+    """Pack non-negative integers on `bits` bits each, little-endian bit order"""
+    if bits == 0 or len(values) == 0:
+        return b""
+    planes = (values[:, None] >> np.arange(bits, dtype=values.dtype)) & 1
+    return np.packbits(planes.astype(np.uint8).ravel(), bitorder="little").tobytes()
+
+def unpack_bits(data, bits, count):
+    if bits == 0 or count == 0:
+        return np.zeros(count, dtype=np.int64)
+    planes = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=count * bits, bitorder="little")
+    return planes.reshape(count, bits).astype(np.int64) @ (1 << np.arange(bits, dtype=np.int64))
+
+def encode_column(values):
+    """Return (first, mode, bits, packed) for one column of a chunk"""
+    values = values.astype(np.int64)
+    first = int(values[0])
+
+    deltas = np.diff(values)
+    zigzag = (deltas << 1) ^ (deltas >> 63)
+    delta_bits = int(zigzag.max()).bit_length() if len(zigzag) else 0
+
+    # Raw packing only works for non-negative values (always the case for ADC samples)
+    if values.min() >= 0:
+        raw_bits = int(values.max()).bit_length()
+        if raw_bits * len(values) <= delta_bits * (len(values) - 1):
+            return first, MODE_RAW, raw_bits, pack_bits(values, raw_bits)
+    return first, MODE_DELTA, delta_bits, pack_bits(zigzag, delta_bits)
+
+def decode_column(first, mode, bits, data, count):
+    if mode == MODE_RAW:
+        return unpack_bits(data, bits, count)
+    zigzag = unpack_bits(data, bits, count - 1)
+    deltas = (zigzag >> 1) ^ -(zigzag & 1)
+    values = np.empty(count, dtype=np.int64)
+    values[0] = first
+    np.cumsum(deltas, out=values[1:])
+    values[1:] += first
+    return values
+
+
+class ArchiveWriter:
+    """Buffers samples and compresses full chunks on a background thread"""
+
+    def __init__(self, path, n_channels, sampling_rate, chunk_size=4096):
+        self.path = path
+        self.bits = column_bits(n_channels)
+        self.n_columns = len(self.bits)
+        self.chunk_size = chunk_size
+        self.pending = np.zeros((chunk_size, self.n_columns), dtype=np.int16)
+        self.pending_count = 0
+        self.sample_count = 0
+        self.index = []
+
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, 1, sampling_rate, self.n_columns))
+        self.file.write(bytes(self.bits))
+
+        self.chunks = queue.Queue()
+        self.thread = threading.Thread(target=self._compress_loop, daemon=True)
+        self.thread.start()
+
+    def write(self, samples):
+        """Append rows with the BITalino.read() column layout (any numeric dtype)"""
+        samples = samples[:, :self.n_columns]
+        while len(samples):
+            n = min(len(samples), self.chunk_size - self.pending_count)
+            self.pending[self.pending_count:self.pending_count + n] = samples[:n]
+            self.pending_count += n
+            samples = samples[n:]
+            if self.pending_count == self.chunk_size:
+                self._flush()
+
+    def _flush(self):
+        if self.pending_count == 0:
+            return
+        self.chunks.put((self.sample_count, self.pending[:self.pending_count].copy()))
+        self.sample_count += self.pending_count
+        self.pending_count = 0
+
+    def _compress_loop(self):
+        while True:
+            item = self.chunks.get()
+            if item is None:
+                return
+            first_sample, chunk = item
+            parts = [CHUNK_HEADER.pack(first_sample, len(chunk))]
+            for column in range(self.n_columns):
+                first, mode, bits, packed = encode_column(chunk[:, column])
+                parts.append(COLUMN_HEADER.pack(first, mode, bits, len(packed)))
+                parts.append(packed)
+            self.index.append((first_sample, len(chunk), self.file.tell()))
+            self.file.write(b"".join(parts))
+
+    def close(self):
+        """Flush the last partial chunk, wait for compression and write the index"""
+        self._flush()
+        self.chunks.put(None)
+        self.thread.join()
+
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.index, dtype=INDEX_ENTRY).tobytes())
+        self.file.write(FOOTER.pack(index_offset, len(self.index), MAGIC))
+        self.file.close()
+
+
+class ArchiveReader:
+    """Random access to an archive written by ArchiveWriter"""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        magic, version, self.sampling_rate, self.n_columns = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a BITalino archive")
+        self.bits = list(self.file.read(self.n_columns))
+
+        self.file.seek(-FOOTER.size, 2)
+        index_offset, n_chunks, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} has no chunk index (writer not closed?)")
+        self.file.seek(index_offset)
+        self.index = np.frombuffer(self.file.read(n_chunks * INDEX_ENTRY.itemsize), dtype=INDEX_ENTRY)
+
+    def __len__(self):
+        if len(self.index) == 0:
+            return 0
+        return int(self.index["first"][-1] + self.index["count"][-1])
+
+    def read_chunk(self, i):
+        self.file.seek(int(self.index["offset"][i]))
+        first_sample, count = CHUNK_HEADER.unpack(self.file.read(CHUNK_HEADER.size))
+        chunk = np.empty((count, self.n_columns), dtype=np.int16)
+        for column in range(self.n_columns):
+            first, mode, bits, n_bytes = COLUMN_HEADER.unpack(self.file.read(COLUMN_HEADER.size))
+            chunk[:, column] = decode_column(first, mode, bits, self.file.read(n_bytes), count)
+        return chunk
+
+    def read(self, start=0, stop=None):
+        """Samples [start, stop) as an int16 array with the BITalino.read() column layout"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return np.zeros((0, self.n_columns), dtype=np.int16)
+
+        ends = self.index["first"] + self.index["count"]
+        first_chunk = int(np.searchsorted(ends, start, side="right"))
+        last_chunk = int(np.searchsorted(self.index["first"], stop, side="left"))
+        chunks = [self.read_chunk(i) for i in range(first_chunk, last_chunk)]
+
+        offset = int(self.index["first"][first_chunk])
+        return np.concatenate(chunks)[start - offset:stop - offset]
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,57 @@
+"""Signal processing shared by acquisition.py and the debug scripts
+
+    convert   ADC counts to physical units (transfer_function, GAINS)
+    filters   notch filter design and zero-phase filtering (FilterBank)
+    spectrum  windowed magnitude spectra (compute_fft)
+    bands     band powers and spectral features (BandExtractor)
+    descriptors  centroid, flux, rolloff, flatness and peak of many spectra at once (SpectralDescriptors)
+    quality   clipping, flatline, artifact and mains checks per chunk (QualityAnalyzer)
+    kernels   per-sample recursive kernels, numba compiled or NumPy
+    streaming envelope, RMS and heart rate sample by sample (StreamingFeatures)
+    osc       spectral features to Pure Data over OSC (Sender)
+    plot      matplotlib view of one channel (Graphs)
+    runner    single channel acquire / plot / send loop used by the debug scripts
+
+Submodules are imported on first use, so `import biosignal` loads neither
+scipy, numba, pythonosc nor matplotlib; only the parts a program touches are loaded.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "ADC_BITS": "convert",
+    "VCC": "convert",
+    "GAINS": "convert",
+    "UNITS": "convert",
+    "transfer_function": "convert",
+    "sensor_range": "convert",
+    "design_notches": "filters",
+    "filter_signal": "filters",
+    "apply_notch_filter": "filters",
+    "FilterBank": "filters",
+    "compute_fft": "spectrum",
+    "FREQUENCY_BANDS": "bands",
+    "band_power": "bands",
+    "BandExtractor": "bands",
+    "SpectralDescriptors": "descriptors",
+    "QualityAnalyzer": "quality",
+    "StreamingFeatures": "streaming",
+    "mains_ratio": "quality",
+    "Sender": "osc",
+    "Graphs": "plot",
+    "run": "runner",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
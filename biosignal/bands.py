@@ -0,0 +1,62 @@
+"""Band powers and spectral features sent to Pure Data"""
+
+import numpy as np
+
+FREQUENCY_BANDS = {
+    'delta': (1, 4),
+    'theta': (4, 8),
+    'alpha': (8, 13),
+    'beta': (13, 30),
+    'gamma': (30, 100),
+    'emg_low': (20, 60),
+    'emg_high': (60, 200)
+}
+
+SPECIFIC_FREQUENCIES = [10, 20, 30, 40, 60, 80, 100]
+
+
+def band_power(freqs, magnitudes, freq_range):
+    """Mean magnitude of the bins within freq_range (inclusive), 0 if there are none"""
+    if len(freqs) == 0 or len(magnitudes) == 0:
+        return 0.0
+
+    start_freq, end_freq = freq_range
+    start_idx = np.searchsorted(freqs, start_freq, side="left")
+    end_idx = min(np.searchsorted(freqs, end_freq, side="right"), len(magnitudes))
+    if start_idx >= end_idx:
+        return 0.0
+    return float(np.mean(magnitudes[start_idx:end_idx]))
+
+
+class BandExtractor:
+    """Features of one spectrum: band powers, dominant peak, total RMS and amplitudes at fixed frequencies
+
+    min_bin: first bin searched for the dominant peak (1 skips DC, higher also skips drift)
+    """
+
+    def __init__(self, bands=FREQUENCY_BANDS, frequencies=SPECIFIC_FREQUENCIES, min_bin=1):
+        self.bands = dict(bands)
+        self.frequencies = list(frequencies)
+        self.min_bin = min_bin
+
+    def dominant(self, freqs, magnitudes):
+        """(frequency, magnitude) of the highest bin from min_bin on, None if the spectrum is too short"""
+        if len(magnitudes) <= self.min_bin:
+            return None
+        index = int(np.argmax(magnitudes[self.min_bin:])) + self.min_bin
+        return float(freqs[index]), float(magnitudes[index])
+
+    def extract(self, freqs, magnitudes):
+        """{feature name: value}, names as in the OSC addresses"""
+        features = {name: band_power(freqs, magnitudes, freq_range) for name, freq_range in self.bands.items()}
+
+        dominant = self.dominant(freqs, magnitudes)
+        if dominant is not None:
+            features["dominant_freq"], features["dominant_power"] = dominant
+
+        features["total_rms"] = float(np.sqrt(np.mean(magnitudes**2))) if len(magnitudes) > 0 else 0.0
+
+        if len(freqs) > 0:
+            for target_freq in self.frequencies:
+                features[f"freq_{target_freq}hz"] = float(magnitudes[np.argmin(np.abs(freqs - target_freq))])
+        return features
@@ -0,0 +1,44 @@
+"""ADC counts to physical units, after the sensor datasheets
+
+https://support.pluxbiosignals.com/wp-content/uploads/2021/11/revolution-emg-sensor-datasheet-1.pdf
+https://bitalino.com/storage/uploads/media/revolution-ecg-sensor-datasheet-revb-1.pdf
+https://bitalino.com/storage/uploads/media/revolution-eeg-sensor-datasheet-revb.pdf
+"""
+
+import numpy as np
+
+ADC_BITS = 10
+VCC = 3.3
+
+GAINS = {
+    "EMG": 1009,  # [-1.64mV, 1.64mV]
+    "ECG": 1100,  # [-1.5mV, 1.5mV]
+    "EEG": 41782  # [-39.49uV, 39.49uV]
+}
+
+# EEG unit is uV, others are mV
+UNITS = {"EEG": ("uV", 1000000)}
+DEFAULT_UNIT = ("mV", 1000)
+
+
+def unit(sensor_type):
+    """(name, volts to unit factor)"""
+    return UNITS.get(sensor_type, DEFAULT_UNIT)
+
+def sensor_range(sensor_type):
+    """Largest absolute value the sensor can report, in its unit"""
+    return 0.5 * VCC / GAINS[sensor_type] * unit(sensor_type)[1]
+
+def transfer_function(adc_values, sensor_type, out=None):
+    """Physical value of 10-bit ADC counts, written into out when given"""
+    gain = GAINS[sensor_type]
+    scale = unit(sensor_type)[1]
+
+    if out is not None:
+        # Same formula folded into adc * scale + offset, computed in place
+        np.multiply(adc_values, VCC / gain / (2**ADC_BITS) * scale, out=out)
+        np.add(out, -0.5 * VCC / gain * scale, out=out)
+        return out
+
+    measured_v = ((adc_values / (2**ADC_BITS)) - 0.5) * VCC / gain
+    return measured_v * scale
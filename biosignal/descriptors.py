@@ -0,0 +1,80 @@
+"""Spectral descriptors of several spectra at once (one row per channel)
+
+    centroid  magnitude-weighted mean frequency
+    flux      positive change of the spectrum since the previous call, on spectra
+              scaled to a sum of 1 (0: no change, 1: all energy moved to new bins)
+    rolloff   frequency under which `rolloff` of the power lies
+    flatness  geometric over arithmetic mean of the power (1: noise, ~0: tones)
+    peak      frequency of the highest bin, refined by a parabola through the
+              log magnitudes of its neighbours (a fraction of a bin)
+
+Bins under min_bin (DC by default) are left out of every descriptor.
+"""
+
+import numpy as np
+
+DESCRIPTORS = ("centroid", "flux", "rolloff", "flatness", "peak")
+
+
+class SpectralDescriptors:
+    """Descriptors of n_spectra spectra that share one frequency axis, flux from call to call"""
+
+    def __init__(self, n_spectra, rolloff=0.85, min_bin=1):
+        self.n_spectra = n_spectra
+        self.rolloff = rolloff
+        self.min_bin = min_bin
+        self.previous = None
+
+    def reset(self):
+        self.previous = None
+
+    def update(self, freqs, magnitudes):
+        """{descriptor: (n_spectra,) array} of magnitudes (n_spectra, bins), NaN for rows that are all NaN
+
+        Rows of NaN stand for channels without a spectrum this time, their flux restarts from the next one.
+        """
+        m = np.asarray(magnitudes, dtype=float)[:, self.min_bin:]
+        f = np.asarray(freqs, dtype=float)[self.min_bin:]
+        n_bins = m.shape[1]
+        nan = np.full(self.n_spectra, np.nan)
+        if n_bins < 3:
+            self.previous = None
+            return {name: nan.copy() for name in DESCRIPTORS}
+        missing = np.isnan(m[:, 0])
+        m = np.where(missing[:, None], 0, m)
+
+        total = m.sum(axis=1)
+        silent = total <= 0
+        safe_total = np.where(silent, 1, total)
+        centroid = (m @ f) / safe_total
+
+        shape = m / safe_total[:, None]
+        if self.previous is None or self.previous.shape != shape.shape:
+            flux = nan.copy()
+        else:
+            flux = np.maximum(shape - self.previous, 0).sum(axis=1)
+            flux[np.isnan(self.previous[:, 0])] = np.nan
+        self.previous = np.where((missing | silent)[:, None], np.nan, shape)
+
+        power = m * m
+        cumulative = np.cumsum(power, axis=1)
+        rolloff = f[np.argmax(cumulative >= self.rolloff * cumulative[:, -1:], axis=1)]
+
+        # Power floor so empty bins don't send the geometric mean to 0
+        floor = 1e-12 * np.maximum(power.max(axis=1, keepdims=True), 1e-300)
+        power = power + floor
+        flatness = np.exp(np.log(power).mean(axis=1)) / power.mean(axis=1)
+
+        # Parabolic interpolation of the log magnitude around the highest bin (an edge bin uses its inner neighbour)
+        rows = np.arange(self.n_spectra)
+        index = np.clip(np.argmax(m, axis=1), 1, n_bins - 2)
+        log = 0.5 * np.log(power[rows[:, None], index[:, None] + np.arange(-1, 2)])
+        left, center, right = log.T
+        curvature = left - 2 * center + right
+        offset = np.where(curvature < 0, 0.5 * (left - right) / np.where(curvature < 0, curvature, -1), 0)
+        peak = f[index] + np.clip(offset, -1, 1) * (f[1] - f[0])
+
+        result = {"centroid": centroid, "flux": flux, "rolloff": rolloff, "flatness": flatness, "peak": peak}
+        for name, values in result.items():
+            values[missing | silent] = np.nan
+        return result
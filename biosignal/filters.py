@@ -0,0 +1,101 @@
+"""Notch filters: coefficient design once, zero-phase filtering per block
+
+Designing needs scipy.signal, which takes seconds to import on small
+hosts. With a cache_path, coefficients are stored in a JSON file keyed by
+(frequency, quality factor, sampling rate) and later starts read them back
+without importing scipy. JSON keeps the float64 values exact.
+
+biquad() designs the second-order sections of the streaming stages
+(kernels.sosfilt) in closed form, without scipy.
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+def _load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(path, cache):
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(cache, f)
+        os.replace(temporary, path)
+    except OSError as e:
+        print(f"[FILTERS] Could not write the coefficient cache {path}: {e}", flush=True)
+
+def design_notches(notches, sampling_rate, cache_path=None):
+    """Notch filter coefficients for each (frequency, quality factor): ((freq, q, b, a), ...)"""
+    cache = _load_cache(cache_path) if cache_path else {}
+    designed = []
+    missing = False
+    for freq, q_factor in notches:
+        key = f"{float(freq)!r}/{float(q_factor)!r}/{float(sampling_rate)!r}"
+        if key in cache:
+            b, a = (np.array(coefficients) for coefficients in cache[key])
+        else:
+            from scipy.signal import iirnotch
+            b, a = iirnotch(freq, q_factor, sampling_rate)
+            cache[key] = [b.tolist(), a.tolist()]
+            missing = True
+        designed.append((freq, q_factor, b, a))
+    if missing and cache_path:
+        _save_cache(cache_path, cache)
+    return tuple(designed)
+
+def biquad(kind, frequency, sampling_rate, q=1 / np.sqrt(2)):
+    """Second-order "lowpass" or "highpass" section (b0 b1 b2 1 a1 a2), Butterworth for the default q"""
+    w0 = 2 * np.pi * frequency / sampling_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos = np.cos(w0)
+    if kind == "lowpass":
+        b = [(1 - cos) / 2, 1 - cos, (1 - cos) / 2]
+    elif kind == "highpass":
+        b = [(1 + cos) / 2, -(1 + cos), (1 + cos) / 2]
+    else:
+        raise ValueError(f"unknown biquad kind {kind!r}")
+    a0 = 1 + alpha
+    return np.array(b + [a0, -2 * cos, 1 - alpha]) / a0
+
+def filter_signal(signal, b, a):
+    """Zero-phase filtering with precomputed coefficients, the result has the dtype of signal
+
+    The coefficients stay float64 for float32 signals: rounded to float32, the
+    poles of a low notch (1 Hz at 1 kHz, radius 0.9999) move enough to change
+    its passband gain by about 1%.
+    """
+    if len(signal) < 6:
+        return signal
+
+    from scipy.signal import filtfilt
+    try:
+        return filtfilt(b, a, signal).astype(signal.dtype, copy=False)
+    except Exception:
+        return signal
+
+def apply_notch_filter(signal, notch_freq, quality_factor, sampling_rate):
+    """Apply a notch filter to remove specific frequency component"""
+    (freq, q_factor, b, a), = design_notches([(notch_freq, quality_factor)], sampling_rate)
+    return filter_signal(signal, b, a)
+
+
+class FilterBank:
+    """A chain of notch filters designed once"""
+
+    def __init__(self, notches, sampling_rate):
+        self.notches = list(notches)
+        self.sampling_rate = sampling_rate
+        self.filters = design_notches(self.notches, sampling_rate)
+
+    def apply(self, signal):
+        for freq, q_factor, b, a in self.filters:
+            signal = filter_signal(signal, b, a)
+        return signal
@@ -0,0 +1,255 @@
+"""Per-sample recursive kernels for streaming (chunk by chunk) processing
+
+    sosfilt          biquad cascade, direct form II transposed
+    envelope         rectified attack / release follower
+    moving_rms       RMS over the last `window` samples
+    threshold_peaks  adaptive threshold detection with a refractory period (R peaks)
+    lms              normalized LMS canceller of a reference (e.g. mains sin/cos)
+
+Every kernel takes a chunk x of shape (samples, channels), keeps its state
+in arrays owned by the caller and writes into `out`. The numba backend
+compiles them to machine code; without numba the NumPy backend loops over
+the samples with channel-wide array operations (moving_rms is fully
+vectorized). warm_up() compiles, or loads from numba's on-disk cache,
+every kernel so the first chunk doesn't pay for it.
+"""
+
+import numpy as np
+
+BACKENDS = ("numba", "numpy")
+_active = {}
+_backend = None
+
+
+# NumPy backend
+
+def _sosfilt_numpy(sos, x, zi, out):
+    for i in range(len(x)):
+        value = x[i]
+        for s in range(len(sos)):
+            b0, b1, b2, a0, a1, a2 = sos[s]
+            y = b0 * value + zi[s, :, 0]
+            zi[s, :, 0] = b1 * value - a1 * y + zi[s, :, 1]
+            zi[s, :, 1] = b2 * value - a2 * y
+            value = y
+        out[i] = value
+    return out
+
+def _envelope_numpy(x, state, attack, release, out):
+    for i in range(len(x)):
+        value = np.abs(x[i])
+        coefficient = np.where(value > state, attack, release)
+        state += coefficient * (value - state)
+        out[i] = state
+    return out
+
+def _moving_rms_numpy(x, squares, position, out):
+    window = len(squares)
+    n = len(x)
+    start = int(position[0])
+    # Squares of the last `window` samples in time order, then the new ones
+    history = np.concatenate((squares[start:], squares[:start], x * x))
+    sums = np.cumsum(history, axis=0)
+    # The window ending at new sample i covers history[i + 1:window + i + 1]
+    np.subtract(sums[window:], sums[:n], out=out)
+    np.sqrt(np.maximum(out / window, 0), out=out)
+    end = (start + n) % window
+    tail = history[-window:]
+    squares[end:] = tail[:window - end]
+    squares[:end] = tail[window - end:]
+    position[0] = end
+    return out
+
+def _threshold_peaks_numpy(x, state, refractory, out):
+    # state rows: signal level, noise level, samples left in the refractory period, peak in that period
+    signal, noise, countdown, peak = state
+    for i in range(len(x)):
+        value = x[i]
+        threshold = noise + 0.25 * (signal - noise)
+        active = countdown > 0
+        detected = ~active & (value > threshold)
+        peak[:] = np.where(active, np.maximum(peak, value), np.where(detected, value, peak))
+        ending = active & (countdown == 1)
+        signal[:] = np.where(ending, 0.125 * peak + 0.875 * signal, signal)
+        noise[:] = np.where(active | detected, noise, noise + 0.001 * (value - noise))
+        countdown[:] = np.where(detected, refractory, np.maximum(countdown - 1, 0))
+        out[i] = detected
+    return out
+
+def _lms_numpy(x, reference, weights, mu, out):
+    for i in range(len(x)):
+        r = reference[i]
+        error = x[i] - weights @ r
+        weights += (mu / (1e-12 + r @ r)) * error[:, None] * r
+        out[i] = error
+    return out
+
+
+# numba backend, compiled on first use
+
+def _numba_kernels():
+    import numba
+
+    jit = numba.njit(cache=True, nogil=True, fastmath=False)
+
+    @jit
+    def sosfilt(sos, x, zi, out):
+        for c in range(x.shape[1]):
+            for i in range(x.shape[0]):
+                value = x[i, c]
+                for s in range(sos.shape[0]):
+                    y = sos[s, 0] * value + zi[s, c, 0]
+                    zi[s, c, 0] = sos[s, 1] * value - sos[s, 4] * y + zi[s, c, 1]
+                    zi[s, c, 1] = sos[s, 2] * value - sos[s, 5] * y
+                    value = y
+                out[i, c] = value
+        return out
+
+    @jit
+    def envelope(x, state, attack, release, out):
+        for c in range(x.shape[1]):
+            level = state[c]
+            for i in range(x.shape[0]):
+                value = abs(x[i, c])
+                coefficient = attack if value > level else release
+                level += coefficient * (value - level)
+                out[i, c] = level
+            state[c] = level
+        return out
+
+    @jit
+    def moving_rms(x, squares, position, out):
+        window = squares.shape[0]
+        for c in range(x.shape[1]):
+            # Summed again every chunk so rounding errors don't accumulate
+            total = 0.0
+            for k in range(window):
+                total += squares[k, c]
+            p = position[0]
+            for i in range(x.shape[0]):
+                square = x[i, c] * x[i, c]
+                total += square - squares[p, c]
+                squares[p, c] = square
+                p = (p + 1) % window
+                out[i, c] = np.sqrt(max(total / window, 0.0))
+        position[0] = (position[0] + x.shape[0]) % window
+        return out
+
+    @jit
+    def threshold_peaks(x, state, refractory, out):
+        for c in range(x.shape[1]):
+            signal, noise, countdown, peak = state[0, c], state[1, c], state[2, c], state[3, c]
+            for i in range(x.shape[0]):
+                value = x[i, c]
+                detected = False
+                if countdown > 0:
+                    if value > peak:
+                        peak = value
+                    if countdown == 1:
+                        signal = 0.125 * peak + 0.875 * signal
+                    countdown -= 1
+                elif value > noise + 0.25 * (signal - noise):
+                    detected = True
+                    peak = value
+                    countdown = refractory
+                else:
+                    noise += 0.001 * (value - noise)
+                out[i, c] = detected
+            state[0, c], state[1, c], state[2, c], state[3, c] = signal, noise, countdown, peak
+        return out
+
+    @jit
+    def lms(x, reference, weights, mu, out):
+        taps = reference.shape[1]
+        for i in range(x.shape[0]):
+            power = 1e-12
+            for k in range(taps):
+                power += reference[i, k] * reference[i, k]
+            step = mu / power
+            for c in range(x.shape[1]):
+                estimate = 0.0
+                for k in range(taps):
+                    estimate += weights[c, k] * reference[i, k]
+                error = x[i, c] - estimate
+                for k in range(taps):
+                    weights[c, k] += step * error * reference[i, k]
+                out[i, c] = error
+        return out
+
+    return {"sosfilt": sosfilt, "envelope": envelope, "moving_rms": moving_rms,
+            "threshold_peaks": threshold_peaks, "lms": lms}
+
+_NUMPY_KERNELS = {"sosfilt": _sosfilt_numpy, "envelope": _envelope_numpy, "moving_rms": _moving_rms_numpy,
+                  "threshold_peaks": _threshold_peaks_numpy, "lms": _lms_numpy}
+
+
+def use_backend(name=None):
+    """Select "numba" or "numpy" (None: numba when it is installed), return the name selected"""
+    global _backend
+    if name not in (None,) + BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}")
+    kernels = None
+    if name in (None, "numba"):
+        try:
+            kernels = _numba_kernels()
+            name = "numba"
+        except ImportError:
+            if name == "numba":
+                raise
+    if kernels is None:
+        kernels, name = _NUMPY_KERNELS, "numpy"
+    _active.clear()
+    _active.update(kernels)
+    _backend = name
+    return name
+
+def backend():
+    if _backend is None:
+        use_backend()
+    return _backend
+
+def warm_up(n_channels=1):
+    """Run every kernel once on float64 data shaped like the stream, so numba compiles now"""
+    x = np.zeros((4, n_channels))
+    out = np.zeros_like(x)
+    sosfilt(np.array([[1.0, 0, 0, 1.0, 0, 0]]), x, np.zeros((1, n_channels, 2)), out)
+    envelope(x, np.zeros(n_channels), 0.5, 0.5, out)
+    moving_rms(x, np.zeros((4, n_channels)), np.zeros(1, dtype=np.int64), out)
+    threshold_peaks(x, np.zeros((4, n_channels)), 2, out)
+    lms(x, np.ones((4, 2)), np.zeros((n_channels, 2)), 0.01, out)
+    return backend()
+
+
+def sosfilt(sos, x, zi, out):
+    """Filter x through the sections of sos (n, 6: b0 b1 b2 a0 a1 a2, a0 = 1), zi: (sections, channels, 2)"""
+    if _backend is None:
+        use_backend()
+    return _active["sosfilt"](sos, x, zi, out)
+
+def envelope(x, state, attack, release, out):
+    """|x| followed with coefficient attack when rising and release when falling, state: (channels,)"""
+    if _backend is None:
+        use_backend()
+    return _active["envelope"](x, state, attack, release, out)
+
+def moving_rms(x, squares, position, out):
+    """RMS over len(squares) samples, squares: (window, channels) ring, position: int64 array of one"""
+    if _backend is None:
+        use_backend()
+    return _active["moving_rms"](x, squares, position, out)
+
+def threshold_peaks(x, state, refractory, out):
+    """1 where x first crosses noise + (signal - noise) / 4, then nothing for refractory samples
+
+    state: (4, channels) zeros at start (signal level, noise level, countdown, peak), levels
+    are learned from the peaks and from the samples in between.
+    """
+    if _backend is None:
+        use_backend()
+    return _active["threshold_peaks"](x, state, refractory, out)
+
+def lms(x, reference, weights, mu, out):
+    """x minus its normalized-LMS fit on reference (samples, taps), weights: (channels, taps)"""
+    if _backend is None:
+        use_backend()
+    return _active["lms"](x, reference, weights, mu, out)
@@ -0,0 +1,35 @@
+"""Spectral features to Pure Data over OSC"""
+
+from .bands import BandExtractor
+
+
+class Sender:
+    """Sends the BandExtractor features of each spectrum as <prefix>/<feature name> messages"""
+
+    def __init__(self, ip="127.0.0.1", port=8000, prefix="/emg", extractor=None):
+        from pythonosc import udp_client
+        self.osc_client = udp_client.SimpleUDPClient(ip, port)
+        self.prefix = prefix
+        self.extractor = extractor or BandExtractor()
+
+    def send_data_to_puredata(self, freqs, magnitudes):
+        """Send frequency band data to Pure Data via OSC"""
+        try:
+            for name, value in self.extractor.extract(freqs, magnitudes).items():
+                self.osc_client.send_message(f"{self.prefix}/{name}", value)
+        except Exception as e:
+            print(f"Error sending OSC data: {e}")
+
+    def send_message(self, address, value):
+        self.osc_client.send_message(address, value)
+
+    def print_osc_info(self, ip, port):
+        """Print OSC configuration information"""
+        print(f"OSC Target: {ip}:{port}")
+        print("Pure Data OSC messages:")
+        for band_name, freq_range in self.extractor.bands.items():
+            print(f"  {self.prefix}/{band_name} - {freq_range[0]}-{freq_range[1]}Hz")
+        print(f"  {self.prefix}/dominant_freq - Dominant frequency")
+        print(f"  {self.prefix}/dominant_power - Dominant frequency power")
+        print(f"  {self.prefix}/total_rms - Total RMS power")
+        print(f"  {self.prefix}/freq_XXhz - Specific frequency amplitudes")
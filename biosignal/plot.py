@@ -0,0 +1,97 @@
+"""Real-time matplotlib view of one channel: signal, spectrum, filtered spectrum"""
+
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from .convert import sensor_range, unit
+
+
+class Graphs:
+    """Three stacked plots, updated from the caller's loop"""
+
+    def __init__(self, sensor_type, buffer_size=1000, sampling_rate=1000, notches=(), pause=0.001):
+        self.sensor_type = sensor_type
+        self.buffer_size = buffer_size
+        self.sampling_rate = sampling_rate
+        self.pause = pause
+        self.unit = unit(sensor_type)[0]
+        self.limit = sensor_range(sensor_type)
+        self.start_time = time.time()
+        notch_text = ", ".join(f"{freq:g}Hz" for freq, q_factor in notches) or "no"
+        self._setup_plot(notch_text)
+
+    def _setup_plot(self, notch_text):
+        """Initialize matplotlib plots"""
+        plt.ion()
+        self.fig, (self.ax2, self.ax3, self.ax4) = plt.subplots(3, 1, figsize=(12, 14))
+
+        self.line2, = self.ax2.plot([], [], 'r-', label=f'{self.sensor_type} Signal')
+        self.ax2.set_xlim(0, self.buffer_size)
+        self.ax2.set_ylim(-self.limit, self.limit)
+        self.ax2.set_xlabel('Sample Index')
+        self.ax2.set_ylabel(f'{self.sensor_type} Signal ({self.unit})')
+        self.ax2.set_title(f'{self.sensor_type} Signal (Latest {self.buffer_size} samples)')
+        self.ax2.grid(True)
+        self.ax2.legend()
+
+        self.line3, = self.ax3.plot([], [], 'g-', label='Original FFT')
+        self.ax3.set_xlim(0, self.sampling_rate // 2)
+        self.ax3.set_ylim(0, 1)
+        self.ax3.set_xlabel('Frequency (Hz)')
+        self.ax3.set_ylabel('Magnitude')
+        self.ax3.set_title(f'Real-time FFT of {self.sensor_type} Signal')
+        self.ax3.grid(True)
+        self.ax3.legend()
+
+        self.line4, = self.ax4.plot([], [], 'b-', label=f'Filtered FFT ({notch_text} notch)')
+        self.ax4.set_xlim(0, self.sampling_rate // 2)
+        self.ax4.set_ylim(0, 1)
+        self.ax4.set_xlabel('Frequency (Hz)')
+        self.ax4.set_ylabel('Magnitude')
+        self.ax4.set_title('FFT after notch filters - Sending to Pure Data')
+        self.ax4.grid(True)
+        self.ax4.legend()
+
+        plt.tight_layout()
+
+    @staticmethod
+    def _show_spectrum(line, ax, freqs, magnitudes, label, dominant):
+        if len(freqs) == 0:
+            return
+        line.set_data(freqs, magnitudes)
+        ax.set_xlim(0, min(500, freqs[-1]))
+        if np.max(magnitudes) > 0:
+            ax.set_ylim(0, np.max(magnitudes) * 1.1)
+        if dominant is not None:
+            ax.set_title(f'{label} - Dominant: {dominant[0]:.1f} Hz')
+
+    def update_plot(self, signal, spectrum, filtered_spectrum, dominant=None, filtered_dominant=None):
+        """Draw the signal and both (frequencies, magnitudes) spectra, dominant peaks as (frequency, magnitude)"""
+        if len(signal) == 0:
+            return
+
+        self.line2.set_data(np.arange(len(signal)), signal)
+        self.ax2.set_xlim(0, len(signal))
+        data_range = np.max(signal) - np.min(signal)
+        margin = max(0.1, data_range * 0.1)
+        self.ax2.set_ylim(max(-self.limit, np.min(signal) - margin), min(self.limit, np.max(signal) + margin))
+
+        self._show_spectrum(self.line3, self.ax3, *spectrum, 'Original FFT', dominant)
+        self._show_spectrum(self.line4, self.ax4, *filtered_spectrum, 'Filtered FFT - OSC→PD', filtered_dominant)
+
+        elapsed_time = time.time() - self.start_time
+        self.ax2.set_title(f'{self.sensor_type} Signal - Range: [{np.min(signal):.2f}, {np.max(signal):.2f}] {self.unit} - {elapsed_time:.1f}s')
+
+        plt.draw()
+        plt.pause(self.pause)
+
+    def is_open(self):
+        """Check if plot window is still open"""
+        return bool(plt.get_fignums())
+
+    def close(self):
+        """Close the plot"""
+        plt.ioff()
+        plt.show()
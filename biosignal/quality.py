@@ -0,0 +1,149 @@
+"""Signal quality of every channel, updated with each chunk of raw ADC values
+
+    clipping   share of samples at 0 or the top of the ADC (smoothed over ~1 s)
+    flatline   the values stayed within flat_tolerance counts for flat_seconds
+    artifact   a chunk whose variance jumped spike_factor times over the running
+               variance (motion, electrode pop), held for artifact_hold seconds.
+               The running variance is floored at flat_tolerance^2, and spikes
+               lasting artifact_hold are a new level (an electrode connected,
+               a louder signal): the variance restarts from theirs
+    mains      share of the signal power in the mains sinusoid, from the last
+               spectrum window (mains_ratio)
+
+Each check gives a quality between 0 and 1; the score of a channel is the
+lowest of them, and a channel under bad_score is bad.
+"""
+
+import numpy as np
+
+from .convert import ADC_BITS
+from .spectrum import fft_window
+
+# Hann-windowed complex exponential per (length, sampling rate, frequency)
+_kernels = {}
+
+
+def adc_top(port):
+    """Largest ADC value of an analog port (A5 and A6 are 6-bit when six channels are acquired)"""
+    return 2**ADC_BITS - 1 if port <= 4 else 63
+
+def mains_ratio(signal, sampling_rate, mains_frequency=50):
+    """Share of the variance of signal taken by a sinusoid at mains_frequency (0..1)
+
+    Projects the Hann-windowed signal on the mains frequency only, the bin
+    of the spectrum window without computing the whole transform.
+    """
+    n_samples = len(signal)
+    if n_samples < 2:
+        return 0.0
+    key = (n_samples, sampling_rate, mains_frequency)
+    kernel = _kernels.get(key)
+    if kernel is None:
+        window, freqs = fft_window(n_samples, sampling_rate)
+        phase = np.exp(-2j * np.pi * mains_frequency * np.arange(n_samples) / sampling_rate)
+        kernel = _kernels.setdefault(key, (window * phase / np.sum(window)))
+    variance = np.var(signal)
+    if variance <= 0:
+        return 0.0
+    # Amplitude of the sinusoid: twice the normalized bin, its power: amplitude^2 / 2
+    amplitude = 2 * abs(np.dot(signal - np.mean(signal), kernel))
+    return min(1.0, amplitude * amplitude / 2 / variance)
+
+
+class QualityAnalyzer:
+    """Quality of n channels from chunks of raw ADC values, shape (samples, channels)
+
+    tops: largest ADC value of each channel (adc_top)
+    """
+
+    def __init__(self, tops, sampling_rate, flat_seconds=0.5, flat_tolerance=2, spike_factor=10.0,
+                 artifact_hold=0.5, clip_limit=0.05, mains_limit=0.8, smoothing_seconds=1.0,
+                 variance_seconds=5.0, bad_score=0.5):
+        self.tops = np.asarray(tops, dtype=float)
+        self.sampling_rate = sampling_rate
+        self.flat_samples = flat_seconds * sampling_rate
+        self.flat_tolerance = flat_tolerance
+        self.spike_factor = spike_factor
+        self.artifact_samples = artifact_hold * sampling_rate
+        self.clip_limit = clip_limit
+        self.mains_limit = mains_limit
+        self.smoothing_samples = smoothing_seconds * sampling_rate
+        self.variance_samples = variance_seconds * sampling_rate
+        self.bad_score = bad_score
+        n_channels = len(self.tops)
+        self.clipping = np.zeros(n_channels)
+        self.flat_run = np.zeros(n_channels)
+        self.flat_low = np.zeros(n_channels)
+        self.flat_high = np.zeros(n_channels)
+        self.variance = np.full(n_channels, np.nan)
+        self.since_artifact = np.full(n_channels, np.inf)
+        self.spike_run = np.zeros(n_channels)
+        self.spike_energy = np.zeros(n_channels)
+        self.artifacts = np.zeros(n_channels, dtype=np.int64)
+        self.mains = np.zeros(n_channels)
+        self.scores = np.ones(n_channels)
+
+    def update(self, raw):
+        """Add a chunk, (samples, channels) ADC values, and refresh the scores"""
+        n = len(raw)
+        if n == 0:
+            return self.scores
+        low = raw.min(axis=0)
+        high = raw.max(axis=0)
+
+        clipped = np.count_nonzero((raw <= 0) | (raw >= self.tops), axis=0) / n
+        self.clipping += (1 - np.exp(-n / self.smoothing_samples)) * (clipped - self.clipping)
+
+        # Extend the flat run while the values stay in one flat_tolerance band, else restart from this chunk
+        run_low = np.minimum(self.flat_low, low)
+        run_high = np.maximum(self.flat_high, high)
+        extends = (self.flat_run > 0) & (run_high - run_low <= self.flat_tolerance)
+        flat_chunk = high - low <= self.flat_tolerance
+        self.flat_run = np.where(extends, self.flat_run + n, np.where(flat_chunk, n, 0))
+        self.flat_low = np.where(extends, run_low, low)
+        self.flat_high = np.where(extends, run_high, high)
+
+        variance = raw.var(axis=0)
+        # A flat start doesn't make every later chunk a spike
+        spikes = variance > self.spike_factor * np.maximum(self.variance, self.flat_tolerance ** 2)
+        self.artifacts += spikes
+        self.since_artifact = np.where(spikes, 0, self.since_artifact + n)
+        self.spike_run = np.where(spikes, self.spike_run + n, 0)
+        self.spike_energy = np.where(spikes, self.spike_energy + n * variance, 0)
+        rebaseline = self.spike_run >= self.artifact_samples
+        # Artifacts are kept out of the running variance, unless they last long enough to be the new level
+        alpha = 1 - np.exp(-n / self.variance_samples)
+        running = np.where(spikes, self.variance, self.variance + alpha * (variance - self.variance))
+        self.variance = np.where(np.isnan(self.variance), variance,
+                                 np.where(rebaseline, self.spike_energy / np.maximum(self.spike_run, 1), running))
+        self.spike_run[rebaseline] = 0
+        self.spike_energy[rebaseline] = 0
+
+        self.scores = self.score()
+        return self.scores
+
+    def set_mains(self, channel, ratio):
+        """Record the mains_ratio of a channel, measured on its spectrum window"""
+        self.mains[channel] = ratio
+
+    @property
+    def flat(self):
+        return self.flat_run >= self.flat_samples
+
+    @property
+    def artifact(self):
+        return self.since_artifact < self.artifact_samples
+
+    def score(self):
+        clipping = np.clip(1 - self.clipping / self.clip_limit, 0, 1)
+        mains = np.clip((1 - self.mains) / (1 - self.mains_limit), 0, 1)
+        flat_or_artifact = np.where(self.flat | self.artifact, 0.0, 1.0)
+        return np.minimum(np.minimum(clipping, mains), flat_or_artifact)
+
+    def bad(self, channel):
+        return self.scores[channel] < self.bad_score
+
+    def report(self, channel):
+        """[score, clipping ratio, flatline, artifact, mains ratio] of a channel, as sent over OSC"""
+        return [float(self.scores[channel]), float(self.clipping[channel]), float(self.flat[channel]),
+                float(self.artifact[channel]), float(self.mains[channel])]
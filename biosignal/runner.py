@@ -0,0 +1,101 @@
+"""Single channel acquire / filter / analyse / send loop, the body of the debug scripts"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .bands import FREQUENCY_BANDS, SPECIFIC_FREQUENCIES, BandExtractor
+from .convert import transfer_function
+from .filters import FilterBank
+from .spectrum import compute_fft
+
+
+def run(sensor_type, channel, mac="88:6B:0F:D9:19:B0", buffer_size=1000, sampling_rate=1000, read_chunk_size=10,
+        osc_ip="127.0.0.1", osc_port=8000, osc_prefix="/emg", notches=((50, 30), (1, 20)), plot=True,
+        send_interval=1, bands=FREQUENCY_BANDS, frequencies=SPECIFIC_FREQUENCIES, min_bin=1, latest_amp_address=None):
+    """Acquire one analog channel (0-based), plot it (matplotlib only when plot=True) and send its spectral features
+
+    send_interval:       send the features every n spectra
+    latest_amp_address:  also send the smallest absolute value of the last 100 samples there
+    """
+    from bitalino import BITalino
+    from .osc import Sender
+
+    extractor = BandExtractor(bands, frequencies, min_bin)
+    sender = Sender(osc_ip, osc_port, osc_prefix, extractor)
+    bank = FilterBank(notches, sampling_rate)
+    graphs = None
+    if plot:
+        from .plot import Graphs
+        graphs = Graphs(sensor_type, buffer_size, sampling_rate, notches)
+
+    try:
+        device = BITalino(mac)
+        print("Connected to BITalino")
+        device.start(sampling_rate, [channel])
+        print("Device started")
+    except Exception as e:
+        print(f"Error connecting to BITalino: {e}")
+        return
+
+    print("Starting real-time plotting and OSC transmission to Pure Data..." if plot else "Starting OSC transmission to Pure Data...")
+    sender.print_osc_info(osc_ip, osc_port)
+
+    buffer = deque(maxlen=buffer_size)
+    running = True
+
+    def data_acquisition():
+        """Thread function for continuous data acquisition"""
+        while running:
+            try:
+                new_samples = device.read(read_chunk_size)
+                buffer.extend(transfer_function(new_samples[:, 5], sensor_type))
+            except Exception as e:
+                if running:
+                    print(f"Error reading data: {e}")
+                break
+
+    data_thread = threading.Thread(target=data_acquisition, daemon=True)
+    data_thread.start()
+
+    spectra = 0
+    try:
+        while data_thread.is_alive():
+            if len(buffer) <= 10:
+                time.sleep(0.01)
+                continue
+
+            signal = np.array(buffer)
+            filtered = bank.apply(signal)
+            filtered_spectrum = compute_fft(filtered, sampling_rate)
+
+            spectra += 1
+            if spectra % send_interval == 0:
+                sender.send_data_to_puredata(*filtered_spectrum)
+                if latest_amp_address is not None:
+                    sender.send_message(latest_amp_address, float(np.min(np.abs(signal[-100:]))))
+
+            if graphs is None:
+                time.sleep(0.001)
+                continue
+            spectrum = compute_fft(signal, sampling_rate)
+            graphs.update_plot(signal, spectrum, filtered_spectrum, extractor.dominant(*spectrum), extractor.dominant(*filtered_spectrum))
+            if not graphs.is_open():
+                break
+
+    except KeyboardInterrupt:
+        print("\nStopping acquisition...")
+    finally:
+        running = False
+        print("Stopping device...")
+        try:
+            device.stop()
+            device.close()
+        except Exception:
+            pass
+        if graphs is not None:
+            graphs.close()
+
+    print("Acquisition complete")
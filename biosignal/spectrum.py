@@ -0,0 +1,36 @@
+"""Hann-windowed magnitude spectra
+
+float32 signals are transformed in single precision (complex64 spectra,
+float32 magnitudes), anything else in double precision.
+"""
+
+import numpy as np
+
+# (window, frequency axis) per (length, sampling rate, window dtype)
+_windows = {}
+
+
+def fft_window(n_samples, sampling_rate, dtype=np.float64):
+    key = (n_samples, sampling_rate, np.dtype(dtype))
+    window = _windows.get(key)
+    if window is None:
+        window = _windows.setdefault(key, (np.hanning(n_samples).astype(dtype),
+                                           np.fft.rfftfreq(n_samples, 1 / sampling_rate)[:n_samples // 2]))
+    return window
+
+def compute_fft(signal, sampling_rate, size=None, normalize=False):
+    """(frequencies, magnitudes) of the last `size` samples (all when None), n/2 bins, scaled to a peak of 1 if normalize"""
+    if len(signal) < 2:
+        return np.array([]), np.array([])
+
+    data = signal[-size:] if size is not None and len(signal) >= size else signal
+    n_samples = len(data)
+    window, freqs = fft_window(n_samples, sampling_rate, np.float32 if data.dtype == np.float32 else np.float64)
+    # Real input: the one-sided transform gives the same first n/2 bins for half the work
+    magnitudes = np.abs(np.fft.rfft(data * window)[:n_samples // 2])
+
+    if normalize:
+        peak = np.max(magnitudes)
+        if peak > 0:
+            np.divide(magnitudes, peak, out=magnitudes)
+    return freqs, magnitudes
@@ -0,0 +1,97 @@
+"""Sample-by-sample features of every channel, updated chunk by chunk (kernels.py)
+
+    mains     a normalized LMS canceller on a sin/cos reference at the mains
+              frequency removes the hum (tracks its drift, unlike a fixed notch)
+    envelope  highpass, then a rectified attack / release follower
+    rms       moving RMS of the highpassed signal
+    bpm       ECG channels only: 5-15 Hz band, squared derivative and an
+              adaptive threshold find the R peaks, bpm from the last interval
+
+Chunks are written into `input` (one column per channel) and processed by
+update(n); the latest values are in envelope, rms and bpm (NaN for non-ECG
+channels and before two beats).
+"""
+
+import numpy as np
+
+from . import kernels
+from .filters import biquad
+
+
+class StreamingFeatures:
+    """Envelope, RMS and heart rate of channels with the given sensor types"""
+
+    def __init__(self, sensor_types, sampling_rate, max_chunk, mains_frequency=50, mains_step=0.01,
+                 highpass=20, attack=0.01, release=0.1, rms_window=0.1, refractory=0.25):
+        n_channels = len(sensor_types)
+        self.sampling_rate = sampling_rate
+        self.mains_frequency = mains_frequency
+        self.mains_step = mains_step
+        self.input = np.zeros((max_chunk, n_channels))
+        self.work = np.zeros((max_chunk, n_channels))
+        self.output = np.zeros((max_chunk, n_channels))
+        self.sample_count = 0
+
+        self.mains_weights = np.zeros((n_channels, 2))
+        self.reference = np.zeros((max_chunk, 2))
+        self.highpass = biquad("highpass", highpass, sampling_rate)[None]
+        self.highpass_state = np.zeros((1, n_channels, 2))
+        # Time constants (seconds) to per-sample coefficients
+        self.attack = 1 - np.exp(-1 / (attack * sampling_rate))
+        self.release = 1 - np.exp(-1 / (release * sampling_rate))
+        self.envelope_state = np.zeros(n_channels)
+        self.squares = np.zeros((max(1, int(rms_window * sampling_rate)), n_channels))
+        self.rms_position = np.zeros(1, dtype=np.int64)
+        self.envelope = np.zeros(n_channels)
+        self.rms = np.zeros(n_channels)
+
+        self.ecg = np.array([channel for channel, sensor_type in enumerate(sensor_types) if sensor_type == "ECG"], dtype=np.int64)
+        n_ecg = len(self.ecg)
+        self.qrs_band = np.array([biquad("highpass", 5, sampling_rate), biquad("lowpass", 15, sampling_rate)])
+        self.qrs_state = np.zeros((2, n_ecg, 2))
+        self.qrs = np.zeros((max_chunk, n_ecg))
+        self.qrs_previous = np.zeros(n_ecg)
+        self.peaks_state = np.zeros((4, n_ecg))
+        self.peaks = np.zeros((max_chunk, n_ecg))
+        self.refractory = int(refractory * sampling_rate)
+        self.last_beat = np.full(n_ecg, -1)
+        self.beats = np.zeros(n_ecg, dtype=np.int64)
+        self.bpm = np.full(n_channels, np.nan)
+
+    def update(self, n):
+        """Process the first n rows of input"""
+        if n == 0:
+            return
+        x = self.input[:n]
+        work = self.work[:n]
+        output = self.output[:n]
+
+        phase = 2 * np.pi * self.mains_frequency / self.sampling_rate * (self.sample_count + np.arange(n))
+        np.sin(phase, out=self.reference[:n, 0])
+        np.cos(phase, out=self.reference[:n, 1])
+        kernels.lms(x, self.reference[:n], self.mains_weights, self.mains_step, work)
+
+        if len(self.ecg):
+            self._beats(work[:, self.ecg], n)
+
+        kernels.sosfilt(self.highpass, work, self.highpass_state, work)
+        self.rms[:] = kernels.moving_rms(work, self.squares, self.rms_position, output)[-1]
+        self.envelope[:] = kernels.envelope(work, self.envelope_state, self.attack, self.release, output)[-1]
+        self.sample_count += n
+
+    def _beats(self, ecg, n):
+        qrs = self.qrs[:n]
+        kernels.sosfilt(self.qrs_band, ecg, self.qrs_state, qrs)
+        # Squared derivative, sharpest on the QRS complex
+        previous = qrs[-1].copy()
+        qrs[1:] = np.square(qrs[1:] - qrs[:-1])
+        qrs[0] = np.square(qrs[0] - self.qrs_previous)
+        self.qrs_previous = previous
+        peaks = kernels.threshold_peaks(qrs, self.peaks_state, self.refractory, self.peaks[:n])
+        for row, index in zip(*np.nonzero(peaks)):
+            sample = self.sample_count + row
+            interval = sample - self.last_beat[index]
+            if self.last_beat[index] >= 0 and interval < 2 * self.sampling_rate:
+                self.bpm[self.ecg[index]] = 60 * self.sampling_rate / interval
+            self.last_beat[index] = sample
+            self.beats[index] += 1
@@ -0,0 +1,104 @@
+"""Cross-channel coherence and zero-lag correlation from one multichannel STFT
+
+push() appends chunks of every channel to a shared ring; update() takes a
+Hann-windowed segment each `hop` samples, transforms all channels at once
+and folds the outer product of the spectra into an exponentially averaged
+cross-spectral density matrix (bins, channels, channels), one einsum per
+hop. The matrices are read from that average:
+
+    coherence    per band, |sum Sxy|^2 / (sum Sxx * sum Syy) over the bins of the band
+    correlation  zero-lag correlation, the real part of the CSD summed over
+                 all bins (Parseval), without DC and the excluded ranges
+
+Both are unchanged by a gain or offset per channel, so raw ADC values can
+be pushed. The ranges in `exclude` (mains hum, common to every electrode),
+widened by the main lobe of the window, are left out of both.
+"""
+
+import threading
+import numpy as np
+
+from history import RingBuffer
+
+
+class CoherenceAnalyzer:
+    """Band coherence and correlation matrices of n channels
+
+    bands: {name: (low, high)} in Hz
+    smoothing: time constant of the CSD average in seconds
+    dtype: of the ring and segments, float32 gives complex64 spectra and CSD
+    """
+
+    def __init__(self, n_channels, sampling_rate, bands, segment=256, hop=128, smoothing=2.0,
+                 exclude=(), buffer_seconds=2.0, dtype=np.float64):
+        self.n_channels = n_channels
+        self.segment = segment
+        self.hop = hop
+        self.alpha = 1 - np.exp(-hop / (smoothing * sampling_rate))
+        self.ring = RingBuffer(max(segment, int(buffer_seconds * sampling_rate)), width=n_channels, dtype=dtype)
+        self.window = np.hanning(segment).astype(dtype)[:, None]
+        self.freqs = np.fft.rfftfreq(segment, 1 / sampling_rate)
+        keep = self.freqs > 0
+        # A sinusoid spreads over the main lobe of the window, two bins on each side
+        lobe = 2 * sampling_rate / segment
+        for low, high in exclude:
+            keep &= (self.freqs < low - lobe) | (self.freqs > high + lobe)
+        self.keep = keep
+        self.bands = {name: keep & (self.freqs >= low) & (self.freqs <= high) for name, (low, high) in bands.items()}
+        self.csd = np.zeros((len(self.freqs), n_channels, n_channels), dtype=np.result_type(dtype, np.complex64))
+        self.frame = np.zeros((segment, n_channels), dtype=dtype)
+        self.next_end = segment
+        self.frames = 0
+        self.lock = threading.Lock()
+
+    def push(self, chunk):
+        """Append (samples, channels) values"""
+        self.ring.extend(chunk)
+
+    def update(self):
+        """Fold every complete hop into the average, return the number of segments processed"""
+        processed = 0
+        with self.lock:
+            while self.next_end <= self.ring.write_count:
+                if not self.ring.read_into(self.next_end - self.segment, self.frame):
+                    # Fell more than the ring behind: continue from the newest segment
+                    self.next_end = self.ring.write_count
+                    continue
+                self.next_end += self.hop
+                spectra = np.fft.rfft((self.frame - self.frame.mean(axis=0)) * self.window, axis=0)
+                cross = np.einsum("fi,fj->fij", spectra, spectra.conj())
+                if self.frames == 0:
+                    self.csd[:] = cross
+                else:
+                    self.csd += self.alpha * (cross - self.csd)
+                self.frames += 1
+                processed += 1
+        return processed
+
+    @staticmethod
+    def _normalize(cross):
+        power = np.real(np.diagonal(cross)).copy()
+        scale = np.sqrt(np.outer(power, power))
+        scale[scale == 0] = np.inf
+        return cross, scale
+
+    def coherence(self):
+        """{band: (channels, channels) magnitude-squared coherence, 0..1}"""
+        with self.lock:
+            result = {}
+            for name, mask in self.bands.items():
+                cross, scale = self._normalize(self.csd[mask].sum(axis=0))
+                result[name] = np.abs(cross) ** 2 / scale ** 2
+            return result
+
+    def correlation(self):
+        """(channels, channels) zero-lag correlation, -1..1"""
+        with self.lock:
+            cross, scale = self._normalize(self.csd[self.keep].real.sum(axis=0))
+            return cross / scale
+
+    def reset(self):
+        with self.lock:
+            self.csd[:] = 0
+            self.frames = 0
+            self.next_end = self.ring.write_count + self.segment
@@ -0,0 +1,64 @@
+"""Inbound OSC control channel
+
+ControlServer maps OSC addresses to handlers on its own thread. Handlers do
+the expensive work (validation, filter design) right away, off the hot
+path, and stage the result in a PendingConfig. The acquisition loop takes
+the staged changes between two chunks and applies them all at once.
+"""
+
+import threading
+
+
+class PendingConfig:
+    """Changes staged by control handlers, waiting to be applied between chunks"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.changes = {}
+
+    def stage(self, **changes):
+        with self.lock:
+            self.changes.update(changes)
+
+    def take(self):
+        """Return and clear every staged change"""
+        with self.lock:
+            changes, self.changes = self.changes, {}
+        return changes
+
+
+class ControlServer:
+    """OSC/UDP server calling handler(*args) for each mapped address"""
+
+    def __init__(self, ip, port, handlers):
+        from pythonosc import dispatcher, osc_server
+        osc_dispatcher = dispatcher.Dispatcher()
+        for address, handler in handlers.items():
+            osc_dispatcher.map(address, self._wrap(handler))
+        osc_dispatcher.set_default_handler(self._unknown)
+        self.server = osc_server.ThreadingOSCUDPServer((ip, port), osc_dispatcher)
+        self.thread = None
+
+    @staticmethod
+    def _wrap(handler):
+        def handle(address, *args):
+            try:
+                handler(*args)
+                print(f"[CONTROL] {address} {list(args)} staged", flush=True)
+            except Exception as e:
+                print(f"[CONTROL] Rejected {address} {list(args)}: {e}", flush=True)
+        return handle
+
+    @staticmethod
+    def _unknown(address, *args):
+        print(f"[CONTROL] Unknown address {address}", flush=True)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="control", daemon=True)
+        self.thread.start()
+        print(f"[CONTROL] Listening on {self.server.server_address[0]}:{self.server.server_address[1]}", flush=True)
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
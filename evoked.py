@@ -0,0 +1,156 @@
+"""Trigger-locked averaging (evoked responses, ERPs)
+
+EvokedAverager finds edges on the BITalino digital columns (1-4 of a read
+chunk), each mapped to a condition, and once the post-trigger part of the
+window has been acquired copies the epoch of every port out of its ring.
+Each (condition, port) keeps a running mean and variance (Welford), so an
+event costs O(epoch length) whatever the number of events averaged.
+
+Sample indexes are counted from the first chunk passed to detect(); rings
+must receive the same chunks, detect() being called after they were
+written.
+"""
+
+import threading
+import numpy as np
+
+EDGES = ("rising", "falling", "both")
+
+
+class RunningAverage:
+    """Mean and variance of equal-length epochs, updated one epoch at a time"""
+
+    def __init__(self, length):
+        self.count = 0
+        self.mean = np.zeros(length)
+        self.m2 = np.zeros(length)
+        self.delta = np.zeros(length)
+
+    def add(self, epoch):
+        self.count += 1
+        np.subtract(epoch, self.mean, out=self.delta)
+        self.mean += self.delta / self.count
+        # m2 += delta * (epoch - new mean)
+        self.m2 += self.delta * (epoch - self.mean)
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return np.zeros_like(self.m2)
+        return self.m2 / (self.count - 1)
+
+
+class EvokedAverager:
+    """Running averages of the ports around edges of the digital inputs
+
+    conditions: {digital column (1-4): condition name}, several columns may share a name
+    window: (start, end) in seconds around the edge, e.g. (-0.2, 0.8)
+    refractory: edges on a column closer than this to its previous event are ignored (button bounce)
+    baseline: subtract the mean of the pre-trigger part from each epoch
+    """
+
+    def __init__(self, conditions, sampling_rate, window=(-0.2, 0.8), edge="rising", refractory=0.05, baseline=True):
+        if edge not in EDGES:
+            raise ValueError(f"edge must be one of {EDGES}")
+        self.conditions = dict(conditions)
+        self.columns = np.array(sorted(self.conditions))
+        self.sampling_rate = sampling_rate
+        self.pre = int(round(-window[0] * sampling_rate))
+        self.length = int(round(window[1] * sampling_rate)) + self.pre
+        self.edge = edge
+        self.refractory = int(refractory * sampling_rate)
+        self.baseline = baseline and self.pre > 0
+        self.sample_count = 0
+        self.previous = None
+        self.last_event = {column: -self.refractory - 1 for column in self.columns}
+        self.pending = []
+        self.averages = {}
+        self.dropped = 0
+        self.epoch = np.zeros(self.length)
+        self.lock = threading.Lock()
+
+    @property
+    def times(self):
+        """Time of each epoch sample relative to the trigger, in seconds"""
+        return (np.arange(self.length) - self.pre) / self.sampling_rate
+
+    def detect(self, digital):
+        """Queue the edges of a chunk, digital: (samples, 4) values of columns 1-4; returns the new event count"""
+        n = len(digital)
+        if n == 0 or len(self.columns) == 0:
+            self.sample_count += n
+            return 0
+        high = digital[:, self.columns - 1] > 0.5
+        previous = high[:1] if self.previous is None else self.previous
+        self.previous = high[-1:].copy()
+        rising = high & ~np.concatenate((previous, high[:-1]))
+        falling = ~high & np.concatenate((previous, high[:-1]))
+        edges = {"rising": rising, "falling": falling, "both": rising | falling}[self.edge]
+
+        found = 0
+        rows, indexes = np.nonzero(edges)
+        with self.lock:
+            for row, index in zip(rows, indexes):
+                column = int(self.columns[index])
+                sample = self.sample_count + int(row)
+                if sample - self.last_event[column] <= self.refractory:
+                    continue
+                self.last_event[column] = sample
+                self.pending.append((sample, self.conditions[column]))
+                found += 1
+        self.sample_count += n
+        return found
+
+    def collect(self, rings):
+        """Average the pending events whose window is complete, rings: {port: RingBuffer} indexed like detect()'s samples
+
+        Returns the (condition, port) pairs updated.
+        """
+        updated = []
+        with self.lock:
+            while self.pending and self.pending[0][0] - self.pre + self.length <= self.sample_count:
+                sample, condition = self.pending.pop(0)
+                for port, ring in rings.items():
+                    if not ring.read_into(sample - self.pre, self.epoch):
+                        self.dropped += 1
+                        continue
+                    if self.baseline:
+                        self.epoch -= self.epoch[:self.pre].mean()
+                    average = self.averages.get((condition, port))
+                    if average is None:
+                        average = self.averages[(condition, port)] = RunningAverage(self.length)
+                    average.add(self.epoch)
+                    updated.append((condition, port))
+        return updated
+
+    def average(self, condition, port):
+        """(mean, standard deviation, count) of a condition on a port, None before its first epoch"""
+        with self.lock:
+            average = self.averages.get((condition, port))
+            if average is None:
+                return None
+            return average.mean.copy(), np.sqrt(average.variance), average.count
+
+    def reset(self):
+        """Forget the averages and the pending events"""
+        with self.lock:
+            self.averages = {}
+            self.pending = []
+            self.dropped = 0
+
+    def reset_port(self, port):
+        """Forget the averages of one port (its unit changed)"""
+        with self.lock:
+            for key in [key for key in self.averages if key[1] == port]:
+                del self.averages[key]
+
+    def save(self, path):
+        """Write times plus <condition>_<port>_{mean,std,count} arrays to an .npz file"""
+        arrays = {"times": self.times}
+        with self.lock:
+            for (condition, port), average in sorted(self.averages.items()):
+                arrays[f"{condition}_{port}_mean"] = average.mean
+                arrays[f"{condition}_{port}_std"] = np.sqrt(average.variance)
+                arrays[f"{condition}_{port}_count"] = np.array(average.count)
+            np.savez(path, **arrays)
+        return len(arrays) - 1
@@ -0,0 +1,268 @@
+"""Columnar export of sessions to Parquet, Arrow IPC or HDF5
+
+Rows are buffered per table (samples, spectra, features) in preallocated column
+arrays and written as one row group every row_group_size rows from a
+background thread, so memory stays bounded while acquiring. The hand-off
+never blocks the caller: when the writer falls behind by max_pending_groups
+row groups the new group is dropped and counted in dropped_groups. Per-channel
+metadata (sensor type, gain, unit) is stored with every table.
+
+pyarrow is only needed for Parquet/Arrow and h5py only for HDF5.
+"""
+
+import json
+import os
+import queue
+import threading
+import numpy as np
+from biosignal.convert import unit
+
+FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".h5": "hdf5", ".hdf5": "hdf5"}
+
+
+def channel_metadata(sensors, gains):
+    """Per-channel description stored alongside the data"""
+    return {
+        f"{sensor_type}{port}": {
+            "port": port,
+            "sensor": sensor_type,
+            "gain": gains[sensor_type],
+            "unit": unit(sensor_type)[0],
+        }
+        for port, sensor_type in sensors
+    }
+
+
+class ParquetBackend:
+    """One Parquet (or Arrow IPC) file per table, one row group per flush"""
+
+    def __init__(self, path, ipc=False):
+        import pyarrow
+        import pyarrow.parquet
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.ipc = ipc
+        self.writers = {}
+
+    def table_path(self, name):
+        if name == "samples":
+            return self.path
+        stem, ext = os.path.splitext(self.path)
+        return f"{stem}.{name}{ext}"
+
+    def open_table(self, name, columns, metadata):
+        fields = []
+        for column, (dtype, shape) in columns.items():
+            field_type = self.pa.from_numpy_dtype(dtype)
+            if shape:
+                field_type = self.pa.list_(field_type, int(np.prod(shape)))
+            fields.append(self.pa.field(column, field_type))
+        schema = self.pa.schema(fields, metadata={"bitalino": json.dumps(metadata)})
+
+        if self.ipc:
+            self.writers[name] = self.pa.ipc.new_file(self.table_path(name), schema)
+        else:
+            self.writers[name] = self.pq.ParquetWriter(self.table_path(name), schema)
+
+    def write_group(self, name, columns):
+        arrays = []
+        for values in columns.values():
+            if values.ndim > 1:
+                flat = self.pa.array(values.reshape(-1))
+                arrays.append(self.pa.FixedSizeListArray.from_arrays(flat, int(np.prod(values.shape[1:]))))
+            else:
+                arrays.append(self.pa.array(values))
+        batch = self.pa.record_batch(arrays, names=list(columns))
+        if self.ipc:
+            self.writers[name].write_batch(batch)
+        else:
+            self.writers[name].write_table(self.pa.Table.from_batches([batch]))
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+
+class HDF5Backend:
+    """One group per table, one chunked resizable dataset per column"""
+
+    def __init__(self, path, row_group_size):
+        import h5py
+        self.file = h5py.File(path, "w")
+        self.row_group_size = row_group_size
+
+    def open_table(self, name, columns, metadata):
+        group = self.file.create_group(name)
+        group.attrs["bitalino"] = json.dumps(metadata)
+        for column, (dtype, shape) in columns.items():
+            group.create_dataset(column, shape=(0,) + shape, maxshape=(None,) + shape, dtype=dtype,
+                                 chunks=(self.row_group_size,) + shape, compression="gzip", compression_opts=1)
+
+    def write_group(self, name, columns):
+        group = self.file[name]
+        for column, values in columns.items():
+            dataset = group[column]
+            start = dataset.shape[0]
+            dataset.resize(start + len(values), axis=0)
+            dataset[start:] = values
+
+    def close(self):
+        self.file.close()
+
+
+class Table:
+    """Preallocated column buffers for one table"""
+
+    def __init__(self, name, row_group_size):
+        self.name = name
+        self.row_group_size = row_group_size
+        self.columns = None
+        self.count = 0
+
+    def allocate(self, values):
+        self.columns = {
+            column: np.zeros((self.row_group_size,) + np.shape(array)[1:], dtype=np.asarray(array).dtype)
+            for column, array in values.items()
+        }
+
+    def schema(self):
+        return {column: (array.dtype, array.shape[1:]) for column, array in self.columns.items()}
+
+
+class SessionExporter:
+    """Streams session data into columnar row groups while acquiring
+
+    Tables are created on their first write; every column of a table must
+    keep the dtype and trailing shape of that first write.
+    """
+
+    def __init__(self, path, sensors, gains, sampling_rate, file_format=None, row_group_size=65536, max_pending_groups=4):
+        if file_format is None:
+            file_format = FORMATS.get(os.path.splitext(path)[1].lower())
+        if file_format == "parquet":
+            self.backend = ParquetBackend(path)
+        elif file_format == "arrow":
+            self.backend = ParquetBackend(path, ipc=True)
+        elif file_format == "hdf5":
+            self.backend = HDF5Backend(path, row_group_size)
+        else:
+            raise ValueError(f"Unknown export format for {path} (use .parquet, .arrow or .h5)")
+
+        self.sensors = list(sensors)
+        self.sampling_rate = sampling_rate
+        self.row_group_size = row_group_size
+        self.metadata = {"sampling_rate": sampling_rate, "channels": channel_metadata(sensors, gains)}
+        self.tables = {}
+        self.sample_count = 0
+        self.dropped_groups = 0
+        self.dropped_rows = 0
+
+        # Bounded hand-off to the writer thread keeps memory at most max_pending_groups row groups
+        self.groups = queue.Queue(maxsize=max_pending_groups)
+        self.opened = set()
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def write(self, table_name, values):
+        """Append rows to a table, values maps column name to equal-length arrays"""
+        table = self.tables.get(table_name)
+        if table is None:
+            table = Table(table_name, self.row_group_size)
+            table.allocate(values)
+            self.tables[table_name] = table
+
+        n_rows = len(next(iter(values.values())))
+        done = 0
+        while done < n_rows:
+            n = min(n_rows - done, self.row_group_size - table.count)
+            for column, array in values.items():
+                table.columns[column][table.count:table.count + n] = array[done:done + n]
+            table.count += n
+            done += n
+            if table.count == self.row_group_size:
+                self._flush(table)
+
+    def write_samples(self, new_samples, convert):
+        """Append rows with the BITalino.read() layout: digital inputs, raw ADC and converted units per port"""
+        n = len(new_samples)
+        index = np.arange(self.sample_count, self.sample_count + n)
+        values = {"sample": index, "time": index / self.sampling_rate}
+        for i in range(4):
+            values[f"I{i + 1}"] = new_samples[:, i + 1].astype(np.int8)
+        # Active ports come in ascending order after the sequence and digital columns
+        ports = sorted(port for port, sensor_type in self.sensors)
+        for port, sensor_type in self.sensors:
+            adc = new_samples[:, 5 + ports.index(port)]
+            values[f"{sensor_type}{port}_raw"] = adc.astype(np.int16)
+            values[f"{sensor_type}{port}"] = np.asarray(convert(adc, sensor_type), dtype=np.float32)
+        self.write("samples", values)
+        self.sample_count += n
+
+    def write_spectrum(self, port, magnitudes):
+        """Append one spectrum of a port, timestamped with the current sample position"""
+        self.write("spectra", {
+            "sample": np.array([self.sample_count]),
+            "port": np.array([port], dtype=np.int8),
+            "magnitudes": np.asarray(magnitudes, dtype=np.float32)[None, :],
+        })
+
+    def write_features(self, envelope, rms, bpm):
+        """Append one row of streaming features (one value per sensor), at the last sample they cover"""
+        values = {"sample": np.array([self.sample_count - 1])}
+        for index, (port, sensor_type) in enumerate(self.sensors):
+            values[f"{sensor_type}{port}_envelope"] = np.array([envelope[index]], dtype=np.float32)
+            values[f"{sensor_type}{port}_rms"] = np.array([rms[index]], dtype=np.float32)
+            if sensor_type == "ECG":
+                values[f"{sensor_type}{port}_bpm"] = np.array([bpm[index]], dtype=np.float32)
+        self.write("features", values)
+
+    def _flush(self, table, block=False):
+        if table.count == 0:
+            return
+        group = {column: array[:table.count].copy() for column, array in table.columns.items()}
+        try:
+            self.groups.put((table.name, table.schema(), group), block=block)
+        except queue.Full:
+            if not self.dropped_groups:
+                print(f"[EXPORT] Writer behind, dropping {table.name} row groups", flush=True)
+            self.dropped_groups += 1
+            self.dropped_rows += table.count
+        table.count = 0
+
+    def _write_loop(self):
+        while True:
+            item = self.groups.get()
+            if item is None:
+                return
+            name, schema, group = item
+            try:
+                # Tables are opened with their first group, so dropping groups never loses a table
+                if name not in self.opened:
+                    self.backend.open_table(name, schema, self.metadata)
+                    self.opened.add(name)
+                self.backend.write_group(name, group)
+            except Exception as e:
+                print(f"[EXPORT] Error writing {name}: {e}", flush=True)
+
+    def close(self):
+        """Write the partial row groups and close every file"""
+        for table in self.tables.values():
+            self._flush(table, block=True)
+        self.groups.put(None)
+        self.thread.join()
+        self.backend.close()
+
+
+def export_archive(archive_path, path, sensors, gains, convert, row_group_size=65536):
+    """Convert a recording made with archive.ArchiveWriter to a columnar file"""
+    from archive import ArchiveReader
+
+    reader = ArchiveReader(archive_path)
+    exporter = SessionExporter(path, sensors, gains, reader.sampling_rate, row_group_size=row_group_size)
+    try:
+        for i in range(len(reader.index)):
+            exporter.write_samples(reader.read_chunk(i), convert)
+    finally:
+        exporter.close()
+        reader.close()
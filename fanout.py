@@ -0,0 +1,237 @@
+"""Output fan-out with per-sink rate control and backpressure
+
+The OSC loop publishes one batch of (address, value) messages per tick. Every
+sink keeps its own bounded queue drained by its own thread, so a slow or
+stalled sink only drops its own batches and never blocks acquisition.
+Each sink can filter addresses, limit its rate and decimate ticks.
+
+Other threads (evoked averages, descriptors, coherence) publish auxiliary
+batches with tick=False: they are filtered and queued like the others but
+neither count as a tick nor go through the rate limit, so they can't change
+the OSC stream's decimation or starve it.
+"""
+
+import fnmatch
+import queue
+import threading
+import time
+from collections import deque
+
+
+class Sink:
+    """Base class, subclasses implement send(batch)
+
+    addresses:   fnmatch patterns ("/ECG2/*"), None for every message
+    rate:        maximum tick batches per second, None for every tick
+    decimation:  keep one tick out of `decimation` (auxiliary batches are always kept)
+    drop_policy: "oldest" drops the head of a full queue, "newest" the incoming batch
+    """
+
+    def __init__(self, name, addresses=None, rate=None, decimation=1, queue_size=64, drop_policy="oldest"):
+        if drop_policy not in ("oldest", "newest"):
+            raise ValueError(f"Unknown drop policy {drop_policy}")
+        self.name = name
+        self.addresses = addresses
+        self.rate = rate
+        self.decimation = max(1, int(decimation))
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+        self.tick_count = 0
+        self.last_offer = 0
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def accepts(self, address):
+        return self.addresses is None or any(fnmatch.fnmatchcase(address, pattern) for pattern in self.addresses)
+
+    def offer(self, batch, tick=True):
+        """Called from the publishers (any thread), never blocks"""
+        if tick:
+            with self.condition:
+                self.tick_count += 1
+                if self.tick_count % self.decimation:
+                    return
+                now = time.monotonic()
+                if self.rate is not None and now - self.last_offer < 1 / self.rate:
+                    return
+                self.last_offer = now
+
+        batch = [message for message in batch if self.accepts(message[0])]
+        if not batch:
+            return
+
+        with self.condition:
+            if len(self.pending) >= self.queue_size:
+                self.dropped += 1
+                if self.drop_policy == "newest":
+                    return
+                self.pending.popleft()
+            self.pending.append(batch)
+            self.condition.notify()
+
+    def start(self, thread_setup=None):
+        """thread_setup() runs first on the sender thread (scheduling, affinity)"""
+        self.running = True
+        self.thread = threading.Thread(target=self._send_loop, args=(thread_setup,), name=f"sink-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+        self.close()
+
+    def _send_loop(self, thread_setup=None):
+        if thread_setup is not None:
+            thread_setup()
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                batch = self.pending.popleft()
+            try:
+                self.send(batch)
+                self.sent += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"[FANOUT] Error sending to {self.name}: {e}", flush=True)
+
+    def send(self, batch):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {"queue_depth": len(self.pending), "sent": self.sent, "dropped": self.dropped, "errors": self.errors}
+
+
+class OscUdpSink(Sink):
+    """bundle=True sends each batch as a single OSC bundle (one datagram) instead of one datagram per message"""
+
+    def __init__(self, name, ip, port, bundle=False, **options):
+        super().__init__(name, **options)
+        from pythonosc import udp_client
+        self.client = udp_client.SimpleUDPClient(ip, port)
+        self.bundle = bundle
+
+    def send(self, batch):
+        if not self.bundle:
+            for address, value in batch:
+                self.client.send_message(address, value)
+            return
+
+        from pythonosc import osc_bundle_builder, osc_message_builder
+        bundle = osc_bundle_builder.OscBundleBuilder(osc_bundle_builder.IMMEDIATELY)
+        for address, value in batch:
+            message = osc_message_builder.OscMessageBuilder(address=address)
+            for arg in value if isinstance(value, (list, tuple)) else [value]:
+                message.add_arg(arg)
+            bundle.add_content(message.build())
+        self.client.send(bundle.build())
+
+
+class OscTcpSink(Sink):
+    def __init__(self, name, ip, port, **options):
+        super().__init__(name, **options)
+        from pythonosc import tcp_client
+        self.client = tcp_client.SimpleTCPClient(ip, port)
+
+    def send(self, batch):
+        for address, value in batch:
+            self.client.send_message(address, value)
+
+    def close(self):
+        self.client.close()
+
+
+class FileSink(Sink):
+    """One line per message: time, address, values"""
+
+    def __init__(self, name, path, **options):
+        super().__init__(name, **options)
+        self.file = open(path, "a")
+
+    def send(self, batch):
+        now = time.time()
+        for address, value in batch:
+            values = value if isinstance(value, (list, tuple)) else [value]
+            self.file.write(f"{now:.6f} {address} {' '.join(str(v) for v in values)}\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class QueueSink(Sink):
+    """Hands batches to an in-process consumer through self.output"""
+
+    def __init__(self, name, maxsize=0, **options):
+        super().__init__(name, **options)
+        self.output = queue.Queue(maxsize)
+
+    def send(self, batch):
+        self.output.put_nowait(batch)
+
+
+SINK_TYPES = {
+    "osc_udp": OscUdpSink,
+    "osc_tcp": OscTcpSink,
+    "file": FileSink,
+    "queue": QueueSink,
+}
+
+def make_sink(spec):
+    """Build a sink from a config dict: {"type": "osc_udp", "name": ..., other constructor arguments}"""
+    spec = dict(spec)
+    sink_type = SINK_TYPES[spec.pop("type")]
+    return sink_type(**spec)
+
+
+class FanOut:
+    """Publishes every batch to all registered sinks"""
+
+    def __init__(self, thread_setup=None):
+        self.sinks = {}
+        self.lock = threading.Lock()
+        self.thread_setup = thread_setup
+
+    def add_sink(self, sink):
+        with self.lock:
+            if sink.name in self.sinks:
+                raise ValueError(f"Sink {sink.name} already registered")
+            self.sinks[sink.name] = sink
+        sink.start(self.thread_setup)
+        return sink
+
+    def remove_sink(self, name):
+        with self.lock:
+            sink = self.sinks.pop(name, None)
+        if sink is not None:
+            sink.stop()
+
+    def publish(self, batch, tick=True):
+        """tick=False for batches published outside the OSC tick (see the module docstring)"""
+        with self.lock:
+            sinks = list(self.sinks.values())
+        for sink in sinks:
+            sink.offer(batch, tick)
+
+    def stats(self):
+        with self.lock:
+            return {name: sink.stats() for name, sink in self.sinks.items()}
+
+    def close(self):
+        for name in list(self.sinks):
+            self.remove_sink(name)
@@ -0,0 +1,183 @@
+"""Vectorized decoder for the BITalino frame stream
+
+Drop-in replacement for BITalino.read(): whole chunks are pulled off the device
+socket with recv_into() into a preallocated buffer and every frame of the chunk
+is unpacked (and CRC checked) at once with NumPy shifts and masks.
+"""
+
+import math
+import select
+import numpy as np
+
+
+def frame_size(n_channels):
+    """Number of bytes in one BITalino frame for the given analog channel count"""
+    if n_channels <= 4:
+        return int(math.ceil((12. + 10. * n_channels) / 8.))
+    return int(math.ceil((52. + 6. * (n_channels - 4)) / 8.))
+
+def _crc4_table():
+    """Next CRC-4 state for every (state, byte) pair, same bit order as the bitalino library"""
+    table = np.zeros((16, 256), dtype=np.uint8)
+    for state in range(16):
+        for byte in range(256):
+            x = state
+            for bit in range(7, -1, -1):
+                x = x << 1
+                if x & 0x10:
+                    x = x ^ 0x03
+                x = x ^ ((byte >> bit) & 0x01)
+            table[state, byte] = x & 0x0F
+    return table
+
+# bitalino.ExceptionCode messages of the read errors, for when the driver is not installed (tests, replays)
+DEVICE_ERRORS = {
+    "CONTACTING_DEVICE": "The computer lost communication with the device.",
+    "DEVICE_NOT_IN_ACQUISITION": "The device is not in acquisition mode.",
+}
+
+def _error_messages():
+    """{ExceptionCode name: message}, the driver is only imported on errors"""
+    try:
+        from bitalino import ExceptionCode
+    except ImportError:
+        return DEVICE_ERRORS
+    return {code: getattr(ExceptionCode, code) for code in DEVICE_ERRORS}
+
+def device_error(code):
+    """The exception BITalino.read() raises for an ExceptionCode name"""
+    return Exception(_error_messages()[code])
+
+def error_code(exception):
+    """ExceptionCode name of an error raised by BITalino.read() or FrameDecoder.read(), None for other errors"""
+    if not exception.args:
+        return None
+    for code, message in _error_messages().items():
+        if exception.args[0] == message:
+            return code
+    return None
+
+CRC4_TABLE = _crc4_table()
+CRC4_FLAT = CRC4_TABLE.astype(np.uint16).ravel()
+
+# Analog channel i is ((d[high] & mask) << shift) | (d[low] >> low_shift), d indexed from the frame end
+ANALOG_FIELDS = [
+    (-2, 0x0F, 6, -3, 2),
+    (-3, 0x03, 8, -4, 0),
+    (-5, 0xFF, 2, -6, 6),
+    (-6, 0x3F, 4, -7, 4),
+    (-7, 0x0F, 2, -8, 6),
+]
+
+
+class FrameDecoder:
+    """Reads and decodes frames straight from the socket of a started BITalino"""
+
+    def __init__(self, device, max_samples=1000):
+        self.device = device
+        self.n_channels = len(device.analogChannels)
+        self.frame_size = frame_size(self.n_channels)
+        self.n_columns = 5 + self.n_channels
+        self._allocate(max_samples)
+
+    def _allocate(self, max_samples):
+        self.max_samples = max_samples
+        self.raw = bytearray(max_samples * self.frame_size)
+        self.raw_view = memoryview(self.raw)
+        self.frames = np.frombuffer(self.raw, dtype=np.uint8).reshape(max_samples, self.frame_size)
+        # Scratch arrays so that decoding a chunk allocates no array data
+        self.words = np.zeros((max_samples, self.frame_size), dtype=np.uint16)
+        self.crc_state = np.zeros(max_samples, dtype=np.uint16)
+        self.scratch = np.zeros((2, max_samples), dtype=np.uint16)
+
+    def _recv_into(self, view):
+        sock = self.device.socket
+
+        if self.device.serial:
+            return sock.readinto(view)
+
+        if not self.device.blocking:
+            ready = select.select([sock], [], [], self.device.timeout)
+            if not ready[0]:
+                raise device_error("CONTACTING_DEVICE")
+
+        if hasattr(sock, "recv_into"):
+            return sock.recv_into(view)
+
+        # PyBluez sockets have no recv_into
+        data = sock.recv(len(view))
+        view[:len(data)] = data
+        return len(data)
+
+    def receive(self, n_samples):
+        """Fill the raw buffer with n_samples complete frames"""
+        if n_samples > self.max_samples:
+            self._allocate(n_samples)
+
+        n_bytes = n_samples * self.frame_size
+        received = 0
+        while received < n_bytes:
+            count = self._recv_into(self.raw_view[received:n_bytes])
+            if not count:
+                raise device_error("CONTACTING_DEVICE")
+            received += count
+
+        return self.frames[:n_samples]
+
+    def check_crc(self, words):
+        """True if every frame carries a valid CRC-4 in the low nibble of its last byte"""
+        n_samples = len(words)
+        x = self.crc_state[:n_samples]
+        index = self.scratch[0, :n_samples]
+        x[:] = 0
+        for i in range(self.frame_size):
+            # Next state is CRC4_TABLE[x, byte], with the CRC nibble of the last byte zeroed
+            np.left_shift(x, 8, out=index)
+            if i < self.frame_size - 1:
+                np.add(index, words[:, i], out=index)
+            else:
+                np.bitwise_and(words[:, i], 0xF0, out=x)
+                np.add(index, x, out=index)
+            np.take(CRC4_FLAT, index, out=x)
+        np.bitwise_and(words[:, -1], 0x0F, out=index)
+        return np.array_equal(x, index)
+
+    def decode(self, words, out):
+        """Unpack frames (as uint16 words) into out with the column layout of BITalino.read()"""
+        n_samples = len(words)
+        t = self.scratch[0, :n_samples]
+        u = self.scratch[1, :n_samples]
+
+        np.right_shift(words[:, -1], 4, out=t)
+        out[:, 0] = t
+        for column, shift in ((1, 7), (2, 6), (3, 5), (4, 4)):
+            np.right_shift(words[:, -2], shift, out=t)
+            np.bitwise_and(t, 0x01, out=t)
+            out[:, column] = t
+
+        for i in range(min(self.n_channels, 5)):
+            high, mask, shift, low, low_shift = ANALOG_FIELDS[i]
+            np.bitwise_and(words[:, high], mask, out=t)
+            np.left_shift(t, shift, out=t)
+            np.right_shift(words[:, low], low_shift, out=u)
+            np.bitwise_or(t, u, out=t)
+            out[:, 5 + i] = t
+        if self.n_channels > 5:
+            np.bitwise_and(words[:, -8], 0x3F, out=t)
+            out[:, 10] = t
+        return out
+
+    def read(self, n_samples, out=None):
+        """Same contract as BITalino.read(), optionally writing into the caller's (>= n_samples, 5 + channels) array"""
+        if not self.device.started:
+            raise device_error("DEVICE_NOT_IN_ACQUISITION")
+
+        frames = self.receive(n_samples)
+        words = self.words[:n_samples]
+        words[:] = frames
+        if not self.check_crc(words):
+            raise device_error("CONTACTING_DEVICE")
+
+        if out is None:
+            out = np.zeros((n_samples, self.n_columns))
+        return self.decode(words, out[:n_samples])
@@ -0,0 +1,88 @@
+"""Load shedding for the acquisition threads
+
+The loops share one interpreter lock, so their busy times add up: every
+window (1 s) the governor sums the time each stage reported with observe()
+and divides it by the window length. Above the budget, or when the device
+reader falls behind (observe_backlog), it moves one level down; each level
+scales the rate of some stages:
+
+    levels = [{}, {"plot": 1/3}, {"plot": 1/6, "process": 1/2}, ...]
+
+Stages missing from a level (always the acquisition) keep their full rate.
+A level is restored once the load predicted at the level above stayed
+under budget * restore_margin for restore_windows windows, so it does not
+flap between two levels.
+"""
+
+import threading
+import time
+
+
+class LoadGovernor:
+    """Picks the quality level of the loops from the time they report"""
+
+    def __init__(self, levels, budget=0.8, window=1.0, restore_windows=3, restore_margin=0.8,
+                 backlog_limit=None, on_change=None, clock=time.perf_counter):
+        self.levels = [dict(level) for level in levels] or [{}]
+        self.budget = budget
+        self.window = window
+        self.restore_windows = restore_windows
+        self.restore_margin = restore_margin
+        self.backlog_limit = backlog_limit
+        self.on_change = on_change
+        self.clock = clock
+        self.level = 0
+        self.load = 0.0
+        self.busy = {}
+        self.backlog = 0
+        self.calm_windows = 0
+        self.window_start = clock()
+        self.lock = threading.Lock()
+
+    def scale(self, stage, level=None):
+        return self.levels[self.level if level is None else level].get(stage, 1.0)
+
+    def rate(self, stage, full_rate):
+        """Rate a loop should run at, full_rate at level 0"""
+        return full_rate * self.scale(stage)
+
+    def observe(self, stage, elapsed):
+        """Report `elapsed` seconds of work done by `stage`"""
+        with self.lock:
+            self.busy[stage] = self.busy.get(stage, 0.0) + elapsed
+            now = self.clock()
+            if now - self.window_start >= self.window:
+                self._evaluate(now)
+
+    def observe_backlog(self, samples):
+        """Samples waiting in the device socket before a read, the largest of the window counts"""
+        if samples > self.backlog:
+            self.backlog = samples
+
+    def _evaluate(self, now):
+        duration = now - self.window_start
+        self.load = sum(self.busy.values()) / duration
+        behind = self.backlog_limit is not None and self.backlog > self.backlog_limit
+        previous = self.level
+
+        if (self.load > self.budget or behind) and self.level < len(self.levels) - 1:
+            self.level += 1
+            self.calm_windows = 0
+        elif self.level > 0 and not behind:
+            # Busy time of each stage if it ran at the rates of the level above
+            predicted = sum(busy * self.scale(stage, self.level - 1) / self.scale(stage)
+                            for stage, busy in self.busy.items()) / duration
+            self.calm_windows = self.calm_windows + 1 if predicted < self.budget * self.restore_margin else 0
+            if self.calm_windows >= self.restore_windows:
+                self.level -= 1
+                self.calm_windows = 0
+
+        self.busy = {}
+        self.backlog = 0
+        self.window_start = now
+        if self.level != previous and self.on_change is not None:
+            self.on_change(self)
+
+    def describe(self):
+        shed = ", ".join(f"{stage} x{factor:.2f}" for stage, factor in sorted(self.levels[self.level].items()))
+        return f"level {self.level}/{len(self.levels) - 1} ({shed or 'full quality'}), load {self.load:.2f} of {self.budget:.2f}"
@@ -0,0 +1,229 @@
+"""Fixed-size signal history
+
+RingBuffer keeps the last N samples in a preallocated NumPy array.
+HistoryStore keeps full-rate samples for a short window plus min/max/mean
+pyramids decimated 10x, 100x and 1000x, so minutes or hours of history can be
+queried at a fixed memory and time cost.
+"""
+
+import threading
+import numpy as np
+
+
+class RingBuffer:
+    """Preallocated circular buffer of rows (or scalars when width is None)
+
+    Rows are indexed by write_count, which only grows: clear() drops the rows
+    written so far by moving valid_from instead, so readers holding a count
+    (since(), read_into()) stay in step.
+    """
+
+    def __init__(self, capacity, width=None, dtype=np.float64):
+        shape = (capacity,) if width is None else (capacity, width)
+        self.data = np.zeros(shape, dtype=dtype)
+        self.capacity = capacity
+        self.write_count = 0
+        self.valid_from = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.write_count - self._oldest()
+
+    def _oldest(self):
+        """Index of the oldest row still readable"""
+        return max(self.valid_from, self.write_count - self.capacity)
+
+    def clear(self, count=None):
+        """Drop every row, the next one written gets index count (default: write_count)"""
+        with self.lock:
+            if count is not None:
+                self.write_count = count
+            self.valid_from = self.write_count
+
+    def last(self):
+        """Newest row"""
+        return self.data[(self.write_count - 1) % self.capacity]
+
+    def reserve(self, n):
+        """Lock the buffer and return the (up to two) views the next n rows go to
+
+        Lets the writer fill the ring in place (e.g. with ufunc out=), commit(n)
+        must follow to publish the rows and release the lock.
+        """
+        if n > self.capacity:
+            raise ValueError(f"cannot reserve {n} rows in a ring of {self.capacity}")
+        self.lock.acquire()
+        start = self.write_count % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            return self.data[start:end], self.data[:0]
+        return self.data[start:], self.data[:end - self.capacity]
+
+    def commit(self, n):
+        self.write_count += n
+        self.lock.release()
+
+    def extend(self, values):
+        n = len(values)
+        if n == 0:
+            return
+        if n > self.capacity:
+            values = values[-self.capacity:]
+        with self.lock:
+            start = (self.write_count + n - len(values)) % self.capacity
+            end = start + len(values)
+            if end <= self.capacity:
+                self.data[start:end] = values
+            else:
+                split = self.capacity - start
+                self.data[start:] = values[:split]
+                self.data[:end - self.capacity] = values[split:]
+            self.write_count += n
+
+    def _copy_last(self, n):
+        end = self.write_count % self.capacity
+        start = end - n
+        if start >= 0:
+            return self.data[start:end].copy()
+        return np.concatenate((self.data[start:], self.data[:end]))
+
+    def latest_into(self, out):
+        """Copy the last len(out) rows (or fewer) into out, return the filled part"""
+        with self.lock:
+            n = min(len(out), self.write_count - self._oldest())
+            end = self.write_count % self.capacity
+            start = end - n
+            if start >= 0:
+                out[:n] = self.data[start:end]
+            else:
+                out[:-start] = self.data[start:]
+                out[-start:n] = self.data[:end]
+        return out[:n]
+
+    def latest(self, n=None):
+        """Copy of the last n rows in chronological order"""
+        with self.lock:
+            available = self.write_count - self._oldest()
+            n = available if n is None else min(n, available)
+            return self._copy_last(n)
+
+    def read_into(self, start, out):
+        """Copy rows start .. start + len(out) (counted from the first write) into out, False if not all buffered"""
+        with self.lock:
+            n = len(out)
+            if start < self._oldest() or start + n > self.write_count:
+                return False
+            first = start % self.capacity
+            split = min(n, self.capacity - first)
+            out[:split] = self.data[first:first + split]
+            out[split:] = self.data[:n - split]
+        return True
+
+    def since(self, count):
+        """(first index, copy of the rows written after the first `count` ones), limited to what is still buffered"""
+        with self.lock:
+            first = max(count, self._oldest())
+            return first, self._copy_last(max(0, self.write_count - first))
+
+
+class DecimatedLevel:
+    """One pyramid level: a ring of (min, max, mean) rows, each covering `factor` rows of the level below"""
+
+    def __init__(self, factor, capacity, dtype=np.float64):
+        self.factor = factor
+        self.ring = RingBuffer(capacity, width=3, dtype=dtype)
+        self.pending = np.zeros((0, 3), dtype=dtype)
+
+    def clear(self):
+        self.ring.clear()
+        self.pending = self.pending[:0]
+
+    def push(self, rows):
+        """Fold (min, max, mean) rows from the level below, return the rows completed here"""
+        if len(self.pending):
+            rows = np.concatenate((self.pending, rows))
+
+        n_full = len(rows) // self.factor
+        self.pending = rows[n_full * self.factor:]
+        if n_full == 0:
+            return rows[:0]
+
+        buckets = rows[:n_full * self.factor].reshape(n_full, self.factor, 3)
+        completed = np.empty((n_full, 3), dtype=rows.dtype)
+        completed[:, 0] = buckets[:, :, 0].min(axis=1)
+        completed[:, 1] = buckets[:, :, 1].max(axis=1)
+        # Every bucket below covers the same number of samples, so the mean of means is exact
+        completed[:, 2] = buckets[:, :, 2].mean(axis=1)
+        self.ring.extend(completed)
+        return completed
+
+
+class HistoryStore:
+    """Full-rate history for the last full_seconds plus decimated min/max/mean tiers, all stored as dtype"""
+
+    def __init__(self, sampling_rate, full_seconds=10, factors=(10, 100, 1000), tier_seconds=(600, 3600, 86400),
+                 dtype=np.float64):
+        self.sampling_rate = sampling_rate
+        self.full = RingBuffer(int(full_seconds * sampling_rate), dtype=dtype)
+        self.levels = []
+        previous = 1
+        for factor, seconds in zip(factors, tier_seconds):
+            capacity = max(1, int(seconds * sampling_rate / factor))
+            self.levels.append(DecimatedLevel(factor // previous, capacity, dtype))
+            previous = factor
+        self.decimations = [1] + list(factors)
+        # Sample count the tiers were started from, their buckets are counted from there
+        self.tier_start = 0
+
+    @property
+    def sample_count(self):
+        return self.full.write_count
+
+    def reset(self, count=None):
+        """Drop the samples and every tier (e.g. on a unit change), the next sample gets index count"""
+        self.full.clear(count)
+        for level in self.levels:
+            level.clear()
+        self.tier_start = self.sample_count
+
+    def append(self, samples):
+        """Add a chunk of samples and update every tier incrementally"""
+        samples = np.asarray(samples, dtype=self.full.data.dtype)
+        self.full.extend(samples)
+        self.update_tiers(samples)
+
+    def update_tiers(self, samples):
+        """Update the decimated tiers only, for samples already written to self.full in place"""
+        if len(samples) == 0:
+            return
+        rows = np.repeat(np.asarray(samples, dtype=self.full.data.dtype)[:, None], 3, axis=1)
+        for level in self.levels:
+            rows = level.push(rows)
+            if len(rows) == 0:
+                break
+
+    def query(self, seconds, max_points=2000):
+        """History of the last `seconds` from the finest tier that fits in max_points
+
+        Returns (times, lows, highs, means), times in seconds relative to the
+        newest sample (negative), centered on each bucket.
+        """
+        rings = [self.full] + [level.ring for level in self.levels]
+        for decimation, ring in zip(self.decimations, rings):
+            wanted = int(np.ceil(seconds * self.sampling_rate / decimation))
+            if wanted <= max_points or ring is rings[-1]:
+                break
+
+        total = self.sample_count
+        if ring is self.full:
+            values = ring.latest(wanted)
+            lows = highs = means = values
+        else:
+            rows = ring.latest(min(wanted, max_points))
+            lows, highs, means = rows[:, 0], rows[:, 1], rows[:, 2]
+
+        n = len(means)
+        first_bucket = (total - self.tier_start) // decimation - n
+        starts = self.tier_start + (first_bucket + np.arange(n)) * decimation
+        times = (starts + (decimation - 1) / 2 - (total - 1)) / self.sampling_rate
+        return times, lows, highs, means
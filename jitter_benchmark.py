@@ -0,0 +1,82 @@
+#! /usr/bin/python
+"""Wake-up jitter of a 1 kHz reader under each scheduling mode (realtime.py)
+
+A thread wakes up every READ_PERIOD like the acquisition loop reading
+10-sample chunks, and records how late each wake-up is while other
+processes load every core (standing in for Pure Data and matplotlib) and
+a Python thread competes for the GIL. Modes that need privileges
+(SCHED_FIFO, negative nice) show as refused when not permitted.
+"""
+
+import multiprocessing
+import threading
+import time
+import numpy as np
+from realtime import RealtimeScheduler, lock_memory
+
+DURATION = 5
+READ_PERIOD = 0.01
+# One busy process per core, plus this many Python threads inside the benchmark process
+LOAD_PROCESSES = multiprocessing.cpu_count()
+LOAD_THREADS = 1
+BENCHMARK_CORE = 0
+
+MODES = {
+    "default": {},
+    "pinned": {"cores": [BENCHMARK_CORE]},
+    "nice -10": {"nice": -10},
+    "fifo": {"priority": 50},
+    "fifo pinned": {"cores": [BENCHMARK_CORE], "priority": 50},
+}
+
+
+def burn(stop):
+    x = np.random.rand(256, 256)
+    while not stop.is_set():
+        x = np.sin(x) @ x.T / 256
+
+def hold_gil(stop):
+    total = 0
+    while not stop.is_set():
+        for i in range(10000):
+            total += i * i
+
+def measure(scheduler, mode, lateness):
+    scheduler.configure_thread(mode)
+    deadline = time.perf_counter()
+    end = deadline + DURATION
+    while deadline < end:
+        deadline += READ_PERIOD
+        time.sleep(max(0, deadline - time.perf_counter()))
+        lateness.append(time.perf_counter() - deadline)
+
+def main():
+    print(f"[BENCH] {lock_memory()}", flush=True)
+    scheduler = RealtimeScheduler(MODES)
+    print(scheduler.report(), flush=True)
+
+    stop = multiprocessing.Event()
+    loads = [multiprocessing.Process(target=burn, args=(stop,), daemon=True) for i in range(LOAD_PROCESSES)]
+    loads += [threading.Thread(target=hold_gil, args=(stop,), daemon=True) for i in range(LOAD_THREADS)]
+    for load in loads:
+        load.start()
+
+    results = {}
+    try:
+        for mode in MODES:
+            lateness = []
+            thread = threading.Thread(target=measure, args=(scheduler, mode, lateness), name=mode)
+            thread.start()
+            thread.join()
+            results[mode] = np.array(lateness) * 1000
+    finally:
+        stop.set()
+
+    print(f"\n{'mode':<14}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}   applied")
+    for mode, values in results.items():
+        applied = ", ".join(scheduler.applied.get(mode, [])) or "-"
+        print(f"{mode:<14}{values.mean():>10.3f}{np.percentile(values, 50):>10.3f}"
+              f"{np.percentile(values, 99):>10.3f}{values.max():>10.3f}   {applied}")
+
+if __name__ == "__main__":
+    main()
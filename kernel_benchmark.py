@@ -0,0 +1,96 @@
+#! /usr/bin/python
+"""Cost of the streaming kernels (biosignal/kernels.py) per backend
+
+Every kernel processes CHANNELS channels of DURATION seconds in chunks of
+CHUNK samples, like the acquisition loop, once per backend (numba is
+skipped when not installed). The block filtfilt of the notch filters over
+the full buffer, as done PROCESSING_RATE times a second by the processing
+loop, is timed for comparison. Times are in percent of one core per
+second of signal.
+"""
+
+import time
+import numpy as np
+from biosignal import kernels
+from biosignal.filters import biquad, design_notches, filter_signal
+from biosignal.streaming import StreamingFeatures
+
+SAMPLING_RATE = 1000
+CHANNELS = 6
+CHUNK = 10
+DURATION = 10
+BUFFER_SIZE = 10000
+PROCESSING_RATE = 50
+NOTCHES = [(50, 30), (1, 30)]
+
+
+def kernel_cases(n_channels):
+    """{name: (setup() -> state, run(state, chunk, out))}"""
+    sos = np.array([biquad("highpass", 5, SAMPLING_RATE), biquad("lowpass", 15, SAMPLING_RATE)])
+    reference = np.ones((CHUNK, 2))
+    return {
+        "sosfilt": (lambda: np.zeros((2, n_channels, 2)), lambda state, x, out: kernels.sosfilt(sos, x, state, out)),
+        "envelope": (lambda: np.zeros(n_channels), lambda state, x, out: kernels.envelope(x, state, 0.1, 0.01, out)),
+        "moving_rms": (lambda: (np.zeros((100, n_channels)), np.zeros(1, dtype=np.int64)),
+                       lambda state, x, out: kernels.moving_rms(x, state[0], state[1], out)),
+        "threshold_peaks": (lambda: np.zeros((4, n_channels)), lambda state, x, out: kernels.threshold_peaks(x, state, 250, out)),
+        "lms": (lambda: np.zeros((n_channels, 2)), lambda state, x, out: kernels.lms(x, reference, state, 0.01, out)),
+    }
+
+def time_kernels(signal):
+    """{kernel name: seconds to process the whole signal chunk by chunk}"""
+    results = {}
+    out = np.zeros((CHUNK, signal.shape[1]))
+    for name, (setup, run) in kernel_cases(signal.shape[1]).items():
+        state = setup()
+        start = time.perf_counter()
+        for first in range(0, len(signal), CHUNK):
+            run(state, signal[first:first + CHUNK], out)
+        results[name] = time.perf_counter() - start
+    features = StreamingFeatures(["EMG", "ECG"] + ["EEG"] * (signal.shape[1] - 2), SAMPLING_RATE, CHUNK)
+    start = time.perf_counter()
+    for first in range(0, len(signal), CHUNK):
+        features.input[:] = signal[first:first + CHUNK]
+        features.update(CHUNK)
+    results["StreamingFeatures"] = time.perf_counter() - start
+    return results
+
+def time_filtfilt(signal):
+    """Seconds of block notch filtering per second of signal, for every channel"""
+    filters = design_notches(NOTCHES, SAMPLING_RATE)
+    ticks = 20
+    start = time.perf_counter()
+    for tick in range(ticks):
+        for channel in range(signal.shape[1]):
+            filtered = signal[-BUFFER_SIZE:, channel]
+            for freq, q_factor, b, a in filters:
+                filtered = filter_signal(filtered, b, a)
+    return (time.perf_counter() - start) / ticks * PROCESSING_RATE
+
+def main():
+    signal = np.random.default_rng(0).normal(size=(DURATION * SAMPLING_RATE, CHANNELS))
+    results = {}
+    for backend in kernels.BACKENDS:
+        try:
+            kernels.use_backend(backend)
+        except ImportError:
+            print(f"[BENCH] {backend} not installed, skipped", flush=True)
+            continue
+        start = time.perf_counter()
+        kernels.warm_up(CHANNELS)
+        print(f"[BENCH] {backend} warm-up {(time.perf_counter() - start) * 1000:.0f} ms", flush=True)
+        results[backend] = time_kernels(signal)
+
+    backends = list(results)
+    print(f"\n{CHANNELS} channels at {SAMPLING_RATE} Hz in chunks of {CHUNK}, % of one core")
+    print(f"{'kernel':<20}" + "".join(f"{backend:>10}" for backend in backends) + ("   speed-up" if len(backends) == 2 else ""))
+    for name in results[backends[0]]:
+        seconds = [results[backend][name] / DURATION for backend in backends]
+        line = f"{name:<20}" + "".join(f"{100 * value:>10.3f}" for value in seconds)
+        if len(seconds) == 2:
+            line += f"   {seconds[1] / seconds[0]:>7.1f}x"
+        print(line)
+    print(f"{'notch filtfilt':<20}{100 * time_filtfilt(signal):>10.3f}   (block, {PROCESSING_RATE} Hz over {BUFFER_SIZE} samples)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Pipeline metrics: counters, gauges and histograms
+
+Metrics live in a MetricsRegistry and can be exported two ways: Prometheus
+text format over a local HTTP endpoint (MetricsServer) and an OSC bundle
+with one /metrics/<name> message per value (send_osc_bundle). Collectors
+registered with add_collector() run before every export to refresh gauges
+that mirror state owned by other objects (queue depths, sink stats...).
+"""
+
+import bisect
+import threading
+import time
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def labels(self, **labels):
+        key = tuple(sorted(labels.items()))
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self):
+        """(suffix, labels, value) for every exported series"""
+        for labels, child in list(self.children.items()):
+            yield from child.samples(labels)
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def samples(self, labels):
+        yield "", labels, self.value
+
+
+class _CounterValue(_Value):
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class _GaugeValue(_Value):
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def samples(self, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield "_bucket", labels + (("le", repr(bound)),), cumulative
+        yield "_bucket", labels + (("le", "+Inf"),), self.count
+        yield "_sum", labels, self.sum
+        yield "_count", labels, self.count
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name, help_text):
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, buckets=Histogram.DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def add_collector(self, collector):
+        """collector() is called before every export"""
+        self.collectors.append(collector)
+
+    def collect(self):
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"[METRICS] Collector error: {e}", flush=True)
+
+    def render_prometheus(self):
+        self.collect()
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def osc_messages(self):
+        """(address, value) pairs: /metrics/<name>[/<label value>...], histograms as count / sum"""
+        self.collect()
+        messages = []
+        for metric in self.metrics.values():
+            for suffix, labels, value in metric.samples():
+                if suffix == "_bucket":
+                    continue
+                address = "/metrics/" + "/".join([metric.name + suffix] + [str(v) for _, v in labels])
+                messages.append((address, float(value)))
+        return messages
+
+    def send_osc_bundle(self, client):
+        """Send every value in one OSC bundle through a pythonosc UDP client"""
+        from pythonosc import osc_bundle_builder, osc_message_builder
+
+        bundle = osc_bundle_builder.OscBundleBuilder(osc_bundle_builder.IMMEDIATELY)
+        for address, value in self.osc_messages():
+            message = osc_message_builder.OscMessageBuilder(address=address)
+            message.add_arg(value)
+            bundle.add_content(message.build())
+        client.send(bundle.build())
+
+
+class MetricsServer:
+    """Serves registry.render_prometheus() on http://host:port/metrics"""
+
+    def __init__(self, registry, host="127.0.0.1", port=9100):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+        self.thread.start()
+        print(f"[METRICS] Serving http://{self.server.server_address[0]}:{self.server.server_address[1]}/metrics", flush=True)
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
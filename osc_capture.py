@@ -0,0 +1,100 @@
+#! /usr/bin/python
+"""Record and replay OSC/UDP traffic
+
+A capture is the raw datagrams sent to a port with their arrival times, so
+a Pd patch can be tested offline against a real session:
+
+    python osc_capture.py record capture.osc --port 8000 --duration 60
+    python osc_capture.py replay capture.osc --port 8000
+
+File: MAGIC, then per datagram: seconds since the first one (f8) | length (u4) | datagram
+"""
+
+import argparse
+import socket
+import struct
+import time
+
+MAGIC = b"OSCCAP01"
+RECORD = struct.Struct("<dI")
+
+
+def record(path, ip="127.0.0.1", port=8000, duration=None):
+    """Write every datagram received on ip:port to path until duration elapses (or Ctrl+C), return the count"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((ip, port))
+    sock.settimeout(0.5)
+    count = 0
+    start = None
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        try:
+            while duration is None or start is None or time.perf_counter() - start < duration:
+                try:
+                    data = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                now = time.perf_counter()
+                if start is None:
+                    start = now
+                f.write(RECORD.pack(now - start, len(data)) + data)
+                count += 1
+        except KeyboardInterrupt:
+            pass
+    sock.close()
+    return count
+
+def read_capture(path):
+    """Yield (seconds, datagram) in capture order"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an OSC capture")
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                return
+            seconds, length = RECORD.unpack(head)
+            yield seconds, f.read(length)
+
+def decode_capture(path):
+    """Yield (seconds, address, args) for every message, bundles flattened"""
+    from pythonosc.osc_packet import OscPacket
+    for seconds, data in read_capture(path):
+        for timed in OscPacket(data).messages:
+            yield seconds, timed.message.address, timed.message.params
+
+def replay(path, ip="127.0.0.1", port=8000, speed=1.0):
+    """Send the datagrams of a capture with their original spacing (divided by speed), return the count"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    start = time.perf_counter()
+    count = 0
+    for seconds, data in read_capture(path):
+        delay = start + seconds / speed - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        sock.sendto(data, (ip, port))
+        count += 1
+    sock.close()
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("mode", choices=("record", "replay", "dump"))
+    parser.add_argument("path")
+    parser.add_argument("--ip", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--duration", type=float, default=None, help="record: seconds to record (default until Ctrl+C)")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay: time scale")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        print(f"[CAPTURE] Recording {args.ip}:{args.port} to {args.path}", flush=True)
+        print(f"[CAPTURE] {record(args.path, args.ip, args.port, args.duration)} datagrams", flush=True)
+    elif args.mode == "replay":
+        print(f"[CAPTURE] {replay(args.path, args.ip, args.port, args.speed)} datagrams sent", flush=True)
+    else:
+        for seconds, address, params in decode_capture(args.path):
+            print(f"{seconds:.6f} {address} {' '.join(str(p) for p in params)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#! /usr/bin/python
+"""Accuracy of the float32 data path against the float64 reference
+
+Test signals of every sensor type (a 10 Hz rhythm, 1 Hz drift, 50 Hz hum and
+noise, quantized to 10-bit ADC counts) go through the acquisition chain in
+both precisions: conversion, notch filters, spectrum and descriptors.
+Signal errors are in ADC steps (LSB) of the sensor, so anything well under
+1 is lost in the quantization of the device anyway. The notches are also run
+with float32 coefficients, to show why filter_signal keeps them in float64.
+"""
+
+import numpy as np
+from biosignal.convert import ADC_BITS, GAINS, VCC, transfer_function, unit
+from biosignal.descriptors import SpectralDescriptors
+from biosignal.filters import design_notches, filter_signal
+from biosignal.spectrum import compute_fft, fft_window
+from history import HistoryStore
+
+SAMPLING_RATE = 1000
+BUFFER_SIZE = 10000
+HISTORY_TIER_SECONDS = (600, 3600, 86400)
+FFT_SIZE = 1024
+NOTCHES = [(50, 30), (1, 30)]
+
+
+def test_signal(n_samples=BUFFER_SIZE, seed=0):
+    """10-bit ADC counts around mid-scale"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / SAMPLING_RATE
+    signal = (150 * np.sin(2 * np.pi * 10 * t) + 80 * np.sin(2 * np.pi * 1 * t)
+              + 40 * np.sin(2 * np.pi * 50 * t) + rng.normal(0, 20, n_samples))
+    return np.clip(np.round(512 + signal), 0, 2**ADC_BITS - 1)
+
+def lsb(sensor_type):
+    """One ADC step in the unit of the sensor"""
+    return VCC / GAINS[sensor_type] / 2**ADC_BITS * unit(sensor_type)[1]
+
+def process(adc, sensor_type, dtype, coefficient_dtype=np.float64):
+    """(converted, filtered, magnitudes, descriptors) of adc with the samples stored as dtype"""
+    converted = np.empty(len(adc), dtype=dtype)
+    transfer_function(adc, sensor_type, out=converted)
+    filtered = converted
+    for freq, q_factor, b, a in design_notches(NOTCHES, SAMPLING_RATE):
+        filtered = filter_signal(filtered, b.astype(coefficient_dtype), a.astype(coefficient_dtype)).astype(dtype, copy=False)
+    freqs, magnitudes = compute_fft(filtered, SAMPLING_RATE, FFT_SIZE, normalize=True)
+    descriptors = SpectralDescriptors(1).update(freqs, magnitudes[None])
+    return converted, filtered, magnitudes, descriptors
+
+def compare(adc, sensor_type):
+    """{measure: largest difference between the float32 paths and the float64 reference}"""
+    step = lsb(sensor_type)
+    reference = process(adc, sensor_type, np.float64)
+    single = process(adc, sensor_type, np.float32)
+    coefficients = process(adc, sensor_type, np.float32, np.float32)
+    return {
+        "convert (LSB)": np.max(np.abs(single[0] - reference[0])) / step,
+        "notches (LSB)": np.max(np.abs(single[1] - reference[1])) / step,
+        "notches, float32 coefficients (LSB)": np.max(np.abs(coefficients[1] - reference[1])) / step,
+        "spectrum (of peak)": np.max(np.abs(single[2] - reference[2])),
+        "centroid (Hz)": abs(single[3]["centroid"][0] - reference[3]["centroid"][0]),
+        "peak (Hz)": abs(single[3]["peak"][0] - reference[3]["peak"][0]),
+        "flatness": abs(single[3]["flatness"][0] - reference[3]["flatness"][0]),
+    }
+
+def memory(dtype):
+    """Bytes per port of the history (full rate and tiers) and of one spectrum"""
+    history = HistoryStore(SAMPLING_RATE, BUFFER_SIZE / SAMPLING_RATE, tier_seconds=HISTORY_TIER_SECONDS, dtype=dtype)
+    history_bytes = history.full.data.nbytes + sum(level.ring.data.nbytes for level in history.levels)
+    spectrum = np.fft.rfft(np.zeros(FFT_SIZE, dtype=dtype) * fft_window(FFT_SIZE, SAMPLING_RATE, dtype)[0])
+    return history_bytes, spectrum.nbytes
+
+def main():
+    adc = test_signal()
+    results = {sensor_type: compare(adc, sensor_type) for sensor_type in sorted(GAINS)}
+    print(f"float32 against float64, {len(adc)} samples at {SAMPLING_RATE} Hz, {FFT_SIZE}-point spectra, largest difference")
+    print(f"{'measure':<38}" + "".join(f"{sensor_type:>12}" for sensor_type in results))
+    for measure in next(iter(results.values())):
+        print(f"{measure:<38}" + "".join(f"{result[measure]:>12.2e}" for result in results.values()))
+
+    print(f"\n{'bytes per port':<38}{'float64':>12}{'float32':>12}")
+    (history64, spectrum64), (history32, spectrum32) = memory(np.float64), memory(np.float32)
+    print(f"{'history (full rate and tiers)':<38}{history64:>12}{history32:>12}")
+    print(f"{'complex spectrum':<38}{spectrum64:>12}{spectrum32:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Opt-in profiling of the acquisition threads
+
+Profiler keeps, for every registered thread, wall and CPU time, and records
+stage timings and garbage collector pauses in a preallocated ring. A
+sampler thread collects the stacks of the registered threads at a fixed
+interval and uses its own wake-up lateness as an estimate of GIL waits.
+
+dump() writes:
+    <prefix>.folded      collapsed stacks (flamegraph.pl, inferno, speedscope)
+    <prefix>.trace.json  Chrome trace events (Perfetto, chrome://tracing, speedscope)
+and prints a per-thread summary. install_signal() dumps on SIGUSR1.
+
+NullProfiler has the same interface and does nothing, so the loops can
+call the profiler unconditionally.
+
+AllocationCounter measures the net allocations of a code section, to check
+that a loop runs without creating garbage.
+"""
+
+import gc
+import itertools
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, deque
+import numpy as np
+
+EVENT = np.dtype([("start", "f8"), ("duration", "f8"), ("stage", "u2"), ("thread", "u8")])
+
+
+class NullProfiler:
+    def register_thread(self, name):
+        pass
+
+    def record(self, stage, start, duration):
+        pass
+
+
+class AllocationCounter:
+    """Net allocated blocks and GC-tracked objects per iteration of a section
+
+    Both numbers are process wide, so other busy threads add noise; a loop in
+    garbage-free steady state averages close to zero on both.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.iterations = 0
+        self.blocks = 0
+        self.objects = 0
+        self.collections = sum(stats["collections"] for stats in gc.get_stats())
+
+    def begin(self):
+        self.start_blocks = sys.getallocatedblocks()
+        self.start_objects = gc.get_count()[0]
+
+    def end(self):
+        self.blocks += sys.getallocatedblocks() - self.start_blocks
+        # The generation 0 count restarts from 0 after a collection
+        self.objects += max(0, gc.get_count()[0] - self.start_objects)
+        self.iterations += 1
+
+    def report(self):
+        """(blocks per iteration, objects per iteration, collections since reset)"""
+        iterations = max(self.iterations, 1)
+        collections = sum(stats["collections"] for stats in gc.get_stats()) - self.collections
+        return self.blocks / iterations, self.objects / iterations, collections
+
+
+class Profiler:
+    def __init__(self, capacity=65536, sample_interval=0.005):
+        self.events = np.zeros(capacity, dtype=EVENT)
+        self.capacity = capacity
+        self.counter = itertools.count()
+        self.count = 0
+        self.stages = {}
+        self.threads = {}
+        # Native thread id -> name, kept after the thread ended for the trace
+        self.thread_names = {}
+        self.stacks = Counter()
+        self.gil_waits = deque(maxlen=capacity)
+        self.sample_interval = sample_interval
+        self.running = False
+        self.gc_start = None
+        self.origin = time.perf_counter()
+
+    ##### Recording
+
+    def register_thread(self, name):
+        """Called by a thread when it starts, the thread is profiled from then on (until it ends)"""
+        thread = threading.current_thread()
+        self._forget_ended_threads()
+        self.threads[thread.ident] = {
+            "name": name,
+            "thread": thread,
+            "wall_start": time.perf_counter(),
+            "cpu_start": time.thread_time(),
+        }
+        self.thread_names[threading.get_native_id()] = name
+
+    def _forget_ended_threads(self):
+        # Restarted workers register a new thread each time, and an ended thread has no CPU clock left to read
+        for ident, info in list(self.threads.items()):
+            if not info["thread"].is_alive():
+                self.threads.pop(ident, None)
+
+    def record(self, stage, start, duration):
+        """Store one stage timing, start from time.perf_counter()"""
+        stage_id = self.stages.get(stage)
+        if stage_id is None:
+            stage_id = self.stages.setdefault(stage, len(self.stages))
+        i = next(self.counter)
+        self.events[i % self.capacity] = (start, duration, stage_id, threading.get_native_id())
+        self.count = i + 1
+
+    def _gc_callback(self, phase, info):
+        if phase == "start":
+            self.gc_start = time.perf_counter()
+        elif self.gc_start is not None:
+            self.record(f"gc{info['generation']}", self.gc_start, time.perf_counter() - self.gc_start)
+            self.gc_start = None
+
+    def _sample_loop(self):
+        while self.running:
+            before = time.perf_counter()
+            time.sleep(self.sample_interval)
+            # Oversleeping is mostly time spent waiting for the GIL
+            self.gil_waits.append(max(0.0, time.perf_counter() - before - self.sample_interval))
+
+            frames = sys._current_frames()
+            for ident, info in list(self.threads.items()):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(info["name"])
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self.running = True
+        gc.callbacks.append(self._gc_callback)
+        self.sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self.sampler.start()
+        print(f"[PROFILE] Sampling every {self.sample_interval * 1000:.1f} ms", flush=True)
+        return self
+
+    def stop(self):
+        self.running = False
+        if self._gc_callback in gc.callbacks:
+            gc.callbacks.remove(self._gc_callback)
+
+    ##### Reporting
+
+    def thread_times(self):
+        """{name: (wall seconds, cpu seconds)} for the registered threads still alive"""
+        self._forget_ended_threads()
+        times = {}
+        for ident, info in list(self.threads.items()):
+            try:
+                cpu = time.clock_gettime(time.pthread_getcpuclockid(ident)) - info["cpu_start"]
+            except (OSError, AttributeError):
+                continue
+            times[info["name"]] = (time.perf_counter() - info["wall_start"], cpu)
+        return times
+
+    def recorded_events(self):
+        count = self.count
+        if count <= self.capacity:
+            return self.events[:count]
+        start = count % self.capacity
+        return np.concatenate((self.events[start:], self.events[:start]))
+
+    def summary(self):
+        lines = []
+        for name, (wall, cpu) in self.thread_times().items():
+            lines.append(f"[PROFILE] {name}: wall {wall:.1f} s, cpu {cpu:.2f} s ({100 * cpu / max(wall, 1e-9):.1f}%)")
+        events = self.recorded_events()
+        # The recording threads keep running (SIGUSR1 dumps), iterate over copies
+        for stage, stage_id in list(self.stages.items()):
+            durations = events["duration"][events["stage"] == stage_id]
+            if len(durations):
+                lines.append(f"[PROFILE] {stage}: n={len(durations)} mean {durations.mean() * 1000:.3f} ms "
+                             f"p99 {np.percentile(durations, 99) * 1000:.3f} ms max {durations.max() * 1000:.3f} ms")
+        if self.gil_waits:
+            waits = np.array(self.gil_waits)
+            lines.append(f"[PROFILE] GIL wait estimate: mean {waits.mean() * 1000:.3f} ms p99 {np.percentile(waits, 99) * 1000:.3f} ms")
+        return "\n".join(lines)
+
+    def dump(self, prefix="profile"):
+        """Write the folded stacks and the Chrome trace, print the summary"""
+        with open(f"{prefix}.folded", "w") as f:
+            for stack, count in list(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        # Events first: stages only get added, so every recorded stage id has a name
+        events = self.recorded_events()
+        names = {stage_id: stage for stage, stage_id in list(self.stages.items())}
+        trace = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": int(tid), "args": {"name": name}}
+            for tid, name in list(self.thread_names.items())
+        ]
+        for event in events:
+            trace.append({
+                "name": names[int(event["stage"])],
+                "ph": "X",
+                "ts": (event["start"] - self.origin) * 1e6,
+                "dur": event["duration"] * 1e6,
+                "pid": os.getpid(),
+                "tid": int(event["thread"]),
+            })
+        with open(f"{prefix}.trace.json", "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+        print(self.summary(), flush=True)
+        print(f"[PROFILE] Wrote {prefix}.folded and {prefix}.trace.json", flush=True)
+
+    def install_signal(self, signum=getattr(signal, "SIGUSR1", None), prefix="profile"):
+        """Dump every time the process receives signum (main thread only)"""
+        if signum is None:
+            return
+        signal.signal(signum, lambda *args: self.dump(prefix))
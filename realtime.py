@@ -0,0 +1,103 @@
+"""Real-time scheduling of the acquisition threads (Linux)
+
+Each thread applies its own policy when it starts, by name:
+    cores     CPUs the thread may run on (sched_setaffinity)
+    priority  SCHED_FIFO priority 1-99, needs CAP_SYS_NICE or an rtprio limit
+    nice      nice level, used when priority is None or was refused
+lock_memory() calls mlockall() so the preallocated buffers are never paged out.
+
+Nothing here raises: a refused setting is reported and the thread keeps
+running with the default scheduling.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+
+def _limit(name):
+    if resource is None or not hasattr(resource, name):
+        return "unknown"
+    soft, hard = resource.getrlimit(getattr(resource, name))
+    return "unlimited" if soft == resource.RLIM_INFINITY else str(soft)
+
+
+class RealtimeScheduler:
+    """Applies {thread name: {"cores": [...], "priority": n, "nice": n}} to the threads that call configure_thread"""
+
+    def __init__(self, policies=None):
+        self.policies = policies or {}
+        self.applied = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _attempt(description, function, *args):
+        try:
+            function(*args)
+            return True, description
+        except (OSError, AttributeError, ValueError) as e:
+            reason = getattr(e, "strerror", None) or str(e)
+            return False, f"{description} refused ({reason})"
+
+    def configure_thread(self, name):
+        """Called by a thread when it starts, applies the policy registered under name"""
+        policy = self.policies.get(name)
+        if not policy:
+            return
+        results = []
+
+        cores = policy.get("cores")
+        if cores is not None:
+            results.append(self._attempt(f"cores {sorted(cores)}", os.sched_setaffinity, 0, set(cores))[1])
+
+        fifo = False
+        priority = policy.get("priority")
+        if priority is not None:
+            fifo, result = self._attempt(f"SCHED_FIFO {priority}", lambda: os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority)))
+            results.append(result)
+
+        nice = policy.get("nice")
+        if nice is not None and not fifo:
+            # On Linux the nice level is per thread when given the native thread id
+            results.append(self._attempt(f"nice {nice}", os.setpriority, os.PRIO_PROCESS, threading.get_native_id(), nice)[1])
+
+        with self.lock:
+            self.applied[name] = results
+        print(f"[RT] {name}: {', '.join(results)}", flush=True)
+
+    def thread_setup(self, name):
+        """configure_thread bound to a fixed name, for threads started by other modules"""
+        return lambda: self.configure_thread(name)
+
+    def report(self):
+        """What the process is allowed to do, then what each thread got"""
+        lines = []
+        try:
+            lines.append(f"[RT] Available cores: {sorted(os.sched_getaffinity(0))}")
+        except AttributeError:
+            lines.append("[RT] Available cores: unknown")
+        lines.append(f"[RT] rtprio limit: {_limit('RLIMIT_RTPRIO')}, memlock limit: {_limit('RLIMIT_MEMLOCK')} bytes")
+        with self.lock:
+            for name, results in self.applied.items():
+                lines.append(f"[RT] {name}: {', '.join(results)}")
+        return "\n".join(lines)
+
+
+def lock_memory():
+    """mlockall(MCL_CURRENT | MCL_FUTURE), returns a description of the outcome"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+            return f"memory lock refused ({os.strerror(ctypes.get_errno())})"
+    except (OSError, AttributeError) as e:
+        return f"memory lock unavailable ({e})"
+    return "memory locked"
@@ -0,0 +1,202 @@
+"""Declarative mappings from signal values to sound control values
+
+Each mapping turns one source value ("EMG1/envelope", "ECG2/latest", ...)
+into a ready-to-use control value, all mappings at once with array
+operations on every OSC tick:
+
+    input      (low, high) source range, clipped
+    curve      "linear", "exp" / "log" (bent by curvature), or "lut" (table
+               sampled evenly over the input range)
+    output     (low, high) range of the result
+    scale      quantize to a scale ("major", "pentatonic", ...) in MIDI notes from root
+    slew       largest change per second of the result (MIDI notes when hz)
+    hz         convert the MIDI note to Hz after quantizing and slewing
+    trigger    only send when the result rises through this threshold (re-armed
+               below threshold - hysteresis)
+
+Results are sent as /sonify/<name> in the same bundle as the signals.
+set() changes a field of a mapping while running (or adds a mapping when
+given a new name and its source).
+"""
+
+import threading
+import numpy as np
+
+CURVES = ("linear", "exp", "log", "lut")
+SCALES = {
+    "chromatic": list(range(12)),
+    "major": [0, 2, 4, 5, 7, 9, 11],
+    "minor": [0, 2, 3, 5, 7, 8, 10],
+    "pentatonic": [0, 2, 4, 7, 9],
+    "minor_pentatonic": [0, 3, 5, 7, 10],
+    "whole_tone": [0, 2, 4, 6, 8, 10],
+}
+DEFAULTS = {
+    "curve": "linear",
+    "input": (0.0, 1.0),
+    "output": (0.0, 1.0),
+    "curvature": 4.0,
+    "table": None,
+    "scale": None,
+    "root": 0,
+    "slew": None,
+    "hz": False,
+    "trigger": None,
+    "hysteresis": 0.0,
+}
+
+
+def validate(mapping):
+    """Complete mapping with the defaults, raise ValueError if a field is invalid"""
+    mapping = {**DEFAULTS, **mapping}
+    for field in ("name", "source"):
+        if not mapping.get(field):
+            raise ValueError(f"mapping without {field}: {mapping}")
+    if mapping["curve"] not in CURVES:
+        raise ValueError(f"{mapping['name']}: curve must be one of {CURVES}")
+    if mapping["curve"] == "lut" and (mapping["table"] is None or len(mapping["table"]) < 2):
+        raise ValueError(f"{mapping['name']}: a lut curve needs a table of 2 values or more")
+    if mapping["scale"] is not None and mapping["scale"] not in SCALES:
+        raise ValueError(f"{mapping['name']}: scale must be one of {sorted(SCALES)}")
+    low, high = mapping["input"]
+    if low == high:
+        raise ValueError(f"{mapping['name']}: empty input range")
+    mapping["input"] = (float(low), float(high))
+    mapping["output"] = tuple(float(value) for value in mapping["output"])
+    return mapping
+
+
+def parse_field(field, values):
+    """Field value from OSC arguments, e.g. ("output", [40, 88]) or ("scale", ["none"])"""
+    if field in ("input", "output"):
+        if len(values) != 2:
+            raise ValueError(f"{field} takes a low and a high value")
+        return (float(values[0]), float(values[1]))
+    if field == "table":
+        return [float(value) for value in values]
+    if len(values) != 1:
+        raise ValueError(f"{field} takes one value")
+    value = values[0]
+    if field in ("name", "source", "curve"):
+        return str(value)
+    if field in ("scale", "slew", "trigger") and str(value).lower() == "none":
+        return None
+    if field == "scale":
+        return str(value)
+    if field == "hz":
+        return bool(int(value))
+    if field in DEFAULTS:
+        return float(value)
+    raise ValueError(f"unknown mapping field {field!r}")
+
+
+class Sonifier:
+    """Applies a list of mappings (dicts, see the module documentation) to source values"""
+
+    def __init__(self, mappings):
+        self.lock = threading.Lock()
+        self.mappings = [validate(mapping) for mapping in mappings]
+        self._build()
+
+    def _build(self):
+        mappings = self.mappings
+        n = len(mappings)
+        self.names = [mapping["name"] for mapping in mappings]
+        self.addresses = [f"/sonify/{name}" for name in self.names]
+        self.sources = [mapping["source"] for mapping in mappings]
+        self.input_low = np.array([mapping["input"][0] for mapping in mappings])
+        self.input_span = np.array([mapping["input"][1] - mapping["input"][0] for mapping in mappings])
+        self.output_low = np.array([mapping["output"][0] for mapping in mappings])
+        self.output_span = np.array([mapping["output"][1] - mapping["output"][0] for mapping in mappings])
+        curves = np.array([mapping["curve"] for mapping in mappings])
+        self.exp = curves == "exp"
+        self.log = curves == "log"
+        self.curvature = np.array([float(mapping["curvature"]) for mapping in mappings])
+        self.tables = [(i, np.linspace(0, 1, len(mapping["table"])), np.asarray(mapping["table"], dtype=float))
+                       for i, mapping in enumerate(mappings) if mapping["curve"] == "lut"]
+        # Scale degrees padded with NaN, plus the root of the next octave to round up to
+        self.scales = np.full((n, 13), np.nan)
+        for i, mapping in enumerate(mappings):
+            if mapping["scale"] is not None:
+                degrees = SCALES[mapping["scale"]]
+                self.scales[i, :len(degrees)] = degrees
+                self.scales[i, len(degrees)] = 12
+        self.quantized = ~np.isnan(self.scales[:, 0])
+        self.root = np.array([float(mapping["root"]) for mapping in mappings])
+        self.slew = np.array([np.inf if mapping["slew"] is None else float(mapping["slew"]) for mapping in mappings])
+        self.hz = np.array([bool(mapping["hz"]) for mapping in mappings], dtype=bool)
+        self.triggers = np.array([mapping["trigger"] is not None for mapping in mappings], dtype=bool)
+        self.threshold = np.array([np.inf if mapping["trigger"] is None else float(mapping["trigger"]) for mapping in mappings])
+        self.hysteresis = np.array([float(mapping["hysteresis"]) for mapping in mappings])
+        self.armed = np.ones(n, dtype=bool)
+        self.previous = np.full(n, np.nan)
+
+    def set(self, name, field, value):
+        """Change one field of mapping `name`; a new name needs "source" as its first field"""
+        with self.lock:
+            mappings = [dict(mapping) for mapping in self.mappings]
+            for mapping in mappings:
+                if mapping["name"] == name:
+                    mapping[field] = value
+                    break
+            else:
+                if field != "source":
+                    raise ValueError(f"no mapping named {name!r}")
+                mappings.append({"name": name, "source": value})
+            self._rebuild([validate(mapping) for mapping in mappings])
+
+    def remove(self, name):
+        with self.lock:
+            self._rebuild([mapping for mapping in self.mappings if mapping["name"] != name])
+
+    def _rebuild(self, mappings):
+        """Switch to new mappings, keeping the slew and trigger state of the ones that stay"""
+        previous = dict(zip(self.names, self.previous))
+        armed = dict(zip(self.names, self.armed))
+        self.mappings = mappings
+        self._build()
+        for i, name in enumerate(self.names):
+            self.previous[i] = previous.get(name, np.nan)
+            self.armed[i] = armed.get(name, True)
+
+    def process(self, values, elapsed):
+        """[(address, value)] for the sources found in values ({source: float}), elapsed seconds since the last call"""
+        with self.lock:
+            n = len(self.sources)
+            if n == 0:
+                return []
+            x = np.fromiter((values.get(source, np.nan) for source in self.sources), dtype=float, count=n)
+            valid = ~np.isnan(x)
+
+            t = np.clip((x - self.input_low) / self.input_span, 0, 1)
+            shaped = t.copy()
+            if self.exp.any():
+                k = self.curvature[self.exp]
+                shaped[self.exp] = np.expm1(k * t[self.exp]) / np.expm1(k)
+            if self.log.any():
+                k = self.curvature[self.log]
+                shaped[self.log] = np.log1p(k * t[self.log]) / np.log1p(k)
+            for i, grid, table in self.tables:
+                shaped[i] = np.interp(t[i], grid, table)
+            y = self.output_low + shaped * self.output_span
+
+            if self.quantized.any():
+                relative = y - self.root
+                octave = np.floor(relative / 12)
+                distance = np.abs((relative - 12 * octave)[:, None] - self.scales)
+                nearest = np.argmin(np.where(np.isnan(distance), np.inf, distance), axis=1)
+                snapped = self.root + 12 * octave + self.scales[np.arange(n), nearest]
+                y = np.where(self.quantized, snapped, y)
+
+            step = self.slew * elapsed
+            started = ~np.isnan(self.previous)
+            y = np.where(started, self.previous + np.clip(y - np.where(started, self.previous, y), -step, step), y)
+            y = np.where(valid, y, self.previous)
+
+            fired = self.triggers & valid & self.armed & (y >= self.threshold)
+            self.armed = np.where(fired, False, self.armed | (y < self.threshold - self.hysteresis))
+            self.previous = y
+            result = np.where(self.hz, 440 * 2 ** ((y - 69) / 12), y)
+
+            send = valid & (~self.triggers | fired)
+            return [(self.addresses[i], float(result[i])) for i in np.flatnonzero(send)]
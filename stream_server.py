@@ -0,0 +1,279 @@
+"""Binary streaming server for remote dashboards
+
+An asyncio server running on its own thread streams float32 sample blocks
+and spectra to any number of clients, over raw TCP and/or WebSocket.
+Each block is serialized once per (kind, port, decimation) and the same
+bytes are queued to every client that subscribed to it. A client whose
+queue is full loses blocks instead of slowing the others.
+
+Message (little endian):
+    kind u8 (0 samples, 1 spectrum) | port u8 | decimation u16 | count u32 | first sample u64 | count x float32
+Raw TCP prefixes every message with its u32 length; WebSocket sends one
+binary frame per message.
+
+Clients configure their stream with a JSON object (one line on TCP, a text
+frame on WebSocket), e.g. {"ports": [1, 2], "decimation": 4, "spectra": false}.
+By default every port is sent at full rate with spectra. An invalid
+subscription is ignored and answered with {"error": "..."}: a text frame on
+WebSocket, a length-prefixed message starting with "{" on TCP. A WebSocket
+frame over 64 KiB closes the connection with status 1009.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import threading
+import numpy as np
+
+HEADER = struct.Struct("<BBHIQ")
+LENGTH = struct.Struct("<I")
+KIND_SAMPLES = 0
+KIND_SPECTRUM = 1
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# Clients only send small JSON commands: larger frames close the connection (1009 message too big)
+WS_MAX_FRAME = 65536
+WS_TOO_BIG = 1009
+
+
+def encode_message(kind, port, decimation, first_sample, values):
+    values = np.ascontiguousarray(values, dtype="<f4")
+    return HEADER.pack(kind, port, decimation, len(values), first_sample) + values.tobytes()
+
+def decode_message(data):
+    """Return (kind, port, decimation, first_sample, float32 values)"""
+    kind, port, decimation, count, first_sample = HEADER.unpack_from(data)
+    values = np.frombuffer(data, dtype="<f4", count=count, offset=HEADER.size)
+    return kind, port, decimation, first_sample, values
+
+def decimate(first_sample, values, decimation):
+    """Keep samples whose absolute index is a multiple of decimation, so decimated streams stay continuous"""
+    if decimation == 1:
+        return first_sample, values
+    offset = -first_sample % decimation
+    kept = values[offset::decimation]
+    return (first_sample + offset) // decimation, kept
+
+def websocket_frame(payload, opcode=0x2):
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class Client:
+    def __init__(self, writer, websocket, queue_size):
+        self.writer = writer
+        self.websocket = websocket
+        self.queue = asyncio.Queue(queue_size)
+        self.ports = None
+        self.decimation = 1
+        self.spectra = True
+        self.dropped = 0
+
+    def configure(self, text):
+        """Apply a JSON subscription, all of it or (answering with an error) none of it"""
+        ports, decimation, spectra = self.ports, self.decimation, self.spectra
+        try:
+            options = json.loads(text)
+            if not isinstance(options, dict):
+                raise ValueError("expected a JSON object")
+            if "ports" in options:
+                ports = None if options["ports"] is None else {int(port) for port in options["ports"]}
+            if "decimation" in options:
+                decimation = max(1, min(65535, int(options["decimation"])))
+            if "spectra" in options:
+                spectra = bool(options["spectra"])
+        except (TypeError, ValueError, OverflowError) as e:
+            print(f"[STREAM] Ignoring invalid subscription {text!r}: {e}", flush=True)
+            self.send_error(f"invalid subscription: {e}")
+            return
+        self.ports, self.decimation, self.spectra = ports, decimation, spectra
+
+    def send_error(self, message):
+        text = json.dumps({"error": message}).encode()
+        self.offer(websocket_frame(text, opcode=0x1) if self.websocket else LENGTH.pack(len(text)) + text)
+
+    def wants(self, kind, port):
+        if self.ports is not None and port not in self.ports:
+            return False
+        return kind == KIND_SAMPLES or self.spectra
+
+    def offer(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class StreamServer:
+    """Streams sample blocks and spectra to TCP and WebSocket clients, publish_* are thread-safe"""
+
+    def __init__(self, host="127.0.0.1", tcp_port=8765, ws_port=8766, queue_size=256):
+        self.host = host
+        self.tcp_port = tcp_port
+        self.ws_port = ws_port
+        self.queue_size = queue_size
+        self.clients = set()
+        self.handlers = set()
+        self.loop = None
+        self.servers = []
+        self.thread = None
+        self.ready = threading.Event()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="stream-server", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        if self.tcp_port is not None:
+            server = self.loop.run_until_complete(asyncio.start_server(self._serve_tcp, self.host, self.tcp_port))
+            self.tcp_port = server.sockets[0].getsockname()[1]
+            self.servers.append(server)
+        if self.ws_port is not None:
+            server = self.loop.run_until_complete(asyncio.start_server(self._serve_websocket, self.host, self.ws_port))
+            self.ws_port = server.sockets[0].getsockname()[1]
+            self.servers.append(server)
+        print(f"[STREAM] Serving TCP on {self.tcp_port}, WebSocket on {self.ws_port}", flush=True)
+        self.ready.set()
+        self.loop.run_forever()
+
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+    def stop(self):
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=2)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=1)
+
+    async def _shutdown(self):
+        # Closing the connections lets every handler return on its own
+        for server in self.servers:
+            server.close()
+        for client in list(self.clients):
+            client.writer.close()
+        if self.handlers:
+            await asyncio.wait(self.handlers, timeout=1)
+
+    def publish_samples(self, port, first_sample, samples):
+        if self.clients:
+            self.loop.call_soon_threadsafe(self._broadcast, KIND_SAMPLES, port, first_sample, samples)
+
+    def publish_spectrum(self, port, sample_count, magnitudes):
+        if self.clients:
+            self.loop.call_soon_threadsafe(self._broadcast, KIND_SPECTRUM, port, sample_count, magnitudes)
+
+    def stats(self):
+        return {"clients": len(self.clients), "dropped": sum(client.dropped for client in self.clients)}
+
+    def _broadcast(self, kind, port, first_sample, values):
+        # Serialize once per distinct decimation, share the bytes between clients
+        encoded = {}
+        for client in self.clients:
+            if not client.wants(kind, port):
+                continue
+            decimation = client.decimation if kind == KIND_SAMPLES else 1
+            key = (decimation, client.websocket)
+            if key not in encoded:
+                first, kept = decimate(first_sample, values, decimation)
+                message = encode_message(kind, port, decimation, first, kept)
+                encoded[key] = websocket_frame(message) if client.websocket else LENGTH.pack(len(message)) + message
+            client.offer(encoded[key])
+
+    async def _send_loop(self, client):
+        while True:
+            message = await client.queue.get()
+            client.writer.write(message)
+            await client.writer.drain()
+
+    async def _serve(self, client, read_commands):
+        self.clients.add(client)
+        self.handlers.add(asyncio.current_task())
+        sender = asyncio.ensure_future(self._send_loop(client))
+        try:
+            await read_commands()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(client)
+            self.handlers.discard(asyncio.current_task())
+            sender.cancel()
+            client.writer.close()
+
+    async def _serve_tcp(self, reader, writer):
+        client = Client(writer, False, self.queue_size)
+
+        async def read_commands():
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                client.configure(line.decode(errors="replace"))
+
+        await self._serve(client, read_commands)
+
+    async def _serve_websocket(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        key = None
+        for line in request.decode(errors="replace").split("\r\n"):
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "sec-websocket-key":
+                key = value.strip()
+        if key is None:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+            writer.close()
+            return
+
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WS_GUID).digest()).decode()
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        client = Client(writer, True, self.queue_size)
+
+        async def read_commands():
+            while True:
+                head = await reader.readexactly(2)
+                opcode = head[0] & 0x0F
+                length = head[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", await reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack("!Q", await reader.readexactly(8))[0]
+                if length > WS_MAX_FRAME:
+                    writer.write(websocket_frame(struct.pack("!H", WS_TOO_BIG), opcode=0x8))
+                    await writer.drain()
+                    return
+                mask = await reader.readexactly(4) if head[1] & 0x80 else b"\0\0\0\0"
+                payload = np.frombuffer(await reader.readexactly(length), dtype=np.uint8)
+                payload = (payload ^ np.resize(np.frombuffer(mask, dtype=np.uint8), length)).tobytes()
+
+                if opcode == 0x8:
+                    writer.write(websocket_frame(b"", opcode=0x8))
+                    return
+                if opcode == 0x9:
+                    writer.write(websocket_frame(payload, opcode=0xA))
+                elif opcode == 0x1:
+                    client.configure(payload.decode(errors="replace"))
+
+        await self._serve(client, read_commands)
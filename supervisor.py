@@ -0,0 +1,208 @@
+"""Watchdog over the worker threads
+
+Each loop runs as a Worker: it keeps going while worker.running and calls
+worker.beat() at the end of every iteration. Every `interval` the
+Supervisor's watchdog thread treats a worker as failed when its thread
+ended without being asked to, or when its last beat is older than its
+stall_timeout. Only the failed worker is handled:
+
+    1. it is asked to stop and its interrupt() is called (e.g. to unblock a read)
+    2. once its thread has ended, a new thread is started (no sooner than
+       restart_delay after the previous start)
+
+A worker never has more than one thread. A thread that doesn't end holds
+back its restart instead of leaving a copy behind, so the number of threads
+stays bounded however long the process runs.
+
+Beats are only expected after the first one, so the first iteration (lazy
+imports, device start) is never a stall. `with worker.idle():` covers the
+slow steps that come later (reconnecting, waiting before a retry).
+"""
+
+import contextlib
+import threading
+import time
+
+
+class Worker:
+    """One supervised loop, target(worker) runs in its thread"""
+
+    def __init__(self, name, target, stall_timeout=1.0, interrupt=None, clock=time.perf_counter):
+        self.name = name
+        self.target = target
+        self.stall_timeout = stall_timeout
+        self.interrupt = interrupt
+        self.clock = clock
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.last_beat = None
+        self.idle_depth = 0
+        self.started_at = None
+        self.failure = None
+        self.failed_at = None
+        self.error = None
+        self.restarts = 0
+        self.stalls = 0
+
+    @property
+    def running(self):
+        """Loop condition: False once the supervisor asked this worker to stop"""
+        return not self.stop_event.is_set()
+
+    @property
+    def alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def beat(self):
+        self.last_beat = self.clock()
+
+    @contextlib.contextmanager
+    def idle(self):
+        """No stall detection while in this block"""
+        self.idle_depth += 1
+        try:
+            yield
+        finally:
+            self.idle_depth -= 1
+            if self.last_beat is not None:
+                self.last_beat = self.clock()
+
+    def stalled(self, now):
+        return self.idle_depth == 0 and self.last_beat is not None and now - self.last_beat > self.stall_timeout
+
+    def _run(self):
+        try:
+            self.target(self)
+        except Exception as e:
+            self.error = e
+            print(f"[SUPERVISOR] {self.name} raised {type(e).__name__}: {e}", flush=True)
+
+    def start(self):
+        """Start a new thread, the previous one must have ended"""
+        if self.alive:
+            raise RuntimeError(f"{self.name} is still running")
+        self.stop_event.clear()
+        self.last_beat = None
+        self.idle_depth = 0
+        self.error = None
+        self.started_at = self.clock()
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        """True if the thread has ended"""
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        return not self.alive
+
+
+class Supervisor:
+    """Starts the workers and restarts the ones that end or stall
+
+    active: while it returns True the workers are kept running, once False the
+    watchdog stops them all and ends (wait() returns).
+    on_restart(worker, reason) is called after each restart.
+    """
+
+    def __init__(self, interval=0.02, restart_delay=0.1, active=None, on_restart=None, clock=time.perf_counter):
+        self.interval = interval
+        self.restart_delay = restart_delay
+        self.active = active or (lambda: True)
+        self.on_restart = on_restart
+        self.clock = clock
+        self.workers = {}
+        self.thread = None
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+
+    def add(self, name, target, stall_timeout=1.0, interrupt=None):
+        worker = Worker(name, target, stall_timeout, interrupt, self.clock)
+        self.workers[name] = worker
+        return worker
+
+    def start(self):
+        for worker in self.workers.values():
+            worker.start()
+        self.thread = threading.Thread(target=self._watch, name="supervisor", daemon=True)
+        self.thread.start()
+        return self
+
+    def _watch(self):
+        while not self.stopped.is_set():
+            if not self.active():
+                self.stop()
+                break
+            self.check()
+            self.stopped.wait(self.interval)
+
+    def check(self):
+        """One pass of the watchdog"""
+        with self.lock:
+            if not self.stopped.is_set():
+                self._check(self.clock())
+
+    def _check(self, now):
+        for worker in self.workers.values():
+            if worker.failure is None:
+                if not worker.alive and worker.running:
+                    worker.failure = "ended"
+                elif worker.alive and worker.stalled(now):
+                    worker.failure = "stalled"
+                    worker.stalls += 1
+                else:
+                    continue
+                worker.failed_at = now
+                print(f"[SUPERVISOR] {worker.name} {worker.failure}, restarting it", flush=True)
+                worker.stop()
+                if worker.interrupt is not None:
+                    try:
+                        worker.interrupt()
+                    except Exception as e:
+                        print(f"[SUPERVISOR] Could not interrupt {worker.name}: {e}", flush=True)
+
+            # Wait for the old thread to end, then for the restart delay
+            if worker.alive or now - worker.started_at < self.restart_delay:
+                continue
+            reason = worker.failure
+            worker.restarts += 1
+            worker.failure = None
+            worker.start()
+            if self.on_restart is not None:
+                self.on_restart(worker, reason)
+
+    def stop(self, timeout=None):
+        """Stop every worker and the watchdog, True if every thread ended within timeout"""
+        with self.lock:
+            self.stopped.set()
+            for worker in self.workers.values():
+                worker.stop()
+        deadline = None if timeout is None else self.clock() + timeout
+        ended = True
+        for worker in self.workers.values():
+            ended &= worker.join(None if deadline is None else max(0, deadline - self.clock()))
+        return ended
+
+    def wait(self, timeout=None):
+        """Block until the supervisor stops (short waits so Ctrl-C gets through), True if it did"""
+        deadline = None if timeout is None else self.clock() + timeout
+        while not self.stopped.wait(0.5 if deadline is None else min(0.5, max(0, deadline - self.clock()))):
+            if deadline is not None and self.clock() >= deadline:
+                return False
+        return True
+
+
+class NullWorker:
+    """Stands in for a Worker when a loop runs on its own (tests, scripts): never stopped, beats ignored"""
+
+    running = True
+
+    def beat(self):
+        pass
+
+    def idle(self):
+        return contextlib.nullcontext()
+
+UNSUPERVISED = NullWorker()
@@ -0,0 +1,28 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root, next to acquisition.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from osc_listener import OscListener  # noqa: E402
+
+
+@pytest.fixture
+def osc_listener():
+    listener = OscListener().start()
+    yield listener
+    listener.stop()
+
+
+@pytest.fixture
+def acquisition():
+    # Fresh module state (buffers, metrics, fanout) for every run
+    import acquisition
+    module = importlib.reload(acquisition)
+    module.GC_FREEZE = False
+    yield module
+    module.sensor_thread_status["running"] = False
+    module.fanout.close()
@@ -0,0 +1,182 @@
+"""Stand-in for a BITalino, streaming fixed samples as real frames
+
+FakeBITalino encodes rows with the BITalino.read() layout (sequence, 4
+digital, analog channels) into frames, CRC included, and writes them into
+one end of a socket pair at the sampling rate (or as fast as the reader
+takes them). The other end is exposed as device.socket, so FrameDecoder and
+the acquisition loop run unchanged. read() is a per-frame reference decoder
+written after the bitalino library.
+"""
+
+import math
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+
+def frame_bytes(n_channels):
+    if n_channels <= 4:
+        return int(math.ceil((12. + 10. * n_channels) / 8.))
+    return int(math.ceil((52. + 6. * (n_channels - 4)) / 8.))
+
+def crc4(data):
+    x = 0
+    for byte in data:
+        for bit in range(7, -1, -1):
+            x = x << 1
+            if x & 0x10:
+                x = x ^ 0x03
+            x = x ^ ((byte >> bit) & 0x01)
+    return x & 0x0F
+
+def encode_frame(row, n_channels):
+    """Frame bytes for one (sequence, d1..d4, a1..an) row"""
+    row = [int(v) for v in row]
+    seq, digital, a = row[0], row[1:5], row[5:] + [0] * 6
+    d = [0] * frame_bytes(n_channels)
+    d[-2] = (digital[0] << 7) | (digital[1] << 6) | (digital[2] << 5) | (digital[3] << 4) | ((a[0] >> 6) & 0x0F)
+    d[-3] = ((a[0] & 0x3F) << 2) | ((a[1] >> 8) & 0x03)
+    if n_channels > 1:
+        d[-4] = a[1] & 0xFF
+    if n_channels > 2:
+        d[-5] = (a[2] >> 2) & 0xFF
+        d[-6] = ((a[2] & 0x03) << 6) | ((a[3] >> 4) & 0x3F)
+    if n_channels > 3:
+        d[-7] = ((a[3] & 0x0F) << 4) | ((a[4] >> 2) & 0x0F)
+    if n_channels > 4:
+        d[-8] = ((a[4] & 0x03) << 6) | (a[5] & 0x3F)
+    d[-1] = (seq & 0x0F) << 4
+    d[-1] |= crc4(d)
+    return bytes(d)
+
+def synthetic_samples(n_samples, n_channels, sampling_rate=1000, seed=0):
+    """Deterministic rows: mains hum, a few tones, slow drift and noise on every channel"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / sampling_rate
+    rows = np.zeros((n_samples, 5 + n_channels), dtype=np.int64)
+    rows[:, 0] = np.arange(n_samples) % 16
+    for i in range(4):
+        rows[:, 1 + i] = (np.arange(n_samples) // (250 * (i + 1))) % 2
+    for channel in range(n_channels):
+        signal = (
+            512
+            + 150 * np.sin(2 * np.pi * 50 * t)
+            + 100 * np.sin(2 * np.pi * (7 + 5 * channel) * t)
+            + 60 * np.sin(2 * np.pi * 0.5 * t + channel)
+            + rng.normal(0, 20, n_samples)
+        )
+        # Channels past the 4th are 6-bit
+        top = 1023 if channel < 4 else 63
+        scale = 1 if channel < 4 else 1 / 16
+        rows[:, 5 + channel] = np.clip(np.round(signal * scale), 0, top)
+    return rows
+
+
+class FakeBITalino:
+    """Plays `samples` (looping) to whoever reads device.socket, like a started BITalino
+
+    realtime=False writes as fast as the socket buffer allows. send_times[i]
+    is the perf_counter time at which the chunk holding sample i was written.
+    """
+
+    def __init__(self, samples, chunk=10, realtime=True, timeout=None):
+        self.samples = np.asarray(samples)
+        self.n_channels = self.samples.shape[1] - 5
+        self.chunk = chunk
+        self.realtime = realtime
+        self.frames = b"".join(encode_frame(row, self.n_channels) for row in self.samples)
+        self.socket, self.peer = socket.socketpair()
+        self.serial = False
+        self.wifi = False
+        self.blocking = timeout is None
+        self.timeout = timeout
+        self.started = False
+        self.analogChannels = []
+        self.sent = 0
+        self.send_times = np.zeros(len(self.samples))
+        self.thread = None
+
+    @classmethod
+    def from_archive(cls, path, **options):
+        """Replay a session recorded with ArchiveWriter"""
+        from archive import ArchiveReader
+        reader = ArchiveReader(path)
+        try:
+            return cls(reader.read(0, len(reader)), **options)
+        finally:
+            reader.close()
+
+    def start(self, SamplingRate=1000, analogChannels=[0, 1, 2, 3, 4, 5]):
+        self.analogChannels = sorted(set(analogChannels))
+        if len(self.analogChannels) != self.n_channels:
+            raise ValueError(f"samples have {self.n_channels} channels, {len(self.analogChannels)} requested")
+        self.samplingRate = SamplingRate
+        self.started = True
+        self.thread = threading.Thread(target=self._write_loop, name="fake-bitalino", daemon=True)
+        self.thread.start()
+
+    def _write_loop(self):
+        size = frame_bytes(self.n_channels)
+        n_samples = len(self.samples)
+        start = time.perf_counter()
+        while self.started:
+            first = self.sent % n_samples
+            count = min(self.chunk, n_samples - first)
+            if self.realtime:
+                delay = start + (self.sent + count) / self.samplingRate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if self.sent < n_samples:
+                self.send_times[first:first + count] = time.perf_counter()
+            try:
+                self.peer.sendall(self.frames[first * size:(first + count) * size])
+            except OSError:
+                return
+            self.sent += count
+
+    def read(self, nSamples=100):
+        """Reference decoder, one frame at a time"""
+        if not self.started:
+            raise Exception("The device is not in acquisition mode.")
+        n_bytes = frame_bytes(self.n_channels)
+        data = np.zeros((nSamples, 5 + self.n_channels))
+        for sample in range(nSamples):
+            raw = b""
+            while len(raw) < n_bytes:
+                raw += self.socket.recv(n_bytes - len(raw))
+            d = list(struct.unpack(n_bytes * "B", raw))
+            crc = d[-1] & 0x0F
+            d[-1] = d[-1] & 0xF0
+            if crc != crc4(d):
+                raise Exception("The computer lost communication with the device.")
+            data[sample, 0] = d[-1] >> 4
+            data[sample, 1] = d[-2] >> 7 & 0x01
+            data[sample, 2] = d[-2] >> 6 & 0x01
+            data[sample, 3] = d[-2] >> 5 & 0x01
+            data[sample, 4] = d[-2] >> 4 & 0x01
+            if self.n_channels > 0:
+                data[sample, 5] = ((d[-2] & 0x0F) << 6) | (d[-3] >> 2)
+            if self.n_channels > 1:
+                data[sample, 6] = ((d[-3] & 0x03) << 8) | d[-4]
+            if self.n_channels > 2:
+                data[sample, 7] = (d[-5] << 2) | (d[-6] >> 6)
+            if self.n_channels > 3:
+                data[sample, 8] = ((d[-6] & 0x3F) << 4) | (d[-7] >> 4)
+            if self.n_channels > 4:
+                data[sample, 9] = ((d[-7] & 0x0F) << 2) | (d[-8] >> 6)
+            if self.n_channels > 5:
+                data[sample, 10] = d[-8] & 0x3F
+        return data
+
+    def stop(self):
+        self.started = False
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+    def close(self):
+        self.stop()
+        self.socket.close()
+        self.peer.close()
@@ -0,0 +1,52 @@
+"""Golden outputs of the processing functions for a fixed input
+
+Run this file to regenerate tests/golden/processing.npz, only when a change
+of the numbers is intended (the Pd patches depend on them):
+
+    python tests/golden.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "processing.npz")
+N_SAMPLES = 4096
+N_CHANNELS = 4
+
+
+def compute(acquisition, adc):
+    """Every golden array, computed from raw ADC rows (n, 5 + channels)"""
+    outputs = {}
+    for sensor_type in sorted(acquisition.GAINS):
+        converted = acquisition.transfer_function(adc[:, 5], sensor_type)
+        outputs[f"convert_{sensor_type}"] = converted
+
+        signal = converted
+        for freq, q_factor in acquisition.NOTCHES:
+            signal = acquisition.apply_notch_filter(signal, freq, q_factor)
+        outputs[f"filtered_{sensor_type}"] = signal
+
+        freqs, magnitudes = acquisition.compute_fft(signal)
+        outputs[f"fft_freqs_{sensor_type}"] = freqs
+        outputs[f"fft_magnitudes_{sensor_type}"] = magnitudes
+    return outputs
+
+def load():
+    with np.load(GOLDEN_PATH) as golden:
+        return {name: golden[name] for name in golden.files}
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import acquisition
+    from fake_device import synthetic_samples
+
+    adc = synthetic_samples(N_SAMPLES, N_CHANNELS)
+    outputs = compute(acquisition, adc)
+    os.makedirs(os.path.dirname(GOLDEN_PATH), exist_ok=True)
+    np.savez_compressed(GOLDEN_PATH, adc=adc, **outputs)
+    print(f"Wrote {len(outputs) + 1} arrays to {GOLDEN_PATH}")
+
+if __name__ == "__main__":
+    main()
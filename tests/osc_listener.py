@@ -0,0 +1,58 @@
+"""Local UDP endpoint recording every OSC message sent to it"""
+
+import socket
+import threading
+import time
+
+from pythonosc.osc_packet import OscPacket
+
+
+class OscListener:
+    def __init__(self, ip="127.0.0.1", port=0):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((ip, port))
+        self.sock.settimeout(0.1)
+        self.ip, self.port = self.sock.getsockname()
+        self.messages = []
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._receive_loop, name="osc-listener", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+        self.sock.close()
+
+    def _receive_loop(self):
+        while self.running:
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            now = time.perf_counter()
+            with self.lock:
+                for timed in OscPacket(data).messages:
+                    self.messages.append((now, timed.message.address, timed.message.params))
+
+    def received(self, address=None):
+        """(arrival time, address, params) in arrival order, optionally for one address"""
+        with self.lock:
+            return [m for m in self.messages if address is None or m[1] == address]
+
+    def wait_for(self, predicate, timeout=5.0):
+        """Poll until predicate(self) is true, return whether it became true"""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if predicate(self):
+                return True
+            time.sleep(0.01)
+        return predicate(self)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from archive import ArchiveReader, ArchiveWriter, column_bits
+from fake_device import FakeBITalino, synthetic_samples
+from test_pipeline import assert_buffers_hold, run_pipeline
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    # Six channels: 10-bit columns for the first four, 6-bit past them
+    samples = synthetic_samples(10000, 6, seed=21)
+    path = str(tmp_path / "session.bitarc")
+    writer = ArchiveWriter(path, 6, 1000, chunk_size=1024)
+    rng = np.random.default_rng(21)
+    start = 0
+    while start < len(samples):
+        n = int(rng.integers(1, 1500))
+        writer.write(samples[start:start + n])
+        start += n
+    writer.close()
+    return path, samples
+
+def test_round_trip(recorded):
+    path, samples = recorded
+    reader = ArchiveReader(path)
+    try:
+        assert reader.sampling_rate == 1000 and reader.bits == column_bits(6)
+        assert reader.bits[5:] == [10, 10, 10, 10, 6, 6]
+        assert len(reader.index) == 10 and len(reader) == len(samples)
+        assert samples[:, 5:9].max() > 63 and samples[:, 9:].max() <= 63
+        np.testing.assert_array_equal(reader.read(), samples)
+    finally:
+        reader.close()
+
+@pytest.mark.parametrize("start, stop", [(0, 1), (1023, 1025), (1500, 1600), (2047, 5121), (9990, 20000), (3000, 3000)])
+def test_ranges_seek_through_the_chunk_index(recorded, start, stop):
+    path, samples = recorded
+    reader = ArchiveReader(path)
+    try:
+        np.testing.assert_array_equal(reader.read(start, stop), samples[start:stop])
+    finally:
+        reader.close()
+
+def test_recorded_session_replays_through_the_pipeline(acquisition, tmp_path):
+    samples = synthetic_samples(3000, len(acquisition.SENSORS), seed=22)
+    path = str(tmp_path / "live.bitarc")
+    acquisition.archive = ArchiveWriter(path, len(acquisition.SENSORS), acquisition.SAMPLING_RATE)
+    run_pipeline(acquisition, FakeBITalino(samples, realtime=False), len(samples), osc=False)
+    acquisition.archive.close()
+    count = acquisition.histories[1].sample_count
+    reader = ArchiveReader(path)
+    try:
+        assert len(reader) == count
+        # Whatever the sensor loop read is in the archive, the fake device loops over its samples
+        np.testing.assert_array_equal(reader.read(), np.resize(samples, (count, samples.shape[1])))
+    finally:
+        reader.close()
+
+    replay = FakeBITalino.from_archive(path, realtime=False)
+    np.testing.assert_array_equal(replay.samples[:len(samples)], samples)
+    for history in acquisition.histories.values():
+        history.full.clear()
+    acquisition.archive = None
+    acquisition.sensor_thread_status["running"] = True
+    run_pipeline(acquisition, replay, count, osc=False)
+    assert_buffers_hold(acquisition, np.resize(samples, (count, samples.shape[1])))
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import biosignal
+import golden
+from biosignal.bands import BandExtractor, band_power
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_is_lazy():
+    code = ("import sys, biosignal; biosignal.transfer_function; biosignal.BandExtractor; "
+            "print(sorted(m for m in ('scipy', 'matplotlib', 'pythonosc') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT)
+    assert result.stdout.strip() == "[]"
+
+
+def test_eeg_is_in_microvolts():
+    adc = np.array([0, 512, 1023])
+    eeg = biosignal.transfer_function(adc, "EEG")
+    emg = biosignal.transfer_function(adc, "EMG")
+    assert eeg[1] == 0
+    np.testing.assert_allclose(-eeg[0], biosignal.sensor_range("EEG"))
+    np.testing.assert_allclose(biosignal.sensor_range("EEG"), 39.49, atol=0.01)
+    np.testing.assert_allclose(-emg[0], 1.635, atol=0.001)
+
+
+def test_filter_bank_matches_golden():
+    reference = golden.load()
+    bank = biosignal.FilterBank([(50, 30), (1, 30)], 1000)
+    np.testing.assert_allclose(bank.apply(reference["convert_ECG"]), reference["filtered_ECG"], rtol=1e-9, atol=1e-12)
+
+
+def reference_band_power(freqs, magnitudes, freq_range):
+    # Implementation the debug scripts used
+    start_idx = np.where(freqs >= freq_range[0])[0]
+    end_idx = np.where(freqs <= freq_range[1])[0]
+    if len(start_idx) == 0 or len(end_idx) == 0:
+        return 0.0
+    start_idx, end_idx = start_idx[0], end_idx[-1]
+    if start_idx >= len(magnitudes) or end_idx >= len(magnitudes) or start_idx > end_idx:
+        return 0.0
+    return float(np.mean(magnitudes[start_idx:end_idx + 1]))
+
+
+@pytest.mark.parametrize("freq_range", [(1, 4), (8, 13), (60, 200), (0, 1000), (499.5, 600), (600, 700), (5.1, 5.2)])
+def test_band_power_matches_reference(freq_range):
+    freqs, magnitudes = biosignal.compute_fft(golden.load()["filtered_EMG"], 1000, 1000)
+    assert band_power(freqs, magnitudes, freq_range) == pytest.approx(reference_band_power(freqs, magnitudes, freq_range))
+
+
+def test_band_extractor_features():
+    freqs = np.arange(0, 500, 1.0)
+    magnitudes = np.ones(500)
+    magnitudes[0] = 100
+    magnitudes[3] = 50
+    magnitudes[40] = 10
+
+    assert BandExtractor(min_bin=1).dominant(freqs, magnitudes) == (3.0, 50.0)
+    features = BandExtractor(min_bin=5).extract(freqs, magnitudes)
+    assert (features["dominant_freq"], features["dominant_power"]) == (40.0, 10.0)
+    assert features["freq_40hz"] == 10.0
+    assert features["alpha"] == 1.0
+    assert set(features) >= set(biosignal.FREQUENCY_BANDS) | {"total_rms", "freq_100hz"}
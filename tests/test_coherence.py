@@ -0,0 +1,72 @@
+import threading
+
+import numpy as np
+
+from coherence import CoherenceAnalyzer
+from fake_device import FakeBITalino, synthetic_samples
+from fanout import OscUdpSink
+from test_pipeline import run_pipeline
+
+RATE = 1000
+BANDS = {"alpha": (8, 13), "beta": (20, 40), "mains": (45, 55)}
+
+
+def signals(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / RATE
+    alpha = np.sin(2 * np.pi * 10 * t + rng.normal(0, 0.3, n).cumsum() * 0.01)
+    hum = np.sin(2 * np.pi * 50 * t)
+    noise = rng.normal(0, 0.5, (n, 4))
+    return np.column_stack((
+        alpha + noise[:, 0] + hum,
+        # Same alpha, scaled and offset like a different gain
+        300 * alpha + 512 + 300 * noise[:, 1] + hum,
+        -alpha + noise[:, 2] + hum,
+        noise[:, 3] + 5 * hum,
+    ))
+
+def test_coherence_and_correlation_matrices():
+    data = signals()
+    analyzer = CoherenceAnalyzer(4, RATE, BANDS, exclude=[(48, 52)])
+    for start in range(0, len(data), 10):
+        analyzer.push(data[start:start + 10])
+        if start % 100 == 0:
+            analyzer.update()
+    analyzer.update()
+    assert analyzer.frames == (len(data) - 256) // 128 + 1
+
+    coherence = analyzer.coherence()
+    alpha = coherence["alpha"]
+    np.testing.assert_allclose(np.diagonal(alpha), 1)
+    np.testing.assert_allclose(alpha, alpha.T)
+    assert alpha[0, 1] > 0.5 and alpha[0, 2] > 0.5
+    assert alpha[0, 3] < 0.1
+    assert coherence["beta"][0, 1] < 0.2
+    # The common hum is left out
+    assert coherence["mains"][0, 3] < 0.2
+
+    correlation = analyzer.correlation()
+    np.testing.assert_allclose(np.diagonal(correlation), 1)
+    assert correlation[0, 1] > 0.2 and correlation[0, 2] < -0.2
+    assert abs(correlation[0, 3]) < 0.1
+
+def test_catches_up_after_falling_behind():
+    analyzer = CoherenceAnalyzer(2, RATE, BANDS, buffer_seconds=1)
+    analyzer.push(signals(5000)[:, :2])
+    assert analyzer.update() > 0
+    assert analyzer.next_end > 5000 - analyzer.hop
+
+def test_pipeline_publishes_matrices(acquisition, osc_listener):
+    acquisition.COHERENCE_RATE = 20
+    acquisition.fanout.add_sink(OscUdpSink("test", osc_listener.ip, osc_listener.port, bundle=True))
+    processing = threading.Thread(target=acquisition.data_processing_loop)
+    processing.start()
+    run_pipeline(acquisition, FakeBITalino(synthetic_samples(1000, len(acquisition.SENSORS), seed=8), realtime=True), 1000, osc=False)
+    processing.join(timeout=5)
+
+    n = len(acquisition.SENSORS)
+    assert osc_listener.wait_for(lambda listener: listener.received("/correlation"), timeout=1)
+    correlation = np.array(osc_listener.received("/correlation")[-1][2]).reshape(n, n)
+    np.testing.assert_allclose(np.diagonal(correlation), 1, atol=1e-6)
+    for band in acquisition.COHERENCE_BANDS:
+        assert len(osc_listener.received(f"/coherence/{band}")[-1][2]) == n * n
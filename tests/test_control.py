@@ -0,0 +1,83 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from fake_device import FakeBITalino, synthetic_samples
+from test_pipeline import run_pipeline
+
+
+def test_controls_rejected_while_exporting(acquisition):
+    acquisition.exporter = object()
+    with pytest.raises(ValueError):
+        acquisition.control_fft_size(512)
+    with pytest.raises(ValueError):
+        acquisition.control_sensor(1, "ECG")
+    with pytest.raises(ValueError):
+        acquisition.control_sensors(1, "ECG", 2, "ECG", 3, "EEG", 4, "EMG")
+    # Unchanged sensors are not a change
+    acquisition.control_sensors(*[value for sensor in acquisition.SENSORS for value in sensor])
+    acquisition.control_processing_rate(20)
+    assert set(acquisition.pending_config.take()) == {"SENSORS", "PROCESSING_RATE"}
+
+    acquisition.exporter = None
+    acquisition.control_fft_size(512)
+    assert acquisition.pending_config.take() == {"FFT_SIZE": 512}
+
+def test_staged_changes_applied_between_chunks(acquisition):
+    samples = synthetic_samples(2000, len(acquisition.SENSORS), seed=13)
+    device = FakeBITalino(samples)
+
+    def change():
+        while acquisition.histories[2].sample_count < 500:
+            time.sleep(0.005)
+        acquisition.control_sensor(1, "ECG")
+        acquisition.control_fft_size(512)
+
+    thread = threading.Thread(target=change)
+    thread.start()
+    run_pipeline(acquisition, device, 1500, osc=False)
+    thread.join()
+
+    assert acquisition.SENSORS[0] == (1, "ECG") and acquisition.FFT_SIZE == 512
+    assert acquisition.pending_config.take() == {}
+    # Port 1 restarted empty on the change, every sample since then converted as ECG
+    ring = acquisition.data_buffers[1]
+    count = acquisition.histories[2].sample_count
+    assert 0 < len(ring) < count
+    # The count goes on through the change, so OSC blocks and stream positions continue
+    assert acquisition.histories[1].sample_count == count
+    rows = np.resize(samples, (count, samples.shape[1]))[-len(ring):]
+    np.testing.assert_allclose(ring.latest(), acquisition.transfer_function(rows[:, 5], "ECG"), rtol=1e-12)
+
+def test_non_contiguous_ports_read_their_own_columns(acquisition):
+    # One constant per channel, so every ring shows which column it was fed from
+    samples = synthetic_samples(2000, 4, seed=14)
+    samples[:, 5:9] = [100, 200, 300, 400]
+    device = FakeBITalino(samples)
+    types = dict(acquisition.SENSORS)
+
+    def change():
+        while acquisition.histories[1].sample_count < 300:
+            time.sleep(0.005)
+        acquisition.control_sensors(1, types[1], 3, types[3], 4, types[4], 6, "EEG")
+
+    thread = threading.Thread(target=change)
+    thread.start()
+    run_pipeline(acquisition, device, 1500, osc=False)
+    thread.join()
+
+    assert [port for port, sensor_type in acquisition.SENSORS] == [1, 3, 4, 6]
+    assert not acquisition.sensor_thread_status["disconnected"]
+    assert acquisition.histories[6].sample_count > 0
+    # Channels come in port order: ports 1, 3, 4, 6 are the 1st to 4th channel
+    for port, raw in [(1, 100), (3, 200), (4, 300), (6, 400)]:
+        sensor_type = dict(acquisition.SENSORS)[port]
+        np.testing.assert_allclose(acquisition.data_buffers[port].latest(50),
+                                   acquisition.transfer_function(np.full(50, raw), sensor_type), rtol=1e-12)
+
+@pytest.mark.parametrize("values", [(1, "EMG", 1, "ECG"), (0, "EMG"), (7, "EMG"), (1, "XYZ")])
+def test_invalid_port_sets_rejected(acquisition, values):
+    with pytest.raises(ValueError):
+        acquisition.control_sensors(*values)
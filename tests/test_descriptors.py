@@ -0,0 +1,63 @@
+import threading
+
+import numpy as np
+import pytest
+
+from biosignal.descriptors import SpectralDescriptors
+from biosignal.spectrum import compute_fft
+from fake_device import FakeBITalino, synthetic_samples
+from fanout import OscUdpSink
+from test_pipeline import run_pipeline
+
+RATE = 1000
+SIZE = 1024
+
+
+def spectra(*signals):
+    freqs = compute_fft(signals[0], RATE, SIZE)[0]
+    return freqs, np.array([compute_fft(signal, RATE, SIZE)[1] for signal in signals])
+
+def test_descriptors_of_tone_and_noise():
+    t = np.arange(SIZE) / RATE
+    rng = np.random.default_rng(0)
+    freqs, magnitudes = spectra(np.sin(2 * np.pi * 123.4 * t), rng.normal(size=SIZE), np.full(SIZE, np.nan))
+    values = SpectralDescriptors(3).update(freqs, magnitudes)
+
+    tone, noise, missing = (dict((name, value[row]) for name, value in values.items()) for row in range(3))
+    # Within a tenth of a bin (0.98 Hz), where the highest bin alone is 0.4 Hz off
+    assert tone["peak"] == pytest.approx(123.4, abs=0.1)
+    assert tone["centroid"] == pytest.approx(123.4, abs=5)
+    assert tone["rolloff"] == pytest.approx(123.4, abs=1)
+    assert tone["flatness"] < 0.01
+    assert noise["flatness"] > 0.4
+    assert noise["centroid"] == pytest.approx(250, rel=0.1)
+    assert noise["rolloff"] == pytest.approx(0.85 * 500, rel=0.1)
+    assert all(np.isnan(value) for value in missing.values())
+    # No previous spectrum yet
+    assert np.isnan(tone["flux"])
+
+def test_flux():
+    t = np.arange(SIZE) / RATE
+    analyzer = SpectralDescriptors(2)
+    freqs, first = spectra(np.sin(2 * np.pi * 50 * t), np.sin(2 * np.pi * 50 * t))
+    analyzer.update(freqs, first)
+    freqs, second = spectra(np.sin(2 * np.pi * 50 * t), np.sin(2 * np.pi * 200 * t))
+    flux = analyzer.update(freqs, second)["flux"]
+    assert flux[0] == pytest.approx(0, abs=1e-9)
+    assert flux[1] > 0.9
+    # A channel without spectrum restarts its flux
+    second[1] = np.nan
+    analyzer.update(freqs, second)
+    assert np.isnan(analyzer.update(freqs, first)["flux"][1])
+
+def test_descriptors_published(acquisition, osc_listener):
+    acquisition.fanout.add_sink(OscUdpSink("test", osc_listener.ip, osc_listener.port, bundle=True))
+    thread = threading.Thread(target=acquisition.data_processing_loop)
+    thread.start()
+    run_pipeline(acquisition, FakeBITalino(synthetic_samples(2000, len(acquisition.SENSORS), seed=8), realtime=True), 2000)
+    thread.join(timeout=5)
+
+    for address in ("/EMG1/centroid", "/ECG2/flux", "/EEG3/rolloff", "/EMG4/flatness", "/EMG1/peak"):
+        assert osc_listener.received(address), address
+    assert 0 < osc_listener.received("/EMG1/peak")[-1][2][0] < RATE / 2
+    assert "EMG1/centroid" in acquisition.descriptor_values
@@ -0,0 +1,111 @@
+import time
+
+import numpy as np
+
+from evoked import EvokedAverager, RunningAverage
+from fake_device import FakeBITalino, synthetic_samples
+from fanout import OscUdpSink
+from history import RingBuffer
+from test_pipeline import run_pipeline
+
+RATE = 1000
+CHUNK = 10
+
+
+def test_ring_read_into():
+    ring = RingBuffer(8)
+    ring.extend(np.arange(12.0))
+    out = np.zeros(5)
+    assert ring.read_into(5, out)
+    np.testing.assert_array_equal(out, [5, 6, 7, 8, 9])
+    assert not ring.read_into(3, out)  # overwritten
+    assert not ring.read_into(9, out)  # not written yet
+
+def test_running_average_matches_numpy():
+    epochs = np.random.default_rng(0).normal(size=(20, 50))
+    average = RunningAverage(50)
+    for epoch in epochs:
+        average.add(epoch)
+    np.testing.assert_allclose(average.mean, epochs.mean(axis=0))
+    np.testing.assert_allclose(average.variance, epochs.var(axis=0, ddof=1))
+
+def test_averages_time_locked_response():
+    # Noise plus a response 100 ms after each button press on digital column 1
+    rng = np.random.default_rng(1)
+    n = 20000
+    signal = rng.normal(0, 1, n)
+    digital = np.zeros((n, 4))
+    response = np.exp(-((np.arange(300) - 100) / 20.0) ** 2) * 2
+    onsets = np.arange(1000, n - 1000, 700)
+    for onset in onsets:
+        digital[onset:onset + 50, 0] = 1
+        signal[onset:onset + 300] += response
+    # A bounce right after one press is ignored
+    digital[onsets[0] + 20:onsets[0] + 25, 0] = 0
+
+    ring = RingBuffer(4000)
+    averager = EvokedAverager({1: "press"}, RATE, window=(-0.1, 0.4))
+    for start in range(0, n, CHUNK):
+        ring.extend(signal[start:start + CHUNK])
+        averager.detect(digital[start:start + CHUNK])
+        averager.collect({1: ring})
+
+    mean, std, count = averager.average("press", 1)
+    assert count == len(onsets)
+    assert len(mean) == len(averager.times) == 500
+    # Averaging n epochs shrinks the noise by sqrt(n)
+    np.testing.assert_allclose(mean[100:400], response, atol=4 / np.sqrt(count))
+    assert abs(averager.times[np.argmax(mean)] - 0.1) <= 0.005
+    np.testing.assert_allclose(std[:100], 1, atol=0.35)
+    assert averager.average("press", 2) is None
+
+def test_falling_edges_and_save(tmp_path):
+    digital = np.zeros((3000, 4))
+    digital[:, 3] = 1
+    digital[1000:2000, 3] = 0
+    ring = RingBuffer(3000)
+    ring.extend(np.ones(3000))
+    averager = EvokedAverager({4: "ttl"}, RATE, window=(-0.1, 0.1), edge="falling")
+    assert averager.detect(digital) == 1
+    assert averager.collect({2: ring}) == [("ttl", 2)]
+    assert averager.save(str(tmp_path / "evoked.npz")) == 3
+    with np.load(tmp_path / "evoked.npz") as saved:
+        assert int(saved["ttl_2_count"]) == 1
+        np.testing.assert_array_equal(saved["ttl_2_mean"], 0)  # baseline removed
+
+def test_pipeline_publishes_averages(acquisition, osc_listener):
+    acquisition.evoked = acquisition.EvokedAverager({1: "button"}, acquisition.SAMPLING_RATE, (-0.1, 0.2))
+    acquisition.fanout.add_sink(OscUdpSink("test", osc_listener.ip, osc_listener.port, bundle=True))
+    # synthetic_samples toggles digital column 1 every 250 samples
+    samples = synthetic_samples(3000, len(acquisition.SENSORS), seed=7)
+    run_pipeline(acquisition, FakeBITalino(samples, realtime=False), 3000, osc=False)
+    time.sleep(0.1)
+
+    counts = osc_listener.received("/evoked/button/count")
+    assert counts and counts[-1][2][0] == acquisition.evoked.average("button", 1)[2] >= 4
+    waveform = osc_listener.received("/evoked/button/EMG1")[-1][2]
+    assert len(waveform) == 300
+
+def test_reset_port_drops_its_averages_and_older_epochs():
+    digital = np.zeros((3000, 4))
+    digital[[500, 1500, 2500], 0] = 1
+    rings = {1: RingBuffer(4000), 2: RingBuffer(4000)}
+    averager = EvokedAverager({1: "press"}, RATE, window=(-0.1, 0.2), refractory=0.01)
+    for start in range(0, 1600, CHUNK):
+        for ring in rings.values():
+            ring.extend(np.ones(CHUNK))
+        averager.detect(digital[start:start + CHUNK])
+        averager.collect(rings)
+    assert averager.average("press", 1)[2] == averager.average("press", 2)[2] == 1
+
+    # Port 2 changes unit: its samples and averages are dropped, the epoch straddling the change too
+    rings[2].clear()
+    averager.reset_port(2)
+    for start in range(1600, 3000, CHUNK):
+        for ring in rings.values():
+            ring.extend(np.ones(CHUNK))
+        averager.detect(digital[start:start + CHUNK])
+        averager.collect(rings)
+    assert averager.average("press", 1)[2] == 3
+    assert averager.average("press", 2)[2] == 1
+    assert averager.dropped == 1
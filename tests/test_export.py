@@ -0,0 +1,143 @@
+import glob
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from archive import ArchiveWriter
+from biosignal.convert import GAINS, transfer_function
+from export import SessionExporter, export_archive
+from fake_device import FakeBITalino, synthetic_samples
+from test_pipeline import run_pipeline
+
+SENSORS = [(1, "EMG"), (2, "ECG"), (3, "EEG"), (4, "EMG")]
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "hdf5": ".h5"}
+
+
+def read_tables(path, file_format):
+    """{table: ({column: array}, metadata)} of every table in an export"""
+    tables = {}
+    if file_format == "hdf5":
+        h5py = pytest.importorskip("h5py")
+        with h5py.File(path, "r") as f:
+            for name, group in f.items():
+                tables[name] = ({column: group[column][:] for column in group}, json.loads(group.attrs["bitalino"]))
+        return tables
+
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    stem, ext = os.path.splitext(path)
+    for table_path in [path] + sorted(glob.glob(f"{stem}.*{ext}")):
+        name = "samples" if table_path == path else table_path[len(stem) + 1:-len(ext)]
+        table = pq.read_table(table_path) if file_format == "parquet" else pa.ipc.open_file(table_path).read_all()
+        columns = {}
+        for column in table.column_names:
+            values = table.column(column)
+            if pa.types.is_fixed_size_list(values.type):
+                columns[column] = np.array(values.to_pylist())
+            else:
+                columns[column] = values.to_numpy()
+        tables[name] = (columns, json.loads(table.schema.metadata[b"bitalino"]))
+    return tables
+
+def check_samples(columns, samples, sensors):
+    np.testing.assert_array_equal(columns["sample"], np.arange(len(samples)))
+    np.testing.assert_allclose(columns["time"], np.arange(len(samples)) / 1000)
+    for i in range(4):
+        np.testing.assert_array_equal(columns[f"I{i + 1}"], samples[:, i + 1])
+    # Active ports come in ascending order after the 5 fixed columns
+    ports = sorted(port for port, sensor_type in sensors)
+    for port, sensor_type in sensors:
+        adc = samples[:, 5 + ports.index(port)]
+        np.testing.assert_array_equal(columns[f"{sensor_type}{port}_raw"], adc)
+        np.testing.assert_allclose(columns[f"{sensor_type}{port}"], transfer_function(adc, sensor_type), rtol=1e-6)
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow", "hdf5"])
+def test_round_trip(tmp_path, file_format):
+    pytest.importorskip("h5py" if file_format == "hdf5" else "pyarrow")
+    path = str(tmp_path / f"session{EXTENSIONS[file_format]}")
+    sensors = [(1, "EMG"), (3, "EEG"), (5, "ECG")]
+    samples = synthetic_samples(2500, 3, seed=31)
+    exporter = SessionExporter(path, sensors, GAINS, 1000, row_group_size=1000)
+    for start in range(0, len(samples), 100):
+        exporter.write_samples(samples[start:start + 100], transfer_function)
+        exporter.write_features([1.0, 2.0, 3.0], [4.0, 5.0, 6.0], [np.nan, np.nan, 72.0])
+        if start % 1000 == 0:
+            exporter.write_spectrum(3, np.linspace(0, 1, 16))
+    exporter.close()
+
+    tables = read_tables(path, file_format)
+    assert set(tables) == {"samples", "features", "spectra"}
+    columns, metadata = tables["samples"]
+    check_samples(columns, samples, sensors)
+    assert metadata["sampling_rate"] == 1000
+    assert metadata["channels"]["EEG3"] == {"port": 3, "sensor": "EEG", "gain": GAINS["EEG"], "unit": "uV"}
+    assert metadata["channels"]["ECG5"]["unit"] == "mV"
+    assert all(table_metadata == metadata for columns, table_metadata in tables.values())
+
+    features, metadata = tables["features"]
+    np.testing.assert_array_equal(features["sample"], np.arange(99, 2500, 100))
+    np.testing.assert_array_equal(features["EEG3_rms"], 5.0)
+    np.testing.assert_array_equal(features["ECG5_bpm"], 72.0)
+    assert "EMG1_bpm" not in features
+
+    spectra, metadata = tables["spectra"]
+    np.testing.assert_array_equal(spectra["sample"], [100, 1100, 2100])
+    np.testing.assert_array_equal(spectra["port"], 3)
+    np.testing.assert_allclose(spectra["magnitudes"], np.tile(np.linspace(0, 1, 16), (3, 1)), rtol=1e-6)
+
+def test_export_archive(tmp_path):
+    pytest.importorskip("pyarrow")
+    samples = synthetic_samples(5000, len(SENSORS), seed=32)
+    archive_path = str(tmp_path / "session.bitarc")
+    writer = ArchiveWriter(archive_path, len(SENSORS), 1000, chunk_size=1024)
+    writer.write(samples)
+    writer.close()
+    path = str(tmp_path / "session.parquet")
+    export_archive(archive_path, path, SENSORS, GAINS, transfer_function, row_group_size=2000)
+    check_samples(read_tables(path, "parquet")["samples"][0], samples, SENSORS)
+
+def test_export_while_acquiring(acquisition, tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "live.parquet")
+    acquisition.exporter = SessionExporter(path, acquisition.SENSORS, GAINS, acquisition.SAMPLING_RATE, row_group_size=500)
+    samples = synthetic_samples(2000, len(acquisition.SENSORS), seed=33)
+    run_pipeline(acquisition, FakeBITalino(samples, realtime=False), len(samples), osc=False)
+    acquisition.exporter.close()
+    count = acquisition.exporter.sample_count
+    acquisition.exporter = None
+
+    tables = read_tables(path, "parquet")
+    check_samples(tables["samples"][0], np.resize(samples, (count, samples.shape[1])), acquisition.SENSORS)
+    features = tables["features"][0]
+    assert features["sample"][-1] == count - 1
+    assert all(f"{sensor_type}{port}_rms" in features for port, sensor_type in acquisition.SENSORS)
+
+
+def rows(start, n):
+    return {"sample": np.arange(start, start + n), "value": np.arange(start, start + n, dtype=np.float32)}
+
+def test_slow_writer_drops_groups_without_blocking(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "session.parquet")
+    exporter = SessionExporter(path, [(1, "EEG")], GAINS, 1000, row_group_size=10, max_pending_groups=2)
+    gate = threading.Event()
+    write_group = exporter.backend.write_group
+    exporter.backend.write_group = lambda name, columns: (gate.wait(), write_group(name, columns))
+
+    start = time.perf_counter()
+    for i in range(10):
+        exporter.write("samples", rows(10 * i, 10))
+    assert time.perf_counter() - start < 0.5
+    assert exporter.dropped_groups > 0 and exporter.dropped_rows == 10 * exporter.dropped_groups
+
+    gate.set()
+    exporter.write("samples", rows(100, 5))
+    exporter.close()
+    table = pq.read_table(path)
+    assert table.num_rows == 105 - exporter.dropped_rows
+    # The partial group written on close is never dropped
+    assert table.column("sample").to_pylist()[-5:] == list(range(100, 105))
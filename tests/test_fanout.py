@@ -0,0 +1,41 @@
+import threading
+
+from fanout import FanOut, QueueSink
+
+
+def drain(sink, count, timeout=2):
+    return [sink.output.get(timeout=timeout) for _ in range(count)]
+
+def test_auxiliary_batches_skip_tick_decimation():
+    fanout = FanOut()
+    sink = fanout.add_sink(QueueSink("test", decimation=2, queue_size=1000))
+    try:
+        for tick in range(4):
+            fanout.publish([("/tick", tick)])
+            fanout.publish([("/aux", tick)], tick=False)
+        batches = drain(sink, 6)
+        # Every auxiliary batch kept, one tick out of two, the auxiliary batches don't shift the tick phase
+        assert sorted(value for batch in batches for address, value in batch if address == "/aux") == [0, 1, 2, 3]
+        assert [value for batch in batches for address, value in batch if address == "/tick"] == [1, 3]
+        assert sink.tick_count == 4
+    finally:
+        fanout.close()
+
+def test_concurrent_publishers_count_every_tick():
+    fanout = FanOut()
+    sink = fanout.add_sink(QueueSink("test", decimation=10, queue_size=100000))
+    try:
+        def publish():
+            for _ in range(2000):
+                fanout.publish([("/tick", 0)])
+
+        threads = [threading.Thread(target=publish) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sink.tick_count == 8000
+        assert len(drain(sink, 800)) == 800
+        assert sink.output.empty()
+    finally:
+        fanout.close()
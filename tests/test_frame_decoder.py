@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+import pytest
+
+from fake_device import FakeBITalino, synthetic_samples
+from frame_decoder import FrameDecoder, frame_size
+
+
+@pytest.mark.parametrize("n_channels", range(1, 7))
+def test_frame_size(n_channels):
+    expected = {1: 3, 2: 4, 3: 6, 4: 7, 5: 8, 6: 8}
+    assert frame_size(n_channels) == expected[n_channels]
+
+
+@pytest.mark.parametrize("n_channels", range(1, 7))
+def test_decoder_returns_the_encoded_rows(n_channels):
+    samples = synthetic_samples(1000, n_channels)
+    device = FakeBITalino(samples, chunk=100, realtime=False)
+    device.start(1000, list(range(n_channels)))
+    try:
+        decoder = FrameDecoder(device, 250)
+        rows = np.concatenate([decoder.read(n).copy() for n in (1, 10, 250, 400, 339)])
+    finally:
+        device.close()
+    np.testing.assert_array_equal(rows, samples)
+
+
+def test_decoder_matches_reference_reader():
+    samples = synthetic_samples(600, 4, seed=3)
+    results = []
+    for fast in (True, False):
+        device = FakeBITalino(samples, chunk=100, realtime=False)
+        device.start(1000, [1, 2, 3, 4])
+        try:
+            reader = FrameDecoder(device) if fast else device
+            results.append(reader.read(600))
+        finally:
+            device.close()
+    np.testing.assert_array_equal(results[0], results[1])
+
+
+def test_decoder_writes_into_caller_buffer():
+    samples = synthetic_samples(50, 2)
+    device = FakeBITalino(samples, realtime=False)
+    device.start(1000, [1, 2])
+    try:
+        out = np.full((100, 7), -1.0)
+        rows = FrameDecoder(device).read(50, out=out)
+    finally:
+        device.close()
+    assert np.shares_memory(rows, out)
+    np.testing.assert_array_equal(out[:50], samples)
+    assert (out[50:] == -1).all()
+
+
+def test_corrupted_frame_raises():
+    pytest.importorskip("bitalino")
+    samples = synthetic_samples(20, 4)
+    device = FakeBITalino(samples, realtime=False)
+    frames = bytearray(device.frames)
+    frames[3 * frame_size(4)] ^= 0x01
+    device.frames = bytes(frames)
+    device.start(1000, [1, 2, 3, 4])
+    try:
+        with pytest.raises(Exception):
+            FrameDecoder(device).read(20)
+    finally:
+        device.close()
+
+
+def test_decoder_is_faster_than_reference():
+    samples = synthetic_samples(2500, 4)
+    timings = []
+    for fast in (True, False):
+        device = FakeBITalino(samples, chunk=2500, realtime=False)
+        device.start(1000, [1, 2, 3, 4])
+        try:
+            reader = FrameDecoder(device, 250) if fast else device
+            # Wait for the whole recording to be buffered so only decoding is timed
+            while device.sent < len(samples):
+                time.sleep(0.001)
+            start = time.perf_counter()
+            for i in range(10):
+                reader.read(250)
+            timings.append(time.perf_counter() - start)
+        finally:
+            device.close()
+    assert timings[0] * 5 < timings[1]
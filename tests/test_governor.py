@@ -0,0 +1,71 @@
+from governor import LoadGovernor
+
+LEVELS = [{}, {"plot": 1 / 3}, {"plot": 1 / 3, "process": 1 / 2}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run_window(governor, clock, busy, backlog=0):
+    """One second in which each stage reported `busy[stage]` seconds of work"""
+    governor.observe_backlog(backlog)
+    clock.now += 0.5
+    for stage, seconds in busy.items():
+        governor.observe(stage, seconds)
+    # The first report past the window end evaluates it
+    clock.now += 0.5
+    governor.observe("sensor", 0.0)
+
+
+def test_sheds_in_order_and_never_acquisition():
+    clock = Clock()
+    changes = []
+    governor = LoadGovernor(LEVELS, budget=0.8, clock=clock, on_change=lambda g: changes.append(g.level))
+    run_window(governor, clock, {"sensor": 0.2, "process": 0.4, "plot": 0.6})
+    assert governor.level == 1
+    assert governor.rate("plot", 30) == 10
+    assert governor.rate("process", 50) == 50
+    run_window(governor, clock, {"sensor": 0.2, "process": 0.5, "plot": 0.2})
+    assert governor.level == 2
+    assert governor.rate("process", 50) == 25
+    # Nothing left to shed
+    run_window(governor, clock, {"sensor": 0.9})
+    assert governor.level == 2
+    assert governor.rate("sensor", 1000) == 1000
+    assert changes == [1, 2]
+
+def test_restores_with_hysteresis():
+    clock = Clock()
+    governor = LoadGovernor(LEVELS, budget=0.8, restore_windows=3, clock=clock)
+    run_window(governor, clock, {"sensor": 0.2, "plot": 0.8})
+    assert governor.level == 1
+    # At full rate the plot would be back at 0.6 + 0.2: stay degraded
+    for i in range(5):
+        run_window(governor, clock, {"sensor": 0.2, "plot": 0.2})
+    assert governor.level == 1
+    # Lighter frames: restored only after restore_windows calm windows
+    for i in range(2):
+        run_window(governor, clock, {"sensor": 0.2, "plot": 0.05})
+    assert governor.level == 1
+    run_window(governor, clock, {"sensor": 0.2, "plot": 0.05})
+    assert governor.level == 0
+    assert "full quality" in governor.describe()
+
+def test_reader_backlog_sheds_load():
+    clock = Clock()
+    governor = LoadGovernor(LEVELS, budget=0.8, backlog_limit=100, clock=clock)
+    run_window(governor, clock, {"sensor": 0.1}, backlog=500)
+    assert governor.level == 1
+    run_window(governor, clock, {"sensor": 0.1})
+    assert governor.level == 1
+
+def test_single_level_never_changes():
+    clock = Clock()
+    governor = LoadGovernor([{}], clock=clock)
+    run_window(governor, clock, {"process": 2.0}, backlog=10 ** 6)
+    assert governor.level == 0
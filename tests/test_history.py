@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from fanout import QueueSink
+from history import HistoryStore
+
+RATE = 1000
+
+
+def brute_force(signal, decimation, n):
+    """(times, lows, highs, means) of the last n complete buckets of `decimation` samples"""
+    total = len(signal)
+    first = total // decimation - n
+    buckets = signal[first * decimation:(first + n) * decimation].reshape(n, decimation)
+    starts = (first + np.arange(n)) * decimation
+    times = (starts + (decimation - 1) / 2 - (total - 1)) / RATE
+    return times, buckets.min(axis=1), buckets.max(axis=1), buckets.mean(axis=1)
+
+@pytest.fixture(scope="module")
+def filled():
+    rng = np.random.default_rng(3)
+    signal = np.cumsum(rng.normal(size=123457))
+    history = HistoryStore(RATE, full_seconds=2, tier_seconds=(60, 600, 3600))
+    # Uneven chunks so buckets straddle appends
+    start = 0
+    while start < len(signal):
+        n = int(rng.integers(1, 700))
+        history.append(signal[start:start + n])
+        start += n
+    return history, signal
+
+@pytest.mark.parametrize("seconds, max_points, decimation, n", [
+    (1.5, 2000, 1, 1500),       # fits at full rate
+    (10, 2000, 10, 1000),       # first tier
+    (30, 500, 100, 300),        # too many points for the first tier
+    (120, 2000, 100, 1200),
+    (100000, 2000, 1000, 123),  # coarsest tier, as much as was recorded
+    (100000, 50, 1000, 50),     # coarsest tier, capped at max_points
+])
+def test_query_matches_brute_force_decimation(filled, seconds, max_points, decimation, n):
+    history, signal = filled
+    times, lows, highs, means = history.query(seconds, max_points)
+    expected = brute_force(signal, decimation, n)
+    assert len(means) == n
+    np.testing.assert_allclose(times, expected[0])
+    np.testing.assert_array_equal(lows, expected[1])
+    np.testing.assert_array_equal(highs, expected[2])
+    np.testing.assert_allclose(means, expected[3], rtol=1e-12, atol=1e-9)
+
+def test_query_limited_to_the_tier_capacity(filled):
+    history, signal = filled
+    # 60 s at 10x is 6000 buckets, the ring keeps the last 6000 of 12345
+    times, lows, highs, means = history.query(100, 10000)
+    np.testing.assert_array_equal(lows, brute_force(signal, 10, 6000)[1])
+
+def test_history_query_control(acquisition):
+    history = acquisition.histories[1]
+    history.append(np.arange(5000.0))
+    sink = acquisition.fanout.add_sink(QueueSink("test"))
+    acquisition.control_history(1, 2, 100)
+    batch = dict(sink.output.get(timeout=2))
+    name = f"{dict(acquisition.SENSORS)[1]}1"
+    assert batch[f"/{name}/history/mean"] == history.query(2, 100)[3].tolist()
+    assert len(batch[f"/{name}/history/time"]) == 20
+    with pytest.raises(ValueError):
+        acquisition.control_history(7, 2)
+    with pytest.raises(ValueError):
+        acquisition.control_history(1, 2, acquisition.HISTORY_QUERY_POINTS + 1)
+
+def test_clear_keeps_the_count():
+    history = HistoryStore(RATE, full_seconds=1, tier_seconds=(10, 100, 1000))
+    history.append(np.full(2345, 5.0))
+    history.reset()
+    assert history.sample_count == 2345 and len(history.full) == 0
+    assert history.full.since(2000) == (2345, pytest.approx(np.zeros(0)))
+    history.append(np.arange(30.0))
+    # Readers holding a count from before the reset only get the new samples
+    first, rows = history.full.since(2000)
+    assert first == 2345
+    np.testing.assert_array_equal(rows, np.arange(30.0))
+    assert not history.full.read_into(2340, np.zeros(10))
+    assert history.full.read_into(2350, out := np.zeros(10))
+    np.testing.assert_array_equal(out, np.arange(5.0, 15.0))
+    np.testing.assert_array_equal(history.full.latest_into(np.zeros(100)), np.arange(30.0))
+
+    # Tiers restarted too: buckets of the new samples only, timed from the reset
+    times, lows, highs, means = history.query(0.03, 3)
+    np.testing.assert_array_equal(lows, [0, 10, 20])
+    np.testing.assert_array_equal(highs, [9, 19, 29])
+    np.testing.assert_allclose(times, [-24.5 / RATE, -14.5 / RATE, -4.5 / RATE])
+
+def test_reset_to_a_count():
+    history = HistoryStore(RATE, full_seconds=1)
+    history.reset(1000)
+    history.append(np.arange(20.0))
+    assert history.sample_count == 1020
+    assert history.full.since(0) == (1000, pytest.approx(np.arange(20.0)))
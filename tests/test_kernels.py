@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from biosignal import kernels
+from biosignal.filters import biquad
+from biosignal.streaming import StreamingFeatures
+from fake_device import FakeBITalino, synthetic_samples
+from fanout import OscUdpSink
+from test_pipeline import run_pipeline
+
+RATE = 1000
+CHUNK = 10
+
+
+@pytest.fixture(params=kernels.BACKENDS)
+def backend(request):
+    if request.param == "numba":
+        pytest.importorskip("numba")
+    kernels.use_backend(request.param)
+    yield request.param
+    kernels.use_backend()
+
+
+def chunked(kernel, x, *state, chunk=CHUNK):
+    out = np.zeros_like(x)
+    for start in range(0, len(x), chunk):
+        kernel(x[start:start + chunk], *state, out[start:start + chunk])
+    return out
+
+def test_biquad_matches_butterworth():
+    signal = pytest.importorskip("scipy.signal")
+    np.testing.assert_allclose(biquad("highpass", 20, RATE), signal.butter(2, 20, "highpass", fs=RATE, output="sos")[0], atol=1e-12)
+    np.testing.assert_allclose(biquad("lowpass", 15, RATE), signal.butter(2, 15, fs=RATE, output="sos")[0], atol=1e-12)
+
+def test_sosfilt_matches_scipy(backend):
+    signal = pytest.importorskip("scipy.signal")
+    x = np.random.default_rng(0).normal(size=(1000, 3))
+    sos = signal.butter(4, [5, 15], "bandpass", fs=RATE, output="sos")
+    state = np.zeros((len(sos), 3, 2))
+    out = chunked(lambda chunk, out: kernels.sosfilt(sos, chunk, state, out), x)
+    np.testing.assert_allclose(out, signal.sosfilt(sos, x, axis=0), atol=1e-12)
+
+def test_moving_rms(backend):
+    x = np.random.default_rng(1).normal(size=(1000, 2))
+    out = chunked(kernels.moving_rms, x, np.zeros((50, 2)), np.zeros(1, dtype=np.int64), chunk=7)
+    padded = np.concatenate((np.zeros((50, 2)), np.cumsum(x * x, axis=0)))
+    np.testing.assert_allclose(out, np.sqrt((padded[50:] - padded[:-50]) / 50), atol=1e-12)
+
+def test_lms_cancels_reference(backend):
+    t = np.arange(4000) / RATE
+    reference = np.column_stack((np.sin(2 * np.pi * 50 * t), np.cos(2 * np.pi * 50 * t)))
+    clean = np.random.default_rng(2).normal(0, 0.1, (4000, 1))
+    weights = np.zeros((1, 2))
+    out = np.zeros_like(clean)
+    kernels.lms(clean + 2 * np.sin(2 * np.pi * 50 * t + 0.5)[:, None], reference, weights, 0.05, out)
+    np.testing.assert_allclose(weights[0], [2 * np.cos(0.5), 2 * np.sin(0.5)], atol=0.05)
+    assert np.std(out[-1000:] - clean[-1000:]) < 0.05
+
+def test_backends_agree():
+    pytest.importorskip("numba")
+    x = np.random.default_rng(3).normal(size=(2000, 2))
+    results = {}
+    for name in kernels.BACKENDS:
+        kernels.use_backend(name)
+        results[name] = (
+            chunked(kernels.envelope, x, np.zeros(2), 0.1, 0.01),
+            chunked(kernels.threshold_peaks, x * x, np.zeros((4, 2)), 200),
+        )
+    kernels.use_backend()
+    for numba_result, numpy_result in zip(results["numba"], results["numpy"]):
+        np.testing.assert_allclose(numba_result, numpy_result, atol=1e-12)
+
+def test_streaming_features_heart_rate_and_envelope(backend):
+    n = 15000
+    t = np.arange(n) / RATE
+    rng = np.random.default_rng(4)
+    ecg = 0.3 * np.sin(2 * np.pi * 50 * t) + 0.05 * rng.normal(size=n)
+    for beat in range(500, n - 20, 800):  # 75 bpm
+        ecg[beat - 10:beat + 10] += np.hanning(20)
+    emg = rng.normal(0, 0.05, n) + 0.5 * np.sin(2 * np.pi * 50 * t)
+    emg[8000:10000] += rng.normal(0, 0.5, 2000)
+
+    features = StreamingFeatures(["EMG", "ECG"], RATE, CHUNK)
+    envelope = []
+    for start in range(0, n, CHUNK):
+        features.input[:, 0] = emg[start:start + CHUNK]
+        features.input[:, 1] = ecg[start:start + CHUNK]
+        features.update(CHUNK)
+        envelope.append(features.envelope[0])
+    np.testing.assert_allclose(features.bpm[1], 75, atol=0.5)
+    assert np.isnan(features.bpm[0])
+    # The burst shows through the hum, which the canceller removed
+    assert envelope[950] > 5 * envelope[750]
+    assert envelope[1400] < 0.2 * envelope[950]
+
+def test_pipeline_sends_features(acquisition, osc_listener):
+    acquisition.fanout.add_sink(OscUdpSink("test", osc_listener.ip, osc_listener.port, bundle=True))
+    run_pipeline(acquisition, FakeBITalino(synthetic_samples(1000, len(acquisition.SENSORS), seed=9)), 1000)
+    for port, sensor_type in acquisition.SENSORS:
+        assert osc_listener.received(f"/{sensor_type}{port}/envelope")[-1][2][0] > 0
+        assert osc_listener.received(f"/{sensor_type}{port}/rms")[-1][2][0] > 0
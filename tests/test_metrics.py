@@ -0,0 +1,57 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics import MetricsRegistry, MetricsServer
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    reads = registry.counter("reads_total", "Device reads")
+    depth = registry.gauge("queue_depth", "Batches waiting per sink")
+    stage = registry.histogram("stage_seconds", "Time per stage", buckets=(0.001, 0.01))
+    reads.inc(3)
+    registry.add_collector(lambda: depth.labels(sink="osc").set(2))
+    stage.labels(stage="read").observe(0.0005)
+    stage.labels(stage="read").observe(0.005)
+    stage.labels(stage="read").observe(0.5)
+    return registry
+
+def test_prometheus_text_format(registry):
+    assert registry.render_prometheus() == (
+        "# HELP reads_total Device reads\n"
+        "# TYPE reads_total counter\n"
+        "reads_total 3.0\n"
+        "# HELP queue_depth Batches waiting per sink\n"
+        "# TYPE queue_depth gauge\n"
+        'queue_depth{sink="osc"} 2\n'
+        "# HELP stage_seconds Time per stage\n"
+        "# TYPE stage_seconds histogram\n"
+        'stage_seconds_bucket{stage="read",le="0.001"} 1\n'
+        'stage_seconds_bucket{stage="read",le="0.01"} 2\n'
+        'stage_seconds_bucket{stage="read",le="+Inf"} 3\n'
+        'stage_seconds_sum{stage="read"} 0.5055\n'
+        'stage_seconds_count{stage="read"} 3\n'
+    )
+
+def test_osc_messages_skip_buckets(registry):
+    assert registry.osc_messages() == [
+        ("/metrics/reads_total", 3.0),
+        ("/metrics/queue_depth/osc", 2.0),
+        ("/metrics/stage_seconds_sum/read", 0.5055),
+        ("/metrics/stage_seconds_count/read", 3.0),
+    ]
+
+def test_metrics_server(registry):
+    server = MetricsServer(registry, port=0).start()
+    try:
+        url = f"http://127.0.0.1:{server.server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            assert response.headers["Content-Type"] == "text/plain; version=0.0.4"
+            assert response.read().decode() == registry.render_prometheus()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other")
+    finally:
+        server.stop()
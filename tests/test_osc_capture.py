@@ -0,0 +1,99 @@
+import socket
+import struct
+import sys
+import threading
+import time
+
+import pytest
+from pythonosc.osc_bundle_builder import IMMEDIATELY, OscBundleBuilder
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+import osc_capture
+from osc_capture import MAGIC, RECORD, decode_capture, read_capture, record
+
+# Seconds between the datagrams sent to the recorder
+SPACING = [0.0, 0.1, 0.25]
+
+
+def message(address, *args):
+    builder = OscMessageBuilder(address)
+    for arg in args:
+        builder.add_arg(arg)
+    return builder.build()
+
+def datagrams():
+    bundle = OscBundleBuilder(IMMEDIATELY)
+    bundle.add_content(message("/EMG1/envelope", 0.5))
+    bundle.add_content(message("/ECG2/bpm", 72.0))
+    return [message("/start", 1).dgram, bundle.build().dgram, message("/stop", "done").dgram]
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def capture(tmp_path):
+    """A capture of datagrams() sent SPACING apart, recorded by record()"""
+    path = tmp_path / "session.osc"
+    port = free_port()
+    counts = []
+    thread = threading.Thread(target=lambda: counts.append(record(path, "127.0.0.1", port, duration=0.4)))
+    thread.start()
+    time.sleep(0.2)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        start = time.perf_counter()
+        for offset, data in zip(SPACING, datagrams()):
+            time.sleep(max(0.0, start + offset - time.perf_counter()))
+            sock.sendto(data, ("127.0.0.1", port))
+    thread.join(timeout=5)
+    assert counts == [3]
+    return path
+
+
+def test_record_writes_datagrams_with_their_times(capture):
+    raw = capture.read_bytes()
+    assert raw.startswith(MAGIC)
+    # MAGIC, then (seconds, length) before every datagram, nothing else
+    assert len(raw) == len(MAGIC) + sum(RECORD.size + len(data) for data in datagrams())
+    first_seconds, first_length = RECORD.unpack_from(raw, len(MAGIC))
+    assert first_seconds == 0 and first_length == len(datagrams()[0])
+
+    records = list(read_capture(capture))
+    assert [data for seconds, data in records] == datagrams()
+    for (seconds, data), offset in zip(records, SPACING):
+        assert seconds == pytest.approx(offset, abs=0.03)
+
+def test_decode_flattens_bundles(capture):
+    decoded = [(address, params) for seconds, address, params in decode_capture(capture)]
+    assert decoded == [("/start", [1]), ("/EMG1/envelope", [0.5]), ("/ECG2/bpm", [72.0]), ("/stop", ["done"])]
+
+def test_not_a_capture_rejected(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"RIFF" + struct.pack("<I", 0))
+    with pytest.raises(ValueError):
+        list(read_capture(path))
+
+@pytest.mark.parametrize("speed", [1.0, 2.5])
+def test_replay_keeps_the_spacing(capture, osc_listener, monkeypatch, capsys, speed):
+    monkeypatch.setattr(sys, "argv", ["osc_capture.py", "replay", str(capture), "--ip", osc_listener.ip,
+                                      "--port", str(osc_listener.port), "--speed", str(speed)])
+    osc_capture.main()
+    assert "[CAPTURE] 3 datagrams sent" in capsys.readouterr().out
+    assert osc_listener.wait_for(lambda listener: len(listener.received()) == 4)
+
+    received = osc_listener.received()
+    assert [(address, params) for arrival, address, params in received] == \
+        [(address, params) for seconds, address, params in decode_capture(capture)]
+    recorded = [seconds for seconds, data in read_capture(capture)]
+    arrivals = [received[0][0], received[1][0], received[3][0]]
+    for arrival, seconds in zip(arrivals, recorded):
+        assert arrival - arrivals[0] == pytest.approx(seconds / speed, abs=0.03)
+
+def test_dump_prints_every_message(capture, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["osc_capture.py", "dump", str(capture)])
+    osc_capture.main()
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split(" ", 1)[1] for line in lines] == ["/start 1", "/EMG1/envelope 0.5", "/ECG2/bpm 72.0", "/stop done"]
+    assert float(lines[-1].split()[0]) == pytest.approx(SPACING[-1], abs=0.03)
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from fake_device import FakeBITalino, synthetic_samples
+from fanout import OscUdpSink
+
+N_SAMPLES = 2000
+
+
+def run_pipeline(acquisition, device, n_samples, osc=True):
+    """Run the sensor (and OSC) loops until n_samples went through, then stop them"""
+    threads = [threading.Thread(target=acquisition.sensor_acquisition_loop, args=(device,))]
+    if osc:
+        threads.append(threading.Thread(target=acquisition.osc_refresh_loop))
+    for thread in threads:
+        thread.start()
+    deadline = time.perf_counter() + 10
+    while acquisition.histories[1].sample_count < n_samples and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    # Leave the OSC loop one more tick to send the last block
+    time.sleep(0.05)
+    acquisition.sensor_thread_status["running"] = False
+    for thread in threads:
+        thread.join(timeout=5)
+    device.close()
+
+
+def expected_units(acquisition, samples, port, sensor_type):
+    return acquisition.transfer_function(samples[:, acquisition.read_columns(acquisition.SENSORS)[port]], sensor_type)
+
+
+def assert_buffers_hold(acquisition, samples):
+    for port, sensor_type in acquisition.SENSORS:
+        count = acquisition.histories[port].sample_count
+        assert count >= len(samples)
+        # The fake device loops over its samples
+        looped = np.resize(samples, (count, samples.shape[1]))
+        expected = expected_units(acquisition, looped, port, sensor_type)[-acquisition.BUFFER_SIZE:]
+        np.testing.assert_allclose(acquisition.data_buffers[port].latest(), expected, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("fast_decoder", [True, False])
+def test_buffers_hold_converted_samples(acquisition, fast_decoder):
+    acquisition.FAST_DECODER = fast_decoder
+    samples = synthetic_samples(N_SAMPLES, len(acquisition.SENSORS), seed=1)
+    run_pipeline(acquisition, FakeBITalino(samples, realtime=False), N_SAMPLES, osc=False)
+    assert_buffers_hold(acquisition, samples)
+
+
+def test_osc_blocks_carry_every_sample(acquisition, osc_listener):
+    acquisition.fanout.add_sink(OscUdpSink("test", osc_listener.ip, osc_listener.port, bundle=True))
+    samples = synthetic_samples(N_SAMPLES, len(acquisition.SENSORS), seed=2)
+    device = FakeBITalino(samples, realtime=True)
+    run_pipeline(acquisition, device, N_SAMPLES)
+
+    for port, sensor_type in acquisition.SENSORS:
+        address = f"/{sensor_type}{port}/block"
+        assert osc_listener.wait_for(lambda listener: sum(len(m[2]) for m in listener.received(address)) >= N_SAMPLES, timeout=1)
+        values = np.concatenate([params for t, a, params in osc_listener.received(address)])
+        expected = expected_units(acquisition, samples, port, sensor_type)
+        # OSC floats are float32
+        np.testing.assert_allclose(values[:N_SAMPLES], expected, rtol=1e-6, atol=1e-6)
+
+        latest = osc_listener.received(f"/{sensor_type}{port}/latest")
+        assert len(latest) > 0
+        assert latest[-1][2][0] in values.astype(np.float32)
+
+
+def test_osc_latency(acquisition, osc_listener):
+    acquisition.fanout.add_sink(OscUdpSink("test", osc_listener.ip, osc_listener.port, bundle=True))
+    samples = synthetic_samples(N_SAMPLES, len(acquisition.SENSORS), seed=4)
+    device = FakeBITalino(samples, realtime=True)
+    run_pipeline(acquisition, device, N_SAMPLES)
+
+    # Time from the device writing a sample to the OSC block holding it reaching the listener
+    latencies = []
+    position = 0
+    for arrival, address, params in osc_listener.received("/EMG1/block"):
+        position += len(params)
+        if position <= N_SAMPLES:
+            latencies.append(arrival - device.send_times[position - 1])
+    latencies = np.array(latencies)
+    # One read chunk plus one OSC tick, with slack for loaded machines
+    budget = acquisition.READ_CHUNK_SIZE / acquisition.SAMPLING_RATE + 1 / acquisition.OSC_REFRESH_RATE
+    assert np.median(latencies) < 2 * budget
+    assert np.percentile(latencies, 95) < 5 * budget
+
+
+def test_steady_state_is_garbage_free(acquisition, monkeypatch):
+    import gc
+    from profiler import AllocationCounter
+
+    class SteadyStateCounter(AllocationCounter):
+        """Starts counting after a warm-up (first reads, lazy imports, growing caches)"""
+        instance = None
+
+        def __init__(self):
+            super().__init__()
+            SteadyStateCounter.instance = self
+            self.reads = 0
+
+        def end(self):
+            super().end()
+            self.reads += 1
+            if self.reads == 100:
+                self.reset()
+                self.gen2 = gc.get_stats()[2]["collections"]
+
+    monkeypatch.setattr(acquisition, "AllocationCounter", SteadyStateCounter)
+    acquisition.ALLOCATION_TRACKING = True
+    acquisition.ALLOCATION_REPORT_INTERVAL = 1e9
+    samples = synthetic_samples(N_SAMPLES, len(acquisition.SENSORS), seed=40)
+    device = FakeBITalino(samples, realtime=False)
+    thread = threading.Thread(target=acquisition.sensor_acquisition_loop, args=(device,))
+    thread.start()
+    try:
+        deadline = time.perf_counter() + 20
+        while (SteadyStateCounter.instance is None or SteadyStateCounter.instance.reads < 500) and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    finally:
+        acquisition.sensor_thread_status["running"] = False
+        thread.join(timeout=5)
+        device.close()
+
+    counter = SteadyStateCounter.instance
+    assert counter.iterations >= 400
+    blocks, objects, collections = counter.report()
+    assert abs(blocks) < 1 and objects < 1
+    assert gc.get_stats()[2]["collections"] == counter.gen2
@@ -0,0 +1,65 @@
+import threading
+
+import numpy as np
+
+import precision_report
+from biosignal.filters import design_notches, filter_signal
+from biosignal.spectrum import compute_fft
+from coherence import CoherenceAnalyzer
+from fake_device import FakeBITalino, synthetic_samples
+from history import HistoryStore
+from test_pipeline import expected_units, run_pipeline
+
+
+def test_float32_path_keeps_its_dtype():
+    signal = np.random.default_rng(0).normal(size=2048).astype(np.float32)
+    for freq, q_factor, b, a in design_notches([(50, 30)], 1000):
+        assert filter_signal(signal, b, a).dtype == np.float32
+    freqs, magnitudes = compute_fft(signal, 1000, 1024)
+    assert magnitudes.dtype == np.float32 and freqs.dtype == np.float64
+    assert compute_fft(signal.astype(np.float64), 1000, 1024)[1].dtype == np.float64
+
+    history = HistoryStore(1000, 2, dtype=np.float32)
+    history.append(signal)
+    assert history.full.latest().dtype == np.float32
+    assert all(level.ring.data.dtype == np.float32 for level in history.levels)
+    assert history.query(2)[3].dtype == np.float32
+
+    analyzer = CoherenceAnalyzer(2, 1000, {"alpha": (8, 13)}, dtype=np.float32)
+    analyzer.push(np.column_stack((signal, signal)))
+    analyzer.update()
+    assert analyzer.csd.dtype == np.complex64
+    np.testing.assert_allclose(analyzer.correlation(), 1, rtol=1e-5)
+
+def test_float32_accuracy_report():
+    adc = precision_report.test_signal(4096)
+    for sensor_type in ("EMG", "ECG", "EEG"):
+        errors = precision_report.compare(adc, sensor_type)
+        assert errors["convert (LSB)"] < 1e-3
+        assert errors["notches (LSB)"] < 1e-3
+        # Why the notch coefficients stay float64
+        assert errors["notches, float32 coefficients (LSB)"] > 0.5
+        assert errors["spectrum (of peak)"] < 1e-5
+        assert errors["peak (Hz)"] < 1e-3
+    history64, spectrum64 = precision_report.memory(np.float64)
+    history32, spectrum32 = precision_report.memory(np.float32)
+    assert (history32, spectrum32) == (history64 // 2, spectrum64 // 2)
+
+def test_float32_pipeline(acquisition):
+    acquisition.PRECISION = "float32"
+    for port, sensor_type in acquisition.SENSORS:
+        acquisition.histories[port] = acquisition.make_history()
+        acquisition.data_buffers[port] = acquisition.histories[port].full
+    samples = synthetic_samples(2000, len(acquisition.SENSORS), seed=11)
+    thread = threading.Thread(target=acquisition.data_processing_loop)
+    thread.start()
+    run_pipeline(acquisition, FakeBITalino(samples, realtime=True), 2000)
+    thread.join(timeout=5)
+
+    for port, sensor_type in acquisition.SENSORS:
+        ring = acquisition.data_buffers[port]
+        assert ring.data.dtype == np.float32
+        looped = np.resize(samples, (ring.write_count, samples.shape[1]))
+        expected = expected_units(acquisition, looped, port, sensor_type)[-acquisition.BUFFER_SIZE:]
+        np.testing.assert_allclose(ring.latest(), expected, rtol=1e-6, atol=1e-6 * np.max(np.abs(expected)))
+        assert acquisition.ffts[port][1].dtype == np.float32
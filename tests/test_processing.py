@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+import pytest
+
+import acquisition
+import golden
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return golden.load()
+
+
+@pytest.mark.parametrize("sensor_type", sorted(acquisition.GAINS))
+def test_transfer_function_matches_golden(reference, sensor_type):
+    adc = reference["adc"][:, 5]
+    expected = reference[f"convert_{sensor_type}"]
+    np.testing.assert_allclose(acquisition.transfer_function(adc, sensor_type), expected, rtol=1e-12, atol=0)
+
+    # In-place path used by the acquisition loop
+    out = np.empty(len(adc))
+    acquisition.transfer_function(adc, sensor_type, out=out)
+    np.testing.assert_allclose(out, expected, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("sensor_type", sorted(acquisition.GAINS))
+def test_notch_filters_match_golden(reference, sensor_type):
+    signal = reference[f"convert_{sensor_type}"]
+    expected = reference[f"filtered_{sensor_type}"]
+
+    for freq, q_factor, b, a in acquisition.design_notches(acquisition.NOTCHES):
+        signal = acquisition.filter_signal(signal, b, a)
+    np.testing.assert_allclose(signal, expected, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("sensor_type", sorted(acquisition.GAINS))
+def test_fft_matches_golden(reference, sensor_type):
+    freqs, magnitudes = acquisition.compute_fft(reference[f"filtered_{sensor_type}"])
+    np.testing.assert_allclose(freqs, reference[f"fft_freqs_{sensor_type}"], rtol=1e-12)
+    np.testing.assert_allclose(magnitudes, reference[f"fft_magnitudes_{sensor_type}"], rtol=1e-9, atol=1e-12)
+
+
+def test_short_signals_are_left_unfiltered():
+    signal = np.arange(5.0)
+    b, a = acquisition.design_notches([(50, 30)])[0][2:]
+    assert acquisition.filter_signal(signal, b, a) is signal
+
+
+def test_processing_tick_timing(reference):
+    # One data_processing_loop tick for four ports must fit well inside 1 / PROCESSING_RATE
+    signal = np.resize(reference["convert_ECG"], acquisition.BUFFER_SIZE)
+    filters = acquisition.design_notches(acquisition.NOTCHES)
+    durations = []
+    for i in range(20):
+        start = time.perf_counter()
+        for port in range(4):
+            filtered = signal
+            for freq, q_factor, b, a in filters:
+                filtered = acquisition.filter_signal(filtered, b, a)
+            acquisition.compute_fft(filtered)
+        durations.append(time.perf_counter() - start)
+    assert np.median(durations) < 1 / acquisition.PROCESSING_RATE
@@ -0,0 +1,57 @@
+import json
+import os
+import threading
+import time
+
+from profiler import Profiler
+
+
+def busy(profiler, name, stop):
+    profiler.register_thread(name)
+    while not stop.is_set():
+        start = time.perf_counter()
+        sum(range(1000))
+        profiler.record(name, start, time.perf_counter() - start)
+        time.sleep(0.001)
+
+def test_dump(tmp_path):
+    profiler = Profiler(capacity=1024, sample_interval=0.002).start()
+    stop, ended = threading.Event(), threading.Event()
+    threads = [threading.Thread(target=busy, args=(profiler, "worker", stop)),
+               threading.Thread(target=busy, args=(profiler, "short", ended))]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    ended.set()
+    threads[1].join()
+    try:
+        # An ended thread is left out of the CPU times but keeps its name in the trace
+        assert set(profiler.thread_times()) == {"worker"}
+        assert len(profiler.threads) == 1
+
+        prefix = str(tmp_path / "profile")
+        profiler.dump(prefix)
+    finally:
+        stop.set()
+        threads[0].join()
+        profiler.stop()
+
+    with open(f"{prefix}.folded") as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(line.startswith("worker;") and "busy (test_profiler.py" in line for line in lines)
+
+    with open(f"{prefix}.trace.json") as f:
+        trace = json.load(f)
+    events = trace["traceEvents"]
+    names = {event["args"]["name"] for event in events if event["ph"] == "M"}
+    assert names == {"worker", "short"}
+    spans = [event for event in events if event["ph"] == "X"]
+    assert {event["name"] for event in spans} >= {"worker", "short"}
+    assert all(event["dur"] >= 0 and event["ts"] >= 0 and event["pid"] == os.getpid() for event in spans)
+
+def test_capacity_keeps_the_newest_events():
+    profiler = Profiler(capacity=8)
+    for i in range(20):
+        profiler.record("stage", float(i), 0.001)
+    assert profiler.recorded_events()["start"].tolist() == [float(i) for i in range(12, 20)]
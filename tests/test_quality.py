@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+
+from biosignal.quality import QualityAnalyzer, adc_top, mains_ratio
+from fake_device import FakeBITalino, synthetic_samples
+from fanout import OscUdpSink
+from test_pipeline import run_pipeline
+
+RATE = 1000
+CHUNK = 10
+
+
+def feed(analyzer, raw):
+    for start in range(0, len(raw), CHUNK):
+        analyzer.update(raw[start:start + CHUNK])
+    return analyzer.scores
+
+
+def test_clean_signal_scores_full():
+    raw = synthetic_samples(3000, 4, seed=3)[:, 5:]
+    analyzer = QualityAnalyzer([adc_top(port) for port in range(1, 5)], RATE)
+    np.testing.assert_array_equal(feed(analyzer, raw), 1)
+    assert analyzer.artifacts.sum() == 0
+
+def test_clipping_flatline_and_artifact():
+    raw = synthetic_samples(3000, 4, seed=3)[:, 5:].astype(float)
+    raw[:, 0] = np.clip(raw[:, 0] * 4 - 1500, 0, 1023)  # saturates most of the time
+    raw[:, 1] = 512  # electrode off
+    raw[2800:2820, 2] = [0, 1023] * 10  # one short pop
+    analyzer = QualityAnalyzer([1023] * 4, RATE)
+    scores = feed(analyzer, raw)
+    assert analyzer.clipping[0] > 0.05 and scores[0] == 0
+    assert analyzer.flat[1] and scores[1] == 0
+    assert analyzer.artifacts[2] >= 1 and analyzer.artifact[2] and scores[2] == 0
+    assert scores[3] == 1
+    assert analyzer.report(1)[2] == 1.0
+    # The pop is over after artifact_hold
+    feed(analyzer, synthetic_samples(1000, 4, seed=5)[:, 5:])
+    assert not analyzer.artifact[2]
+
+def test_new_level_becomes_the_baseline():
+    active = synthetic_samples(62000, 4, seed=6)[:, 5:].astype(float)
+    raw = active.copy()
+    raw[:2000, 0] = 512  # electrode connected after 2 s
+    # Quiet start, then a signal 15 times louder (around mid-scale so it doesn't clip)
+    raw[:2000, 1] = 512 + (active[:2000, 1] - 512) / 15
+    analyzer = QualityAnalyzer([1023] * 4, RATE)
+    scores = feed(analyzer, raw)
+    for channel in (0, 1):
+        assert analyzer.variance[channel] > 100
+        assert not analyzer.artifact[channel] and scores[channel] == 1
+        # Only the first artifact_hold of the new level counted as artifacts
+        assert analyzer.artifacts[channel] <= analyzer.artifact_samples / CHUNK
+    assert analyzer.artifacts[2:].sum() == 0
+
+def test_mains_ratio():
+    t = np.arange(1024) / RATE
+    noise = np.random.default_rng(0).normal(0, 0.1, len(t))
+    # Sinusoid power 0.5, noise 0.01
+    np.testing.assert_allclose(mains_ratio(np.sin(2 * np.pi * 50 * t) + noise, RATE), 0.5 / 0.51, atol=0.03)
+    assert mains_ratio(np.sin(2 * np.pi * 10 * t) + noise, RATE) < 0.01
+    assert mains_ratio(np.zeros(1024), RATE) == 0
+
+def test_quality_published_and_gated(acquisition, osc_listener):
+    acquisition.QUALITY_GATE = True
+    acquisition.fanout.add_sink(OscUdpSink("test", osc_listener.ip, osc_listener.port, bundle=True))
+    samples = synthetic_samples(2000, len(acquisition.SENSORS), seed=6)
+    samples[:, 5 + 1] = 300  # port 2 flat
+    threads = [threading.Thread(target=acquisition.data_processing_loop)]
+    for thread in threads:
+        thread.start()
+    run_pipeline(acquisition, FakeBITalino(samples, realtime=True), 2000)
+    for thread in threads:
+        thread.join(timeout=5)
+
+    score, clipping, flat, artifact, mains = osc_listener.received("/ECG2/quality")[-1][2]
+    assert score == 0 and flat == 1
+    assert osc_listener.received("/EMG1/quality")[-1][2][0] > 0.5
+    # Bad port skipped by the processing loop, good ones processed
+    assert len(acquisition.ffts[2][1]) == 0
+    assert len(acquisition.ffts[1][1]) > 0
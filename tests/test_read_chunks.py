@@ -0,0 +1,63 @@
+import threading
+import time
+
+from fake_device import FakeBITalino, synthetic_samples
+
+
+def test_backlog_drives_the_chunk_size(acquisition):
+    policy = acquisition.ReadChunkPolicy(base_size=100, max_size=250, sampling_rate=1000)
+    assert policy.next_size(0) == 100
+    # Everything buffered is read at once, up to max_size
+    assert policy.next_size(180) == 180
+    assert policy.next_size(10000) == 250
+
+def test_latency_requests_shrink_the_chunk(acquisition):
+    policy = acquisition.ReadChunkPolicy(base_size=100, max_size=250, sampling_rate=1000)
+    policy.request_latency("osc", 1 / 30)
+    policy.request_latency("audio", 0.01)
+    assert policy.target_size() == 10
+    # A backlog still wins over the latency target
+    assert policy.next_size(120) == 120
+    policy.release_latency("audio")
+    assert policy.next_size(0) == 33
+    policy.request_latency("fast", 1e-6)
+    assert policy.next_size(0) == 1
+    policy.release_latency("fast")
+    policy.release_latency("osc")
+    policy.release_latency("osc")
+    assert policy.next_size(0) == 100
+
+def test_osc_loop_requests_its_refresh_latency(acquisition):
+    # Faster than one READ_CHUNK_SIZE per tick
+    acquisition.OSC_REFRESH_RATE = 4 * acquisition.SAMPLING_RATE / acquisition.READ_CHUNK_SIZE
+    thread = threading.Thread(target=acquisition.osc_refresh_loop)
+    thread.start()
+    try:
+        deadline = time.perf_counter() + 2
+        while "osc" not in acquisition.read_chunk_policy.latency_requests and time.perf_counter() < deadline:
+            time.sleep(0.005)
+        assert acquisition.read_chunk_policy.target_size() == acquisition.READ_CHUNK_SIZE // 4
+    finally:
+        acquisition.sensor_thread_status["running"] = False
+        thread.join(timeout=2)
+    assert "osc" not in acquisition.read_chunk_policy.latency_requests
+
+def test_reader_catches_up_with_large_reads(acquisition):
+    samples = synthetic_samples(5000, len(acquisition.SENSORS), seed=23)
+    device = FakeBITalino(samples, realtime=False)
+    sizes = []
+    next_size = acquisition.read_chunk_policy.next_size
+    acquisition.read_chunk_policy.next_size = lambda backlog: sizes.append(next_size(backlog)) or sizes[-1]
+    thread = threading.Thread(target=acquisition.sensor_acquisition_loop, args=(device,))
+    thread.start()
+    try:
+        deadline = time.perf_counter() + 5
+        while acquisition.histories[1].sample_count < 5000 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    finally:
+        acquisition.sensor_thread_status["running"] = False
+        thread.join(timeout=5)
+        device.close()
+    # The device writes faster than real time, so the socket holds a backlog and reads grow to READ_CHUNK_MAX
+    assert max(sizes) == acquisition.READ_CHUNK_MAX
+    assert all(1 <= size <= acquisition.READ_CHUNK_MAX for size in sizes)
@@ -0,0 +1,68 @@
+import os
+import threading
+
+import pytest
+
+from realtime import RealtimeScheduler
+
+
+def run_in_thread(function):
+    """Result of function() called on a new thread, re-raising its exception"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = function()
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join(timeout=5)
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="no sched_setaffinity on this platform")
+def test_policy_applied_to_the_calling_thread_only():
+    core = min(os.sched_getaffinity(0))
+    main_cores = os.sched_getaffinity(0)
+    main_nice = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+    # Raising the nice level is always allowed
+    nice = min(main_nice + 5, 19)
+    scheduler = RealtimeScheduler({"worker": {"cores": [core], "nice": nice}})
+
+    def configured():
+        scheduler.thread_setup("worker")()
+        return os.sched_getaffinity(0), os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+
+    assert run_in_thread(configured) == ({core}, nice)
+    assert scheduler.applied["worker"] == [f"cores [{core}]", f"nice {nice}"]
+    assert os.sched_getaffinity(0) == main_cores
+    assert os.getpriority(os.PRIO_PROCESS, threading.get_native_id()) == main_nice
+    assert "[RT] worker: cores" in scheduler.report()
+
+def test_unknown_thread_left_alone():
+    scheduler = RealtimeScheduler({"worker": {"nice": 5}})
+    run_in_thread(scheduler.thread_setup("other"))
+    assert scheduler.applied == {}
+
+@pytest.mark.skipif(not hasattr(os, "setpriority"), reason="no setpriority on this platform")
+@pytest.mark.parametrize("unsupported", ["missing", "refused"])
+def test_unsupported_fifo_reported_and_nice_used(monkeypatch, unsupported):
+    if unsupported == "missing":
+        monkeypatch.delattr(os, "SCHED_FIFO", raising=False)
+    else:
+        def refuse(pid, policy, param):
+            raise PermissionError(1, "Operation not permitted")
+        monkeypatch.setattr(os, "sched_setscheduler", refuse, raising=False)
+    nice = min(os.getpriority(os.PRIO_PROCESS, 0) + 3, 19)
+    scheduler = RealtimeScheduler({"worker": {"priority": 80, "nice": nice}})
+
+    run_in_thread(scheduler.thread_setup("worker"))
+    fifo, fallback = scheduler.applied["worker"]
+    assert fifo.startswith("SCHED_FIFO 80 refused (")
+    if unsupported == "refused":
+        assert fifo == "SCHED_FIFO 80 refused (Operation not permitted)"
+    assert fallback == f"nice {nice}"
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from fake_device import FakeBITalino, synthetic_samples
+from fanout import OscUdpSink
+from sonify import Sonifier, parse_field
+from test_pipeline import run_pipeline
+
+
+def values(sonifier, sources, elapsed=0.01):
+    return dict(sonifier.process(sources, elapsed))
+
+
+def test_curves():
+    sonifier = Sonifier([
+        {"name": "lin", "source": "a", "input": (0, 2), "output": (10, 20)},
+        {"name": "exp", "source": "a", "input": (0, 2), "curve": "exp", "curvature": 4},
+        {"name": "log", "source": "a", "input": (0, 2), "curve": "log", "curvature": 4},
+        {"name": "lut", "source": "a", "input": (0, 2), "curve": "lut", "table": [0, 1, 0]},
+    ])
+    out = values(sonifier, {"a": 1.0})
+    assert out["/sonify/lin"] == 15
+    assert out["/sonify/exp"] == pytest.approx(np.expm1(2) / np.expm1(4))
+    assert out["/sonify/log"] == pytest.approx(np.log1p(2) / np.log1p(4))
+    assert out["/sonify/lut"] == 1
+    # Clipped to the input range
+    assert values(sonifier, {"a": 5.0})["/sonify/lin"] == 20
+
+def test_scale_slew_and_hz():
+    sonifier = Sonifier([{"name": "pitch", "source": "a", "input": (0, 1), "output": (60, 72),
+                          "scale": "pentatonic", "slew": 100, "hz": True}])
+    # 61.2 snaps to 62 (D), 69 exactly is A440
+    assert values(sonifier, {"a": 0.1})["/sonify/pitch"] == pytest.approx(440 * 2 ** ((62 - 69) / 12))
+    # 100 semitones per second: 0.01 s moves by at most one semitone
+    assert values(sonifier, {"a": 0.75})["/sonify/pitch"] == pytest.approx(440 * 2 ** ((63 - 69) / 12))
+    assert values(sonifier, {"a": 0.75}, elapsed=1)["/sonify/pitch"] == pytest.approx(440)
+    # A missing source sends nothing and keeps the state
+    assert values(sonifier, {}) == {}
+
+def test_trigger_with_hysteresis():
+    sonifier = Sonifier([{"name": "hit", "source": "a", "trigger": 0.5, "hysteresis": 0.2}])
+    sent = [values(sonifier, {"a": a}).get("/sonify/hit") for a in (0.1, 0.6, 0.7, 0.4, 0.6, 0.2, 0.9)]
+    assert [value is not None for value in sent] == [False, True, False, False, False, False, True]
+    assert sent[-1] == pytest.approx(0.9)
+
+def test_runtime_changes():
+    sonifier = Sonifier([{"name": "amp", "source": "a"}])
+    sonifier.set("amp", "output", parse_field("output", [0, 10]))
+    sonifier.set("pan", "source", "b")
+    assert values(sonifier, {"a": 0.5, "b": 0.25}) == {"/sonify/amp": 5, "/sonify/pan": 0.25}
+    sonifier.remove("pan")
+    assert list(values(sonifier, {"a": 0.5, "b": 0.25})) == ["/sonify/amp"]
+    with pytest.raises(ValueError):
+        sonifier.set("amp", "curve", "cubic")
+    with pytest.raises(ValueError):
+        sonifier.set("missing", "output", (0, 1))
+    assert parse_field("scale", ["none"]) is None
+    assert parse_field("hz", [1]) is True
+
+def test_changes_keep_the_state_of_other_mappings():
+    sonifier = Sonifier([{"name": "hit", "source": "a", "trigger": 0.5},
+                         {"name": "pitch", "source": "c", "output": (0, 100), "slew": 10},
+                         {"name": "pan", "source": "b"}])
+    values(sonifier, {"a": 0.9, "b": 0.5, "c": 0.9}, elapsed=100)
+    for change in (lambda: sonifier.remove("pan"), lambda: sonifier.set("pan", "source", "b")):
+        change()
+        out = values(sonifier, {"a": 0.9, "b": 0.5, "c": 0.1})
+        # "hit" already fired above its threshold, "pitch" slews on from where it was
+        assert "/sonify/hit" not in out
+        assert 89 < out["/sonify/pitch"] < 90
+
+def test_pipeline_sends_mappings(acquisition, osc_listener):
+    acquisition.fanout.add_sink(OscUdpSink("test", osc_listener.ip, osc_listener.port, bundle=True))
+    run_pipeline(acquisition, FakeBITalino(synthetic_samples(1000, len(acquisition.SENSORS), seed=10)), 1000)
+    pitch = osc_listener.received("/sonify/pitch")
+    assert pitch and 80 < pitch[-1][2][0] < 1400
+    assert osc_listener.received("/sonify/amplitude")
@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from biosignal import filters
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_filter_cache_round_trip(tmp_path):
+    path = str(tmp_path / "filters.json")
+    designed = filters.design_notches([(50, 30), (100, 30)], 1000, path)
+    with open(path) as f:
+        assert len(json.load(f)) == 2
+    cached = filters.design_notches([(50, 30), (100, 30)], 1000, path)
+    for (freq, q, b, a), (cached_freq, cached_q, cached_b, cached_a) in zip(designed, cached):
+        assert (freq, q) == (cached_freq, cached_q)
+        np.testing.assert_array_equal(b, cached_b)
+        np.testing.assert_array_equal(a, cached_a)
+
+def test_headless_import_skips_heavy_modules(tmp_path):
+    # The first import designs the notches and fills the cache under HOME, the second reads it
+    env = dict(os.environ, HOME=str(tmp_path))
+    code = "import sys, acquisition; print(' '.join(m for m in ('scipy', 'matplotlib') if m in sys.modules))"
+    first = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+    assert "scipy" in first.stdout
+    assert os.path.exists(tmp_path / ".cache" / "bitalino" / "filters.json")
+    second = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+    assert "scipy" not in second.stdout and "matplotlib" not in second.stdout
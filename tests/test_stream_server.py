@@ -0,0 +1,151 @@
+import base64
+import json
+import os
+import socket
+import struct
+import time
+
+import numpy as np
+import pytest
+
+from stream_server import KIND_SAMPLES, KIND_SPECTRUM, LENGTH, StreamServer, decode_message
+
+
+def read_exactly(sock, n):
+    data = b""
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        assert chunk, "connection closed"
+        data += chunk
+    return data
+
+
+class TcpClient:
+    def __init__(self, port):
+        self.sock = socket.create_connection(("127.0.0.1", port), timeout=2)
+
+    def subscribe(self, text):
+        self.sock.sendall(text.encode() + b"\n")
+
+    def receive(self):
+        length, = LENGTH.unpack(read_exactly(self.sock, LENGTH.size))
+        return read_exactly(self.sock, length)
+
+
+class WsClient:
+    def __init__(self, port):
+        self.sock = socket.create_connection(("127.0.0.1", port), timeout=2)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.sock.sendall((f"GET / HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                           f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        response = b""
+        while not response.endswith(b"\r\n\r\n"):
+            response += read_exactly(self.sock, 1)
+        assert response.startswith(b"HTTP/1.1 101")
+
+    def subscribe(self, text):
+        self.send(text.encode())
+
+    def send(self, payload, opcode=0x1):
+        mask = os.urandom(4)
+        masked = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+        if len(payload) < 126:
+            head = struct.pack("!BB", 0x80 | opcode, 0x80 | len(payload))
+        else:
+            head = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, len(payload))
+        self.sock.sendall(head + mask + masked)
+
+    def receive(self):
+        return self.receive_frame()[1]
+
+    def receive_frame(self):
+        head = read_exactly(self.sock, 2)
+        length = head[1] & 0x7F
+        if length == 126:
+            length, = struct.unpack("!H", read_exactly(self.sock, 2))
+        elif length == 127:
+            length, = struct.unpack("!Q", read_exactly(self.sock, 8))
+        return head[0] & 0x0F, read_exactly(self.sock, length)
+
+
+@pytest.fixture
+def server():
+    server = StreamServer(tcp_port=0, ws_port=0).start()
+    yield server
+    server.stop()
+
+def wait_for_clients(server, check):
+    deadline = time.perf_counter() + 2
+    while time.perf_counter() < deadline:
+        if server.clients and all(check(client) for client in server.clients):
+            return
+        time.sleep(0.01)
+    raise AssertionError("subscription not applied")
+
+@pytest.mark.parametrize("transport", ["tcp", "ws"])
+def test_subscription_filters_ports_and_decimates(server, transport):
+    client = TcpClient(server.tcp_port) if transport == "tcp" else WsClient(server.ws_port)
+    client.subscribe(json.dumps({"ports": [2], "decimation": 4, "spectra": False}))
+    wait_for_clients(server, lambda c: c.ports == {2})
+
+    server.publish_samples(1, 0, np.arange(20.0))
+    server.publish_spectrum(2, 20, np.ones(8))
+    server.publish_samples(2, 10, np.arange(10.0, 30.0))
+    kind, port, decimation, first, values = decode_message(client.receive())
+    # Only port 2 samples: absolute indices 12, 16, ... i.e. decimated indices 3, 4, ...
+    assert (kind, port, decimation, first) == (KIND_SAMPLES, 2, 4, 3)
+    np.testing.assert_array_equal(values, [12, 16, 20, 24, 28])
+
+    client.subscribe(json.dumps({"ports": None, "spectra": True}))
+    wait_for_clients(server, lambda c: c.ports is None)
+    server.publish_spectrum(1, 20, np.ones(8))
+    kind, port, decimation, first, values = decode_message(client.receive())
+    assert (kind, port, decimation, len(values)) == (KIND_SPECTRUM, 1, 1, 8)
+
+@pytest.mark.parametrize("transport", ["tcp", "ws"])
+@pytest.mark.parametrize("text", ["5", "[1, 2]", '{"ports": 3}', '{"decimation": "fast"}', "not json"])
+def test_invalid_subscription_answers_an_error(server, transport, text):
+    client = TcpClient(server.tcp_port) if transport == "tcp" else WsClient(server.ws_port)
+    client.subscribe(json.dumps({"decimation": 2}))
+    wait_for_clients(server, lambda c: c.decimation == 2)
+    client.subscribe(text)
+    assert "error" in json.loads(client.receive())
+
+    # Still connected, previous subscription kept
+    server.publish_samples(1, 0, np.arange(4.0))
+    kind, port, decimation, first, values = decode_message(client.receive())
+    assert decimation == 2
+    np.testing.assert_array_equal(values, [0, 2])
+
+def test_websocket_unmasks_long_frames_and_answers_pings(server):
+    client = WsClient(server.ws_port)
+    # Over 125 bytes: 16-bit length, mask applied across the whole payload
+    client.subscribe(json.dumps({"decimation": 3}).ljust(300))
+    wait_for_clients(server, lambda c: c.decimation == 3)
+    client.send(b"ping " * 40, opcode=0x9)
+    assert client.receive_frame() == (0xA, b"ping " * 40)
+
+def test_websocket_frame_over_the_limit_closes(server):
+    client = WsClient(server.ws_port)
+    # Length field of 2**40 bytes, only the header is ever sent
+    client.sock.sendall(struct.pack("!BBQ", 0x81, 0x80 | 127, 2 ** 40) + os.urandom(4))
+    assert client.receive_frame() == (0x8, struct.pack("!H", 1009))
+    assert client.sock.recv(1) == b""
+
+@pytest.mark.parametrize("request_bytes", [b"GET / HTTP/1.1\r\nHost: local", b"X" * 70000], ids=["truncated", "too_long"])
+def test_broken_handshake_closes_quietly(server, request_bytes):
+    errors = []
+    server.loop.set_exception_handler(lambda loop, context: errors.append(context))
+    sock = socket.create_connection(("127.0.0.1", server.ws_port), timeout=2)
+    sock.sendall(request_bytes)
+    sock.shutdown(socket.SHUT_WR)
+    try:
+        assert sock.recv(1) == b""
+    except ConnectionResetError:
+        pass
+    sock.close()
+    # The server still takes new clients
+    client = WsClient(server.ws_port)
+    client.subscribe(json.dumps({"decimation": 5}))
+    wait_for_clients(server, lambda c: c.decimation == 5)
+    assert errors == []
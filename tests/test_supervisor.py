@@ -0,0 +1,195 @@
+import threading
+import time
+
+import pytest
+
+from fake_device import FakeBITalino, synthetic_samples
+from supervisor import Supervisor
+
+
+def beating(worker):
+    while worker.running:
+        worker.beat()
+        time.sleep(0.005)
+
+def wait_until(condition, timeout=2):
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+def test_only_the_failed_worker_restarts():
+    runs = []
+
+    def crashing(worker):
+        runs.append(threading.current_thread())
+        if len(runs) == 1:
+            raise RuntimeError("boom")
+        beating(worker)
+
+    restarted = []
+    supervisor = Supervisor(0.01, restart_delay=0, on_restart=lambda worker, reason: restarted.append((worker.name, reason)))
+    steady = supervisor.add("steady", beating, 0.1)
+    crash = supervisor.add("crash", crashing, 0.1)
+    supervisor.start()
+    steady_thread = steady.thread
+    assert wait_until(lambda: len(restarted) == 1)
+    assert restarted == [("crash", "ended")]
+    assert steady.thread is steady_thread and steady.restarts == 0
+    assert crash.restarts == 1 and crash.alive
+    assert supervisor.stop(timeout=1)
+    assert not steady.alive and not crash.alive
+
+def test_stall_detected_and_interrupted_within_100ms():
+    stall = threading.Event()
+    unblock = threading.Event()
+    stalled_at = []
+
+    def reader(worker):
+        while worker.running:
+            worker.beat()
+            if stall.is_set():
+                stall.clear()
+                stalled_at.append(time.perf_counter())
+                # Blocked like a read on a silent device, until interrupted
+                unblock.wait()
+                unblock.clear()
+            time.sleep(0.005)
+
+    interrupted = []
+    supervisor = Supervisor(0.01, restart_delay=0)
+    worker = supervisor.add("reader", reader, 0.05, interrupt=lambda: (interrupted.append(time.perf_counter()), unblock.set()))
+    supervisor.start()
+    time.sleep(0.05)
+    stall.set()
+    assert wait_until(lambda: worker.restarts == 1)
+    assert interrupted[0] - stalled_at[0] < 0.1
+    assert worker.stalls == 1 and worker.alive
+    supervisor.stop(timeout=1)
+
+def test_stuck_thread_holds_back_its_restart():
+    release = threading.Event()
+
+    def stuck(worker):
+        worker.beat()
+        release.wait()
+
+    supervisor = Supervisor(0.01, restart_delay=0)
+    worker = supervisor.add("stuck", stuck, 0.02)
+    supervisor.start()
+    threads = threading.active_count()
+    time.sleep(0.2)
+    # Stopped and interrupted once, but never a second thread while the first one hangs
+    assert worker.failure == "stalled" and worker.stalls == 1 and worker.restarts == 0
+    assert threading.active_count() == threads
+    release.set()
+    assert wait_until(lambda: worker.restarts == 1)
+    supervisor.stop(timeout=1)
+
+def test_idle_blocks_are_not_stalls():
+    def slow_step(worker):
+        worker.beat()
+        with worker.idle():
+            time.sleep(0.1)
+        beating(worker)
+
+    supervisor = Supervisor(0.01)
+    worker = supervisor.add("slow", slow_step, 0.03)
+    supervisor.start()
+    time.sleep(0.2)
+    assert worker.stalls == 0 and worker.restarts == 0
+    supervisor.stop(timeout=1)
+
+def test_inactive_supervisor_stops_every_worker():
+    active = threading.Event()
+    active.set()
+    supervisor = Supervisor(0.01, active=active.is_set)
+    workers = [supervisor.add(name, beating) for name in ("a", "b")]
+    supervisor.start()
+    active.clear()
+    assert supervisor.wait(timeout=1)
+    assert wait_until(lambda: not any(worker.alive for worker in workers))
+
+def test_sensor_reconnects_alone(acquisition, monkeypatch):
+    samples = synthetic_samples(2000, len(acquisition.SENSORS), seed=12)
+    acquisition.device = FakeBITalino(samples)
+    replacement = FakeBITalino(samples)
+    monkeypatch.setattr(acquisition, "init_bt", lambda: replacement)
+    supervisor = acquisition.start_workers()
+    sensor, osc, process = (supervisor.workers[name] for name in ("sensor", "osc", "process"))
+    try:
+        assert wait_until(lambda: acquisition.histories[1].sample_count > 200)
+        threads = osc.thread, process.thread
+        # Device goes silent while still started: the read blocks until the watchdog shuts the socket down
+        acquisition.device.samplingRate = 1e-6
+        assert wait_until(lambda: sensor.restarts == 1)
+        count = acquisition.histories[1].sample_count
+        assert wait_until(lambda: acquisition.histories[1].sample_count > count + 200, timeout=5)
+        assert acquisition.device is replacement
+        assert sensor.stalls == 1
+        assert (osc.thread, process.thread) == threads and osc.restarts == process.restarts == 0
+        assert acquisition.reconnects_total.labels().value == 1
+        assert acquisition.worker_restarts_total.labels(worker="sensor").value == 1
+    finally:
+        acquisition.sensor_thread_status["running"] = False
+        assert supervisor.stop(timeout=2)
+        replacement.close()
+
+@pytest.mark.parametrize("fast_decoder", [True, False])
+def test_device_error_reconnects(acquisition, monkeypatch, capsys, fast_decoder):
+    acquisition.FAST_DECODER = fast_decoder
+    samples = synthetic_samples(2000, len(acquisition.SENSORS), seed=14)
+    acquisition.device = FakeBITalino(samples)
+    replacement = FakeBITalino(samples)
+    monkeypatch.setattr(acquisition, "init_bt", lambda: replacement)
+    supervisor = acquisition.start_workers()
+    sensor = supervisor.workers["sensor"]
+    try:
+        assert wait_until(lambda: acquisition.histories[1].sample_count > 200)
+        # Reads now raise the driver's "not in acquisition" error, without the driver installed
+        acquisition.device.started = False
+        assert wait_until(lambda: acquisition.device is replacement)
+        count = acquisition.histories[1].sample_count
+        assert wait_until(lambda: acquisition.histories[1].sample_count > count + 200, timeout=5)
+        assert sensor.error is None and sensor.stalls == 0
+        assert acquisition.reconnects_total.labels().value == 1
+    finally:
+        acquisition.sensor_thread_status["running"] = False
+        assert supervisor.stop(timeout=2)
+        replacement.close()
+    output = capsys.readouterr().out
+    assert "[SENSOR] Device not in acquisition mode" in output
+    assert "[SUPERVISOR] sensor raised" not in output
+
+def test_sensor_stall_outside_the_read_keeps_the_device(acquisition, monkeypatch):
+    class SlowExporter:
+        """Blocks once, like a long GC pause or a slow disk"""
+        def __init__(self):
+            self.stalled = False
+
+        def write_samples(self, samples, transfer_function):
+            if not self.stalled and acquisition.histories[1].sample_count > 200:
+                self.stalled = True
+                time.sleep(1)
+
+        def write_features(self, envelope, rms, bpm):
+            pass
+
+    samples = synthetic_samples(2000, len(acquisition.SENSORS), seed=13)
+    device = acquisition.device = FakeBITalino(samples)
+    acquisition.exporter = SlowExporter()
+    monkeypatch.setattr(acquisition, "init_bt", lambda: pytest.fail("reconnected"))
+    supervisor = acquisition.start_workers()
+    sensor = supervisor.workers["sensor"]
+    assert sensor.stall_timeout == acquisition.READ_CHUNK_MAX / acquisition.SAMPLING_RATE + acquisition.SENSOR_STALL_MARGIN
+    try:
+        assert wait_until(lambda: sensor.restarts == 1, timeout=3)
+        count = acquisition.histories[1].sample_count
+        assert wait_until(lambda: acquisition.histories[1].sample_count > count + 200, timeout=5)
+        assert acquisition.device is device and sensor.stalls == 1
+        assert acquisition.reconnects_total.labels().value == 0
+    finally:
+        acquisition.sensor_thread_status["running"] = False
+        assert supervisor.stop(timeout=2)
+        acquisition.exporter = None
+        device.close()